@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+
+import gc
+import io
+import os
+import re
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+
+from lex import Scanner
+from syn import Parser
+from sem import CompilationContext, SemanticAnalyzer
+from gen import Generator
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MOON = os.environ.get("MOON", os.path.join(ROOT, "moon"))
+LIBRARY = os.path.join(ROOT, "moon_processor", "samples", "lib.m")
+
+
+def synthetic(size: int) -> str:
+    """Generate a program with `size` classes, member functions and free functions"""
+    out = []
+    for i in range(size):
+        out.append(
+            """class C{i} {{
+    public integer a;
+    public integer b[4];
+    public get(integer k) : integer;
+}};
+""".format(
+                i=i
+            )
+        )
+
+    for i in range(size):
+        out.append(
+            """C{i}::get(integer k) : integer
+  local
+    integer t;
+  do
+    t = a + b[k] * 2;
+    return (t);
+  end;
+
+f{i}(integer x, integer y) : integer
+  local
+    integer s;
+    integer j;
+    integer arr[8];
+    C{i} obj;
+  do
+    s = 0;
+    j = 0;
+    obj.a = x;
+    while (j < 8)
+      do
+        arr[j] = x * j + y;
+        s = s + arr[j] - 1;
+        j = j + 1;
+      end;
+    if (s > 10)
+      then
+        s = s / 2;
+      else
+        s = s + obj.get(1);
+    ;
+    return (s);
+  end;
+""".format(
+                i=i
+            )
+        )
+
+    out.append("main\n  local\n    integer r;\n  do\n    r = 0;\n")
+    for i in range(size):
+        out.append("    r = r + f{i}(r, {i});\n".format(i=i))
+    out.append("    write(r);\n  end\n")
+    return "".join(out)
+
+
+def large_function(size: int, terms: int = 100) -> str:
+    """Generate a program whose main function assigns `size` sums of `terms` terms"""
+    out = ["main\n  local\n    integer a;\n    integer b;\n    integer c;\n  do\n"]
+    out.append("    a = 1;\n    b = 2;\n    c = 0;\n")
+    for i in range(size):
+        terms_ = " + ".join("(a * {} - b)".format(i + j) for j in range(terms))
+        out.append("    c = c + {};\n".format(terms_))
+    out.append("    write(c);\n  end\n")
+    return "".join(out)
+
+
+def nested_loops(size: int) -> str:
+    """Generate a program whose main function runs counted loops nested three deep
+    over arrays of `size` elements"""
+    return """main
+  local
+    integer a[{size}];
+    integer b[{size}];
+    integer i;
+    integer j;
+    integer k;
+    integer s;
+  do
+    i = 0;
+    while (i < {size})
+      do
+        a[i] = i * 3 - 7;
+        b[i] = 0;
+        i = i + 1;
+      end;
+    i = 0;
+    while (i < {size})
+      do
+        j = 0;
+        while (j < {size})
+          do
+            k = 0;
+            while (k <= j)
+              do
+                b[i] = b[i] + a[k] * a[j];
+                k = k + 1;
+              end;
+            j = j + 1;
+          end;
+        i = i + 1;
+      end;
+    s = 0;
+    i = {size} - 1;
+    while (0 <= i)
+      do
+        s = s + b[i];
+        i = i - 1;
+      end;
+    write(s);
+  end
+""".format(
+        size=size
+    )
+
+
+def _parse(source: str):
+    result = Parser().start(Scanner(io.StringIO(source)))
+    if not result.success:
+        raise Exception("Benchmark program failed to parse")
+    return result.ast
+
+
+def _timed(timings, name, func):
+    # As in timeit, collections are held off while timing: they would charge the
+    # garbage of earlier runs to whichever pass they interrupt
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def time_passes(source: str, repeat: int = 5):
+    """Time every semantic and code generation pass, averaged over `repeat` runs"""
+    timings = {}
+    for _ in range(repeat):
+        root = _parse(source)
+        context = CompilationContext()
+        for visitor in SemanticAnalyzer(context).visitors:
+            _timed(timings, type(visitor).__name__, lambda: root.accept(visitor))
+
+        generator = Generator(context)
+        for visitor in generator.passes + generator.visitors:
+            _timed(timings, type(visitor).__name__, lambda: root.accept(visitor))
+        # Passes run by the code generator over every function, included above
+        for name, seconds in generator.visitors[0].passes.timings.items():
+            timings["  " + name] = timings.get("  " + name, 0.0) + seconds
+        _timed(timings, "Prog.output", generator.prog.output)
+
+    return {name: total / repeat for name, total in timings.items()}
+
+
+def profile_generation(source: str, repeat: int = 5) -> tuple:
+    """Seconds taken to generate the code of `source` averaged over `repeat` runs,
+    and the peak memory allocated while generating it"""
+    timings = {}
+    for _ in range(repeat):
+        root = _parse(source)
+        context = CompilationContext()
+        SemanticAnalyzer(context).start(root)
+        generator = Generator(context)
+        _timed(timings, "gen", lambda: generator.start(root))
+
+    root = _parse(source)
+    context = CompilationContext()
+    SemanticAnalyzer(context).start(root)
+    tracemalloc.start()
+    try:
+        Generator(context).start(root)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return timings["gen"] / repeat, peak
+
+
+# Code generation options compared by --cycles, each adds optimization passes to
+# the previous configuration
+OPTIMIZATIONS = [
+    ("stack", []),
+    ("sharing", ["slot sharing"]),
+    ("registers", ["registers"]),
+    ("peephole", ["peephole"]),
+    ("folding", ["folding"]),
+    ("dead code", ["dead functions", "dead code"]),
+    ("loops", ["loops"]),
+    ("selection", ["selection"]),
+    ("inlining", ["inlining"]),
+    ("rotation", ["rotation"]),
+    ("unrolling", ["unrolling"]),
+    ("ordering", ["ordering"]),
+    ("evaluation", ["partial evaluation"]),
+    ("merging", ["merging"]),
+    ("tail calls", ["tail calls"]),
+]
+CONFIGURATIONS = OrderedDict()
+_enabled = []
+for _name, _passes in OPTIMIZATIONS:
+    _enabled = _enabled + _passes
+    CONFIGURATIONS[_name] = dict(level=0, enable=_enabled)
+
+
+def _generate(source: str, **options):
+    root = _parse(source)
+    context = CompilationContext()
+    SemanticAnalyzer(context).start(root)
+    generator = Generator(context, **options)
+    return generator, generator.start(root)
+
+
+def compile_source(source: str, **options) -> str:
+    """Moon executable for `source`, `options` are passed to `Generator`"""
+    return _generate(source, **options)[1]
+
+
+def peephole_hits(source: str) -> dict:
+    return _generate(source)[0].peephole.hits
+
+
+def inlined_calls(source: str) -> Counter:
+    """Calls inlined by the default configuration, by callee and caller"""
+    return Counter(_generate(source)[0].inliner.inlined)
+
+
+def evaluated_calls(source: str) -> Counter:
+    """Calls replaced by their value in the default configuration, by callee,
+    caller and value"""
+    return Counter(_generate(source)[0].evaluator.evaluated)
+
+
+def unrolled_loops(source: str) -> list:
+    """Loops unrolled by the default configuration as their function, trip count
+    and factor"""
+    return _generate(source)[0].unroller.unrolled
+
+
+def merged_functions(source: str) -> list:
+    """Functions merged by the default configuration with the function kept"""
+    return _generate(source)[0].merger.merged
+
+
+def frame_sizes(source: str) -> OrderedDict:
+    """Bytes of stack frame of every function before and after sharing its slots"""
+    functions = _generate(source)[0].prog.functions
+    return OrderedDict((func.name, func.frame) for func in functions)
+
+
+def run(executable: str, stdin: str = "") -> tuple:
+    """Run a moon executable with lib.m, returns what the simulator printed and
+    the number of cycles it took"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.m")
+        with open(path, "w") as f:
+            f.write(executable)
+        result = subprocess.run(
+            [MOON, path, LIBRARY], input=stdin, capture_output=True, text=True
+        )
+    cycles = re.search(r"(\d+) cycles\.", result.stdout)
+    if cycles is None:
+        raise Exception("Moon simulator failed:\n" + result.stdout + result.stderr)
+    output = result.stdout[: cycles.start()].splitlines(keepends=True)
+    output = "".join(line for line in output if not line.startswith("Loading "))
+    return output, int(cycles.group(1))
+
+
+def count_cycles(source: str, stdin: str = "") -> dict:
+    """Cycles taken by the program compiled with every configuration"""
+    return OrderedDict(
+        (name, run(compile_source(source, **options), stdin)[1])
+        for name, options in CONFIGURATIONS.items()
+    )
+
+
+def report_cycles(sources, stdin: str):
+    columns = "".join("{:>11}".format(name) for name in CONFIGURATIONS)
+    print("{:<36}{}".format("", columns))
+    hits = Counter()
+    inlined = Counter()
+    evaluated = Counter()
+    unrolled = OrderedDict()
+    merged = OrderedDict()
+    frames = OrderedDict()
+    for name, source in sources:
+        try:
+            cycles = list(count_cycles(source, stdin).values())
+        except Exception as e:
+            # A miscompiled program must not pass for a benchmark result
+            raise Exception("Benchmark of {} failed".format(name)) from e
+        hits.update(peephole_hits(source))
+        inlined.update(inlined_calls(source))
+        evaluated.update(evaluated_calls(source))
+        unrolled[name] = unrolled_loops(source)
+        merged[name] = merged_functions(source)
+        frames[name] = frame_sizes(source)
+        columns = "".join("{:11d}".format(c) for c in cycles)
+        change = 100 * (cycles[-1] / cycles[0] - 1)
+        print("{:<36}{} {:6.1f}%".format(name, columns, change))
+
+    print("\nPeephole rule hits")
+    for rule, count in hits.items():
+        print("  {:<20} {:6d}".format(rule, count))
+
+    print("\nInlined calls")
+    for (callee, caller), count in inlined.items():
+        print("  {:<20} {:<20} {:6d}".format(callee, "into " + caller, count))
+
+    print("\nEvaluated calls")
+    for (callee, caller, value), count in evaluated.items():
+        caller = "in " + caller
+        print("  {:<20} {:<20} {:>11} {:6d}".format(callee, caller, value, count))
+
+    print("\nUnrolled loops")
+    for name, loops in unrolled.items():
+        for func, trips, factor in loops:
+            print("  {:<30} {:<20} {:6d} trips by {}".format(name, func, trips, factor))
+
+    print("\nMerged functions")
+    for name, functions in merged.items():
+        for alias, func in functions:
+            print("  {:<30} {:<20} into {}".format(name, alias, func))
+
+    print("\nFrame sizes")
+    for name, sizes in frames.items():
+        print("  " + name)
+        for func, (before, after) in sizes.items():
+            print("    {:<30} {:6d} -> {:6d} bytes".format(func, before, after))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="COMP 442 compiler benchmarks")
+    parser.add_argument(
+        "FILE", nargs="*", type=argparse.FileType("r"), help="Source files to time"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also time a generated program with N classes and functions",
+    )
+    parser.add_argument(
+        "--large",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also time a generated program whose main function has N long statements",
+    )
+    parser.add_argument(
+        "--loops",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also time a generated program with nested loops over N elements",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Report the time and peak memory of code generation instead",
+    )
+    parser.add_argument(
+        "--cycles",
+        action="store_true",
+        help="Run the programs on the moon simulator and report their cycle counts",
+    )
+    parser.add_argument(
+        "--input", default="1\n", help="Standard input of the programs with --cycles"
+    )
+    args = parser.parse_args()
+
+    sources = [(f.name, f.read()) for f in args.FILE]
+    if args.synthetic:
+        name = "synthetic({})".format(args.synthetic)
+        sources.append((name, synthetic(args.synthetic)))
+    if args.large:
+        sources.append(("large({})".format(args.large), large_function(args.large)))
+    if args.loops:
+        sources.append(("loops({})".format(args.loops), nested_loops(args.loops)))
+
+    if args.cycles:
+        report_cycles(sources, args.input)
+        return
+
+    if args.memory:
+        for name, source in sources:
+            seconds, peak = profile_generation(source, args.repeat)
+            print(
+                "{:<36} {:9.3f} ms {:9.1f} KiB".format(name, seconds * 1000, peak / 1024)
+            )
+        return
+
+    for name, source in sources:
+        print(name)
+        for pass_name, seconds in time_passes(source, args.repeat).items():
+            print("  {:<16} {:9.3f} ms".format(pass_name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
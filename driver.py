@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
+from gen.passes import OPTIMIZATION_LEVELS, PASSES
 from phases import PhaseHandler, PHASES
 
 
-def run(f, phase):
-    handler = PhaseHandler(f, phase)
+def run(f, phase, jobs=1, level=2, enable=(), disable=(), stats=False):
+    handler = PhaseHandler(f, phase, jobs, level, enable, disable, stats)
     handler.run()
 
 
@@ -26,13 +27,59 @@ def main():
     parser.add_argument(
         "FILE", type=argparse.FileType("r"), help="Source file to compile"
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Type check and generate functions on JOBS processes",
+    )
+    parser.add_argument(
+        "-O",
+        dest="level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=2,
+        help="Optimization level, 2 by default",
+    )
+    parser.add_argument(
+        "--enable",
+        action="append",
+        default=[],
+        choices=PASSES,
+        metavar="PASS",
+        help="Run PASS whatever the optimization level, one of\n\t"
+        + "\n\t".join(PASSES),
+    )
+    parser.add_argument(
+        "--disable",
+        action="append",
+        default=[],
+        choices=PASSES,
+        metavar="PASS",
+        help="Never run PASS",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print the time spent in every optimization pass, the number of\n"
+        "instructions generated and an estimate of the cycles they run for",
+    )
     args = parser.parse_args()
     if args.PHASE not in PHASES:
         print('Invalid PHASE "{}".'.format(args.PHASE))
         parser.print_help()
         exit(1)
 
-    run(args.FILE, args.PHASE)
+    run(
+        args.FILE,
+        args.PHASE,
+        args.jobs,
+        args.level,
+        args.enable,
+        args.disable,
+        args.stats,
+    )
 
 
 if __name__ == "__main__":
@@ -1,17 +1,144 @@
-from sem.table import GLOBALS
+from collections import OrderedDict
+from typing import Dict, List
+
+from sem.context import CompilationContext
+from sem.parallel import fan_out, function_units
+from sem.table import Record, RecordType
 from syn.ast import ASTNode
 
+from .merging import FunctionMerger
 from .models import Prog
+from .passes import (
+    AST_PASSES,
+    enabled_passes,
+    FUNCTION_PASSES,
+    GENERATION_PASSES,
+    timed,
+)
+from .peephole import PeepholeOptimizer
 from .vis.code_gen import CodeGenerator
+from .vis.constant_folding import ConstantFolder
+from .vis.evaluation import PartialEvaluator
+from .vis.inlining import Inliner
+from .vis.reachability import DeadFunctionElimination
+from .vis.unrolling import LoopUnroller, UNROLL_FACTOR
+
+
+def _records(unit: ASTNode) -> List[Record]:
+    """Variables of the function defined by `unit`"""
+    if unit.record is None or unit.record.table is None:
+        return []
+    return [
+        record
+        for records in unit.record.table.entries.values()
+        for record in records
+        if record.record_type not in (RecordType.FUNCTION, RecordType.CLASS)
+    ]
 
 
 class Generator:
-    def __init__(self):
+    def __init__(
+        self,
+        context: CompilationContext,
+        jobs=1,
+        peephole=None,
+        unroll_factor=UNROLL_FACTOR,
+        level=2,
+        enable=(),
+        disable=(),
+    ):
+        """`peephole` names the peephole rules to apply, all of them by default.
+        Optimization `level` selects the passes in `OPTIMIZATION_LEVELS`, those in
+        `enable` are added to them and those in `disable` removed"""
         self.prog = Prog()
-        self.visitors = [CodeGenerator(self.prog)]
+        self.jobs = jobs
+        self.enabled = enabled_passes(level, enable, disable)
+        # Seconds spent in every pass, in the order they ran
+        self.timings: Dict[str, float] = OrderedDict()
+
+        # Whole program passes, run before generating the functions
+        self.evaluator = PartialEvaluator(context)
+        self.inliner = Inliner(context)
+        self.unroller = LoopUnroller(context, factor=unroll_factor)
+        self._ast_passes = [
+            (name, visitor)
+            for name, visitor in zip(
+                AST_PASSES,
+                (
+                    self.evaluator,
+                    self.inliner,
+                    ConstantFolder(context),
+                    self.unroller,
+                    DeadFunctionElimination(context),
+                ),
+            )
+            if name in self.enabled
+        ]
+        self.passes = [visitor for _, visitor in self._ast_passes]
+        disabled = [
+            name
+            for name in GENERATION_PASSES + FUNCTION_PASSES
+            if name not in self.enabled
+        ]
+        self.visitors = [CodeGenerator(context, self.prog, disabled)]
+        self.peephole = PeepholeOptimizer(
+            peephole if "peephole" in self.enabled else ()
+        )
+        self.merger = FunctionMerger()
 
     def start(self, root: ASTNode) -> str:
-        for visitor in self.visitors:
-            root.accept(visitor)
+        return self.generate(root).output()
+
+    def generate(self, root: ASTNode) -> Prog:
+        """Generate and optimize the program without formatting it"""
+        for name, visitor in self._ast_passes:
+            timed(self.timings, name, root.accept, visitor)
+        if self.jobs <= 1:
+            for visitor in self.visitors:
+                visitor.clear_timings()
+                root.accept(visitor)
+                self._add_timings(visitor.passes.timings)
+        else:
+            self._start_parallel(root)
+
+        if "peephole" in self.enabled:
+            timed(self.timings, "peephole", self.peephole.optimize, self.prog)
+        if "merging" in self.enabled:
+            timed(self.timings, "merging", self.merger.merge, self.prog)
+        return self.prog
+
+    def _add_timings(self, timings: Dict[str, float]):
+        for name, seconds in timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def _start_parallel(self, root: ASTNode):
+        """Generate every function on a process pool and merge them in declaration
+        order. Labels only depend on the symbol tables, so the output matches the
+        serial one"""
+        units = function_units(root)
+
+        def generate(i):
+            self.prog.clear()  # Workers are reused between units
+            timings = OrderedDict()
+            for visitor in self.visitors:
+                visitor.clear_timings()
+                units[i].accept(visitor)
+                for name, seconds in visitor.passes.timings.items():
+                    timings[name] = timings.get(name, 0.0) + seconds
+            # Stack slots shared while generating the function
+            offsets = [r.offset for r in _records(units[i])]
+            return (
+                list(self.prog.functions),
+                list(self.prog.constants.items()),
+                offsets,
+                timings,
+            )
 
-        return self.prog.output()
+        results = fan_out(generate, len(units), self.jobs)
+        for unit, (functions, constants, offsets, timings) in zip(units, results):
+            self._add_timings(timings)
+            self.prog.functions += functions
+            for tag, line in constants:
+                self.prog.constants.setdefault(tag, line)
+            for record, offset in zip(_records(unit), offsets):
+                record.offset = offset
@@ -0,0 +1,47 @@
+from typing import Iterable, List
+
+from gen.models import Line
+from gen.regalloc import compact, FORMATS, FunctionFlow, removed_line
+
+# Instructions kept even when the registers they write are not read
+SIDE_EFFECTS = {
+    "sw",
+    "sb",
+    "jl",
+    "jr",
+    "j",
+    "bz",
+    "bnz",
+    "hlt",
+    "entry",
+    "getc",
+    "putc",
+}
+# The stack pointer and return address are read by the caller
+PRESERVED = {"r14", "r15"}
+
+
+def _is_dead(flow: FunctionFlow, i: int) -> bool:
+    line = flow.lines[i]
+    if line.instruction in ("sw", "sb"):
+        slots = {d for d in flow.defs[i] if isinstance(d, int)}
+        return bool(slots) and not slots & (flow.escaped | flow.live_out[i])
+    roles = FORMATS[line.instruction]
+    if line.instruction in SIDE_EFFECTS or "d" not in roles and "x" not in roles:
+        return False
+    return not flow.defs[i] & (flow.live_out[i] | PRESERVED)
+
+
+def remove_dead_code(lines: List[Line], slots: Iterable[int]) -> List[Line]:
+    """Remove stores to the given stack slots which are never read afterwards, and
+    instructions computing values which are never used, until there are none"""
+    slots = list(slots)
+    while True:
+        flow = FunctionFlow(lines, slots)
+        dead = [i for i in range(len(lines)) if _is_dead(flow, i)]
+        if not dead:
+            return lines
+        kept: List = list(lines)
+        for i in dead:
+            kept[i] = removed_line(lines[i])
+        lines = compact(kept)
@@ -0,0 +1,74 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List
+
+from gen.models import Line
+from gen.regalloc import FORMATS, FunctionFlow, memory_operand
+
+
+class SharedSlots:
+    """Stack layout of a function in which slots that are never live at the same
+    time share the stack space of the first of them. Slots whose address is taken
+    or which are accessed from a pushed frame keep their own. Stack slots are
+    identified by their offset from r14, as in `FunctionFlow`."""
+
+    def __init__(self, lines: List[Line], slots: Iterable[int]):
+        flow = FunctionFlow(lines, slots)
+        candidates = flow.slots - flow.escaped - flow.overlapped
+        conflicts = {slot: set() for slot in candidates}
+        live_sets = [flow.live_out[i] | flow.defs[i] for i in range(len(lines))]
+        if lines:
+            live_sets.append(flow.live_in[0])
+        for live in live_sets:
+            live = live & candidates
+            for slot in live:
+                conflicts[slot] |= live - {slot}
+
+        colors: List[List[int]] = []
+        for slot in sorted(candidates, reverse=True):
+            for color in colors:
+                if not conflicts[slot].intersection(color):
+                    color.append(slot)
+                    break
+            else:
+                colors.append([slot])
+        self.shared: Dict[int, int] = {
+            slot: color[0] for color in colors for slot in color[1:]
+        }
+        self._removed = sorted(self.shared)
+
+    @property
+    def saved(self) -> int:
+        """Bytes of stack space reclaimed"""
+        return 4 * len(self._removed)
+
+    def moved(self, slot: int) -> int:
+        """Offset from r14 of `slot` once shared slots are removed from the frame"""
+        slot = self.shared.get(slot, slot)
+        return slot + 4 * (len(self._removed) - bisect_right(self._removed, slot))
+
+    def relocate(self, lines: List[Line]) -> List[Line]:
+        """Move the stack accesses of `lines` to the shared layout, along with the
+        frames pushed for calls which are placed right after it"""
+        if not self.shared:
+            return lines
+        out = []
+        frame = new_frame = 0
+        for line in lines:
+            args = list(line.args)
+            if args[:2] == ["r14", "r14"]:
+                step, new_step = int(args[2]), self.moved(int(args[2]))
+                args[2] = str(new_step)
+                sign = 1 if line.instruction == "addi" else -1
+                frame += sign * step
+                new_frame += sign * new_step
+            else:
+                for i, (role, arg) in enumerate(zip(FORMATS[line.instruction], args)):
+                    operand = memory_operand(arg) if role == "m" else None
+                    if operand is not None and operand[1] == "r14":
+                        offset = self.moved(operand[0] + frame) - new_frame
+                        args[i] = "{}(r14)".format(offset)
+                    elif arg == "r14" and line.instruction == "addi" and role == "u":
+                        # Address of a stack slot
+                        args[2] = str(self.moved(int(args[2]) + frame) - new_frame)
+            out.append(Line(line.instruction, args, line.symbol, line.comment))
+        return out
@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from gen.models import Line
+from gen.regalloc import FunctionFlow
+
+
+class BasicBlock:
+    """Lines of a function entered only at the first and left only after the last"""
+
+    def __init__(self, index: int, start: int, lines: List[Line]):
+        self.index = index
+        self.start = start  # Position of the first line in the function
+        self.lines = lines
+        self.successors: List[int] = []
+        self.predecessors: List[int] = []
+
+    @property
+    def label(self) -> Optional[str]:
+        return self.lines[0].symbol
+
+    def positions(self) -> range:
+        return range(self.start, self.start + len(self.lines))
+
+
+class ControlFlowGraph:
+    """Basic blocks of the code of a function, in program order, and the edges
+    between them. Moon instructions are already three-address code, the scalar
+    stack slots given act as its virtual registers: `flow` tells which registers
+    and slots each line defines and uses. Block 0 is the entry."""
+
+    def __init__(self, lines: List[Line], slots: Iterable[int] = ()):
+        self.flow = FunctionFlow(lines, slots)
+        starts = set(self.flow.leaders) if lines else set()
+        for i, successors in enumerate(self.flow.successors):
+            if i + 1 < len(lines) and i + 1 not in successors:
+                starts.add(i + 1)  # Only reached through a jump, if at all
+        starts = sorted(starts) + [len(lines)]
+
+        self.blocks: List[BasicBlock] = []
+        self._block_at: Dict[int, int] = {}
+        for start, end in zip(starts, starts[1:]):
+            self._block_at[start] = len(self.blocks)
+            self.blocks.append(BasicBlock(len(self.blocks), start, lines[start:end]))
+        for block in self.blocks:
+            last = block.start + len(block.lines) - 1
+            for s in self.flow.successors[last]:
+                block.successors.append(self._block_at[s])
+                self.blocks[self._block_at[s]].predecessors.append(block.index)
+
+    def lines(self) -> List[Line]:
+        """Code of the function, laid out in block order"""
+        return [line for block in self.blocks for line in block.lines]
+
+
+def liveness(cfg: ControlFlowGraph) -> Tuple[List[Set], List[Set]]:
+    """Registers and slots live on entry to and on exit from every block"""
+    flow = cfg.flow
+    uses, defs = [], []
+    for block in cfg.blocks:
+        used, defined = set(), set()
+        for i in reversed(block.positions()):
+            used = flow.uses[i] | (used - flow.defs[i])
+            defined |= flow.defs[i]
+        uses.append(used)
+        defs.append(defined)
+
+    live_in = [set() for _ in cfg.blocks]
+    live_out = [set() for _ in cfg.blocks]
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(cfg.blocks):
+            b = block.index
+            out = set()
+            for s in block.successors:
+                out |= live_in[s]
+            new_in = uses[b] | (out - defs[b])
+            if new_in != live_in[b] or out != live_out[b]:
+                live_in[b], live_out[b] = new_in, out
+                changed = True
+    return live_in, live_out
+
+
+def reaching_definitions(cfg: ControlFlowGraph) -> List[Set[int]]:
+    """Positions of the lines whose definitions reach the start of every block"""
+    flow = cfg.flow
+    definitions: Dict[object, Set[int]] = {}
+    for i, defined in enumerate(flow.defs):
+        for name in defined:
+            definitions.setdefault(name, set()).add(i)
+    gen, kill = [], []
+    for block in cfg.blocks:
+        generated: Dict[object, int] = {}
+        for i in block.positions():
+            for name in flow.defs[i]:
+                generated[name] = i
+        gen.append(set(generated.values()))
+        kill.append(set().union(*(definitions[name] for name in generated)))
+
+    reach_in = [set() for _ in cfg.blocks]
+    reach_out = [set(g) for g in gen]
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.blocks:
+            b = block.index
+            new_in = set().union(*(reach_out[p] for p in block.predecessors))
+            new_out = gen[b] | (new_in - kill[b])
+            if new_in != reach_in[b] or new_out != reach_out[b]:
+                reach_in[b], reach_out[b] = new_in, new_out
+                changed = True
+    return reach_in
+
+
+def dominators(cfg: ControlFlowGraph) -> List[Set[int]]:
+    """Blocks dominating every block, blocks never reached only dominate
+    themselves"""
+    reached = set()
+    pending = [0] if cfg.blocks else []
+    while pending:
+        b = pending.pop()
+        if b not in reached:
+            reached.add(b)
+            pending.extend(cfg.blocks[b].successors)
+    dom = [set(reached) if b in reached else {b} for b in range(len(cfg.blocks))]
+    if cfg.blocks:
+        dom[0] = {0}
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.blocks[1:]:
+            b = block.index
+            if b not in reached:
+                continue
+            preds = [dom[p] for p in block.predecessors if p in reached]
+            new = {b} | (set.intersection(*preds) if preds else set())
+            if new != dom[b]:
+                dom[b] = new
+                changed = True
+    return dom
+
+
+def loop_depths(cfg: ControlFlowGraph) -> List[int]:
+    """Number of natural loops every block is part of. A loop is closed by an
+    edge to a block which dominates its source, its header."""
+    dom = dominators(cfg)
+    depths = [0] * len(cfg.blocks)
+    for block in cfg.blocks:
+        for header in block.successors:
+            if header not in dom[block.index]:
+                continue
+            body = {header}
+            pending = [block.index]
+            while pending:
+                b = pending.pop()
+                if b not in body:
+                    body.add(b)
+                    pending.extend(cfg.blocks[b].predecessors)
+            for b in body:
+                depths[b] += 1
+    return depths
+
+
+# Analyses which can be run on a control flow graph by name
+ANALYSES = {
+    "liveness": liveness,
+    "reaching definitions": reaching_definitions,
+    "dominators": dominators,
+    "loop depths": loop_depths,
+}
@@ -0,0 +1,488 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from gen.models import Line
+from gen.peephole import CONTROL, IMMEDIATE_RANGE, immediate_form, is_immediate
+from gen.regalloc import (
+    BRANCHES,
+    compact,
+    copy_line,
+    FORMATS,
+    FunctionFlow,
+    implicit_uses,
+    memory_operand,
+    REGISTERS,
+    removed_line,
+    substitute,
+)
+
+# Instructions without side effects which cannot fail, and may execute once before
+# a loop instead of on every iteration
+INVARIANT = {"add", "sub", "mul", "and", "or", "not", "lw"}
+INVARIANT |= {op + "i" for op in ("add", "sub", "mul", "and", "or")}
+INVARIANT |= {
+    op + suffix
+    for op in ("ceq", "cne", "clt", "cgt", "cle", "cge")
+    for suffix in ("", "i")
+}
+
+
+class LoopOptimizer:
+    """Optimizes the loops of a function, innermost first. Instructions computing
+    the same value on every iteration are hoisted before the loop, and addresses
+    of array elements indexed by a variable stepping by a constant are computed
+    from a pointer stepping along with it. Loads of the given stack slots are
+    invariant when the loop never stores into them."""
+
+    def __init__(self, lines: List[Line], slots: Iterable[int]):
+        self.lines = lines
+        self.slots = list(slots)
+        self.hoisted = 0
+        self.reduced = 0
+
+    def optimize(self) -> List[Line]:
+        done = set()
+        while True:
+            self._analyze()
+            loop = next(
+                (
+                    (h, t)
+                    for h, t in self._loops()
+                    if self.lines[h].symbol not in done
+                ),
+                None,
+            )
+            if loop is None:
+                return self.lines
+            header = self.lines[loop[0]].symbol
+            done.add(header)
+            if self._well_formed(*loop) and self._hoist(*loop):
+                self._analyze()
+                loop = self._loop(header)
+            if loop is not None and self._well_formed(*loop):
+                self._reduce(*loop)
+
+    def _analyze(self):
+        self.flow = FunctionFlow(self.lines, self.slots)
+        self.frames = []  # Displacement of r14 before each line
+        frame = 0
+        for line in self.lines:
+            self.frames.append(frame)
+            if line.args[:2] == ["r14", "r14"]:
+                step = int(line.args[2])
+                frame += step if line.instruction == "addi" else -step
+
+    def _loops(self) -> List[Tuple[int, int]]:
+        """Header and last line of every loop, innermost first"""
+        loops = [
+            (s, i)
+            for i, successors in enumerate(self.flow.successors)
+            for s in successors
+            if s <= i
+        ]
+        return sorted(loops, key=lambda loop: loop[1] - loop[0])
+
+    def _loop(self, header: str) -> Optional[Tuple[int, int]]:
+        return next(
+            ((h, t) for h, t in self._loops() if self.lines[h].symbol == header),
+            None,
+        )
+
+    def _well_formed(self, h: int, t: int) -> bool:
+        """Only entered by falling through the header, with no frame pushed"""
+        if self.frames[h] or not self.lines[h].symbol:
+            return False
+        for i, successors in enumerate(self.flow.successors):
+            if h <= i <= t:
+                continue
+            for s in successors:
+                if h <= s <= t and (s != h or i != h - 1):
+                    return False
+        return True
+
+    def _free_registers(self, h: int, t: int) -> List[str]:
+        """Registers neither accessed nor live in the loop"""
+        flow = self.flow
+        busy = set()
+        for i in range(h, t + 1):
+            busy |= flow.live_in[i] | flow.live_out[i] | flow.defs[i] | flow.uses[i]
+        return [r for r in REGISTERS if r not in busy]
+
+    def _invariant(self, i: int, line: Line, defs: Counter) -> bool:
+        """Whether `line`, found at line `i`, computes the same value on every
+        iteration"""
+        if line.instruction not in INVARIANT or line.args[0] in ("r0", "r14", "r15"):
+            return False
+        for role, arg in zip(FORMATS[line.instruction][1:], line.args[1:]):
+            if role == "m":
+                offset, base = memory_operand(arg)
+                if (
+                    base != "r14"
+                    or self.frames[i]
+                    or offset not in self.flow.slots
+                    or offset in self.flow.escaped | self.flow.overlapped
+                    or defs[offset]
+                ):
+                    return False
+            elif role == "u" and arg != "r0" and defs[arg]:
+                if arg != "r14" or self.frames[i]:
+                    return False
+        return True
+
+    def _needs_copy(self, i: int, t: int, register: str) -> bool:
+        """Whether the value `register` gets at line `i` is read after its block
+        or by an instruction which cannot be rewritten"""
+        flow = self.flow
+        j = i
+        while j < t and j + 1 not in flow.leaders:
+            j += 1
+            if "x" in FORMATS[self.lines[j].instruction] and register in (
+                self.lines[j].args
+            ):
+                return True
+            if register in implicit_uses(self.lines[j]):
+                return True
+            if register in flow.defs[j]:
+                return False
+        return register in flow.live_out[j]
+
+    def _hoist(self, h: int, t: int) -> bool:
+        flow = self.flow
+        body = range(h, t + 1)
+        defs = Counter(d for i in body for d in flow.defs[i])
+        # Instructions repeated in the loop, as unrolled loops do
+        repeated = Counter(
+            (self.lines[i].instruction, *self.lines[i].args) for i in body
+        )
+        moved = set()
+        exits = {s for i in body for s in flow.successors[i] if not h <= s <= t}
+        live_at_exits = set().union(*(flow.live_in[s] for s in exits))
+        free = self._free_registers(h, t)
+        lines: List[Optional[Line]] = list(self.lines)
+        preheader: List[Line] = []
+        computed: Dict[tuple, str] = {}
+        current: Dict[str, str] = {}  # Registers last set by a hoisted instruction
+        constants: Dict[str, str] = {}  # Registers last set to a constant
+        for i in body:
+            if i in flow.leaders:
+                current, constants = {}, {}
+            line = lines[i]
+            for register, hoisted in current.items():
+                line = substitute(line, register, hoisted)
+            if (
+                line.instruction == "addi"
+                and line.args[1] == "r0"
+                and is_immediate(line.args[2])
+            ):
+                # Constants are left for immediate operands
+                lines[i] = line
+                current.pop(line.args[0], None)
+                constants[line.args[0]] = line.args[2]
+                continue
+            candidate = line
+            for register, value in constants.items():
+                if register in candidate.args[1:]:
+                    candidate = immediate_form(candidate, register, value)
+                    if candidate is None or not is_immediate(value):
+                        candidate = line
+                        break
+            if not self._invariant(i, candidate, defs):
+                lines[i] = line
+                for register in flow.defs[i]:
+                    current.pop(register, None)
+                    constants.pop(register, None)
+                continue
+
+            target = candidate.args[0]
+            constants.pop(target, None)
+            key = (candidate.instruction, tuple(candidate.args[1:]))
+            instruction = (candidate.instruction, *candidate.args)
+            if instruction in moved:
+                lines[i] = removed_line(line)
+                continue
+            if (
+                (defs[target] == 1 or defs[target] == repeated[instruction] > 1)
+                and target not in flow.live_in[h]
+                and target not in live_at_exits
+            ):
+                # Only set by this instruction, which moves as it is
+                defs[target] = 0
+                moved.add(instruction)
+                preheader.append(Line(candidate.instruction, candidate.args))
+                lines[i] = removed_line(line)
+                continue
+            if key not in computed:
+                if not free:
+                    lines[i] = line
+                    current.pop(target, None)
+                    continue
+                computed[key] = free.pop(0)
+                preheader.append(Line(key[0], [computed[key], *key[1]]))
+            current[target] = computed[key]
+            if self._needs_copy(i, t, target):
+                lines[i] = copy_line(line, computed[key], target)
+            else:
+                lines[i] = removed_line(line)
+
+        if not preheader:
+            return False
+        self.hoisted += len(preheader)
+        self.lines = compact(lines[:h] + preheader + lines[h:])
+        return True
+
+    def _local_def(self, j: int, register: str) -> Optional[int]:
+        """Last line of the block of line `j` defining `register` before it"""
+        for k in range(j - 1, -1, -1):
+            if register in self.flow.defs[k]:
+                return k
+            if k in self.flow.leaders:
+                return None
+        return None
+
+    def _constant(self, j: int, register: str) -> Optional[int]:
+        """Value of `register` at line `j` when set to a constant in its block"""
+        if register == "r0":
+            return 0
+        k = self._local_def(j, register)
+        if k is None:
+            return None
+        line = self.lines[k]
+        if line.instruction == "addi" and line.args[1] == "r0":
+            if is_immediate(line.args[2]):
+                return int(line.args[2])
+        return None
+
+    def _increment(self, k: int) -> Optional[Tuple[str, int]]:
+        """Register and constant whose sum line `k` computes"""
+        line = self.lines[k]
+        if line.instruction in ("addi", "subi") and line.args[1] != "r0":
+            constant = int(line.args[2])
+            return line.args[1], -constant if line.instruction == "subi" else constant
+        if line.instruction == "lw":
+            stored = self._stored(k)
+            return None if stored is None else (stored, 0)
+        if line.instruction not in ("add", "sub"):
+            return None
+        lhs, rhs = line.args[1:]
+        constant = self._constant(k, rhs)
+        if constant is not None:
+            return lhs, -constant if line.instruction == "sub" else constant
+        constant = self._constant(k, lhs)
+        if constant is not None and line.instruction == "add":
+            return rhs, constant
+        return None
+
+    def _stored(self, k: int) -> Optional[str]:
+        """Register stored at the address line `k` loads from earlier in its block"""
+        flow = self.flow
+        for q in range(k - 1, -1, -1):
+            line = self.lines[q]
+            if line.instruction in ("sw", "sb") or q in flow.calls:
+                if line.instruction != "sw" or line.args[0] != self.lines[k].args[1]:
+                    return None
+                source = line.args[1]
+                if any(source in flow.defs[p] for p in range(q, k)):
+                    return None
+                return source
+            if "r14" in flow.defs[q] or q in flow.leaders:
+                return None
+        return None
+
+    def _affine(self, j: int, register: str) -> Tuple[str, int]:
+        """Register and constant whose sum `register` holds at line `j`"""
+        flow = self.flow
+        affine = register, 0
+        offset = 0
+        k = j
+        while True:
+            k = self._local_def(k, register)
+            increment = None if k is None else self._increment(k)
+            if increment is None:
+                return affine
+            source, constant = increment
+            register, offset = source, offset + constant
+            # Registers copied from may be redefined, the sum only holds for those
+            # which are not by line `j`
+            if not any(register in flow.defs[q] for q in range(k, j)):
+                affine = register, offset
+
+    def _induction_variables(self, h: int, t: int) -> Dict[str, Tuple[int, int]]:
+        """Line and step of the registers only incremented by a constant"""
+        flow = self.flow
+        definitions: Dict[str, List[int]] = {}
+        for i in range(h, t + 1):
+            for register in flow.defs[i]:
+                definitions.setdefault(register, []).append(i)
+        variables = {}
+        for register, lines in definitions.items():
+            increment = self._increment(lines[0])
+            if len(lines) != 1 or register == "r14" or increment is None:
+                continue
+            base, offset = self._affine(lines[0], increment[0])
+            step = offset + increment[1]
+            if base == register and step:
+                variables[register] = (lines[0], step)
+        return variables
+
+    def _reduce(self, h: int, t: int):
+        flow = self.flow
+        variables = self._induction_variables(h, t)
+        if not variables:
+            return
+        defined = {d for i in range(h, t + 1) for d in flow.defs[i]}
+        free = self._free_registers(h, t)
+        lines: List[Line] = list(self.lines)
+        pointers: Dict[tuple, str] = {}
+        preheader: List[Line] = []
+        steps: Dict[int, List[Line]] = {}
+        for s in range(h, t + 1):
+            line = lines[s]
+            if line.instruction != "sub":
+                continue
+            address, base, scaled = line.args
+            if base in defined or base in ("r0", "r14"):
+                continue
+            m = self._local_def(s, scaled)
+            if m is None or lines[m].instruction != "muli":
+                continue
+            variable, offset = self._affine(m, lines[m].args[1])
+            if variable not in variables:
+                continue
+            k, step = variables[variable]
+            size = int(lines[m].args[2])
+            if m <= k < s or (
+                -step * size not in IMMEDIATE_RANGE
+                or -offset * size not in IMMEDIATE_RANGE
+            ):
+                continue
+            key = (base, variable, size)
+            if key not in pointers:
+                if not free:
+                    continue
+                pointer = pointers[key] = free.pop(0)
+                preheader.append(Line("muli", [pointer, variable, str(size)]))
+                preheader.append(Line("sub", [pointer, base, pointer]))
+                steps.setdefault(k, []).append(
+                    Line("addi", [pointer, pointer, str(-step * size)])
+                )
+            pointer, constant = pointers[key], -offset * size
+            if self._fold_address(lines, s, t, k, address, pointer, constant):
+                lines[s] = removed_line(line)
+            else:
+                lines[s] = Line(
+                    "addi",
+                    [address, pointer, str(constant)],
+                    symbol=line.symbol,
+                    comment=line.comment,
+                )
+            self.reduced += 1
+
+        if not preheader:
+            return
+        out = lines[:h] + preheader
+        for i in range(h, len(lines)):
+            out.append(lines[i])
+            out += steps.get(i, [])
+        self.lines = compact(out)
+
+    def _fold_address(
+        self, lines, s: int, t: int, k: int, address: str, pointer: str, constant: int
+    ) -> bool:
+        """Access memory relative to `pointer` in place of the `address` computed
+        at line `s`, when it is only used as a base until the pointer steps"""
+        flow = self.flow
+        rewritten = {}
+        j = s
+        while address not in flow.defs[j] or j == s:
+            if j in (k, t) or j + 1 in flow.leaders:
+                if address in flow.live_out[j]:
+                    return False
+                break
+            j += 1
+            line = lines[j]
+            args = []
+            for role, arg in zip(FORMATS[line.instruction], line.args):
+                if role == "m":
+                    offset, base = memory_operand(arg)
+                    if base == address:
+                        if offset + constant not in IMMEDIATE_RANGE:
+                            return False
+                        arg = "{}({})".format(offset + constant, pointer)
+                elif role in "ux" and arg == address:
+                    return False
+                args.append(arg)
+            args += line.args[len(args) :]
+            rewritten[j] = Line(line.instruction, args, line.symbol, line.comment)
+        for j, line in rewritten.items():
+            lines[j] = line
+        return True
+
+
+def optimize_loops(lines: List[Line], slots: Iterable[int]) -> List[Line]:
+    """Hoist loop invariant code and step array element pointers in the loops"""
+    return LoopOptimizer(lines, slots).optimize()
+
+
+# Most lines of a loop condition copied to the bottom of the loop by `rotate_loops`
+ROTATION_BUDGET = 8
+
+
+def _rotated(lines: List[Line], h: int) -> Optional[List[Line]]:
+    """Lines with the loop whose header is at `h` rotated, None unless the header
+    is a condition of at most `ROTATION_BUDGET` lines branching past the jump back
+    to it, which is the only reference to its label"""
+    header = lines[h].symbol
+    c = h
+    while c < len(lines) and lines[c].instruction not in CONTROL:
+        c += 1
+        if c < len(lines) and lines[c].symbol:
+            return None
+    if c == len(lines) or c - h > ROTATION_BUDGET:
+        return None
+    branch = lines[c]
+    if branch.instruction not in BRANCHES:
+        return None
+    register, done = branch.args
+    jumps = [i for i, line in enumerate(lines) if header in line.args]
+    if len(jumps) != 1:
+        return None
+    t = jumps[0]
+    if (
+        t <= c
+        or lines[t].instruction != "j"
+        or t + 1 == len(lines)
+        or lines[t + 1].symbol != done
+    ):
+        return None
+
+    inverted = "bnz" if branch.instruction == "bz" else "bz"
+    bottom = [Line(l.instruction, l.args, None, l.comment) for l in lines[h:c]]
+    bottom.append(Line(inverted, [register, header + "body"], None, branch.comment))
+    if lines[t].symbol:
+        # Branches to the jump back now reach the condition replacing it
+        bottom[0].symbol = lines[t].symbol
+    body = lines[c + 1 : t] + bottom
+    top = body[0]
+    if top.symbol:
+        # Jump to the label already there
+        bottom[-1].args[1] = top.symbol
+    else:
+        body[0] = Line(top.instruction, top.args, header + "body", top.comment)
+    return lines[: c + 1] + body + lines[t + 1 :]
+
+
+def rotate_loops(lines: List[Line], slots: Iterable[int] = ()) -> List[Line]:
+    """Test the condition of `while` loops at the bottom, behind a copy of it
+    guarding the entry of the loop, so that iterations take one conditional branch
+    instead of a branch out of the loop and a jump back to its header"""
+    rotated = set()
+    i = 0
+    while i < len(lines):
+        symbol = lines[i].symbol
+        if symbol and symbol not in rotated:
+            rotated.add(symbol)
+            new = _rotated(lines, i)
+            if new is not None:
+                lines = new
+        i += 1
+    return lines
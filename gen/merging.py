@@ -0,0 +1,54 @@
+from typing import Dict, List, Tuple
+
+from gen.models import Function, Prog
+
+
+def _normalized(func: Function) -> Tuple:
+    """Lines of a function without their comments and with the labels it defines
+    replaced by the order they are defined in, so that functions differing only by
+    their name compare equal"""
+    labels = {}
+    for line in func.lines:
+        if line.symbol:
+            labels[line.symbol] = "@{}".format(len(labels))
+    return tuple(
+        (
+            labels.get(line.symbol),
+            line.instruction,
+            tuple(labels.get(arg, arg) for arg in line.args),
+        )
+        for line in func.lines
+    )
+
+
+class FunctionMerger:
+    """Keeps one body for the functions whose code is identical, such as accessors
+    at the same offset of different classes. Calls to the others jump to the body
+    kept, which lists them as its aliases. Merging is repeated as long as it makes
+    more callers identical. Every function merged is reported in `merged` as its
+    name and the name of the function kept."""
+
+    def __init__(self):
+        self.merged: List[Tuple[str, str]] = []
+
+    def merge(self, prog: Prog):
+        while self._merge(prog):
+            pass
+
+    def _merge(self, prog: Prog) -> bool:
+        kept: Dict[Tuple, Function] = {}
+        renamed: Dict[str, str] = {}
+        for func in prog.functions:
+            original = kept.setdefault(_normalized(func), func)
+            if original is not func:
+                renamed[func.name] = original.name
+                original.aliases += [func.name] + func.aliases
+                self.merged.append((func.name, original.name))
+        if not renamed:
+            return False
+        prog.functions[:] = [f for f in prog.functions if f.name not in renamed]
+        for func in prog.functions:
+            for line in func.lines:
+                if any(arg in renamed for arg in line.args):
+                    line.args = [renamed.get(arg, arg) for arg in line.args]
+        return True
@@ -1,6 +1,7 @@
+import io
 from collections import OrderedDict
 from itertools import chain
-from typing import List, Dict
+from typing import List, Dict, Optional, TextIO, Tuple, Union
 
 
 class Line:
@@ -21,17 +22,85 @@ class Line:
         return out.rstrip()
 
 
+class Code:
+    """Instructions generated for an AST node. Appending the code of another node
+    links it instead of copying its lines, which are only gathered once by
+    `release`"""
+
+    __slots__ = ("_parts",)
+
+    def __init__(self):
+        self._parts: List[Union[Line, "Code"]] = []
+
+    def append(self, line: Line):
+        self._parts.append(line)
+
+    def __iadd__(self, other):
+        if isinstance(other, Code):
+            self._parts.append(other)
+        else:
+            self._parts.extend(other)
+        return self
+
+    def __bool__(self) -> bool:
+        """Whether the code has any line"""
+        return self.first() is not None
+
+    def first(self) -> Optional[Line]:
+        for part in self._parts:
+            line = part.first() if isinstance(part, Code) else part
+            if line is not None:
+                return line
+        return None
+
+    def last(self) -> Optional[Line]:
+        for part in reversed(self._parts):
+            line = part.last() if isinstance(part, Code) else part
+            if line is not None:
+                return line
+        return None
+
+    def release(self) -> List[Line]:
+        """Lines of the code in order, emptying it and the code it links"""
+        lines = []
+        stack = [iter(self._take())]
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, Code):
+                    stack.append(iter(part._take()))
+                    break
+                lines.append(part)
+            else:
+                stack.pop()
+        return lines
+
+    def _take(self) -> List[Union[Line, "Code"]]:
+        parts, self._parts = self._parts, []
+        return parts
+
+
 class Function:
     def __init__(self, name, lines=None):
         self.name = name
         self.lines: List[Line] = lines or []
+        # Functions merged into this one, which are called through its label
+        self.aliases: List[str] = []
+        # Bytes of stack frame before and after its slots are shared
+        self.frame: Tuple[int, int] = (0, 0)
 
     def format(self, max_size) -> str:
-        out = " % begin function {name} definition\n".format(name=self.name)
-        for line in self.lines:
-            out += line.format(max_size) + "\n"
+        out = io.StringIO()
+        self.write(out, max_size)
+        return out.getvalue()
 
-        return out + " % end function {name} definition\n".format(name=self.name)
+    def write(self, stream: TextIO, max_size):
+        stream.write(" % begin function {name} definition\n".format(name=self.name))
+        for alias in self.aliases:
+            stream.write(" % alias {alias}\n".format(alias=alias))
+        for line in self.lines:
+            stream.write(line.format(max_size))
+            stream.write("\n")
+        stream.write(" % end function {name} definition\n".format(name=self.name))
 
 
 class Prog:
@@ -39,6 +108,10 @@ class Prog:
         self.functions: List[Function] = []
         self.constants: Dict[str, Line] = OrderedDict()
 
+    def clear(self):
+        self.functions.clear()
+        self.constants.clear()
+
     def reserve(self, tag, size, comment=None):
         if tag in self.constants:
             return
@@ -49,20 +122,29 @@ class Prog:
             return
         self.constants[tag] = Line("db", value, symbol=tag, comment=comment)
 
-    def output(self) -> str:
-        executable = ""
+    def symbol_width(self) -> int:
+        """Width of the symbol column, which fits the longest label"""
         max_size = max(
             (len(l.symbol) for f in self.functions for l in f.lines if l.symbol),
             default=1,
         )
-        max_size = max(max_size, 7)
+        return max(max_size, 7)
+
+    def write(self, stream: TextIO):
+        """Write the executable to `stream` one line at a time"""
+        max_size = self.symbol_width()
         for func in self.functions:
-            executable += func.format(max_size) + "\n"
+            func.write(stream, max_size)
+            stream.write("\n")
 
-        executable += " % Constants\n"
-        executable += " " * max_size + "  align\n"
+        stream.write(" % Constants\n")
+        stream.write(" " * max_size + "  align\n")
 
         for line in self.constants.values():
-            executable += line.format(max_size) + "\n"
+            stream.write(line.format(max_size))
+            stream.write("\n")
 
-        return executable
+    def output(self) -> str:
+        executable = io.StringIO()
+        self.write(executable)
+        return executable.getvalue()
@@ -1,15 +1,37 @@
 import re
+from typing import Dict
+
+from .models import Prog
+from .passes import estimate
 
 EXTENSION = re.compile(r"\.src$")
+BUFFER_SIZE = 1 << 16
 
 
 class ExecutableOutput:
     def __init__(self, source_file):
-        self.__moon_file = open(EXTENSION.sub(".moon", source_file), "w")
+        self.__moon_file = open(
+            EXTENSION.sub(".moon", source_file), "w", buffering=BUFFER_SIZE
+        )
 
-    def write(self, executable: str):
-        self.__moon_file.write(executable)
+    def emit(self, prog: Prog):
+        """Stream the lines of `prog` to the file as they are formatted"""
+        prog.write(self.__moon_file)
         self.__moon_file.close()
 
     def collect_files(self):
         return [self.__moon_file.name]
+
+
+def summary(timings: Dict[str, float], prog: Prog) -> str:
+    """Time spent in every optimization pass, the size of the generated code and
+    an estimate of the cycles it runs for"""
+    instructions, cycles = estimate(prog)
+    out = "Optimization passes:\n"
+    for name, seconds in timings.items():
+        out += "\t{:16} {:8.2f} ms\n".format(name, seconds * 1000)
+    if not timings:
+        out += "\tNone\n"
+    out += "Instructions: {}\n".format(instructions)
+    out += "Estimated cycles: {}\n".format(cycles)
+    return out
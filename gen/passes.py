@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from gen.ir import ANALYSES, ControlFlowGraph, loop_depths
+from gen.models import Line, Prog
+
+Pass = Callable[[List[Line], List[int]], List[Line]]
+
+# Optimization passes in the order they run: over the AST of the whole program,
+# while generating the code of every function, over that code, then over the
+# generated program
+AST_PASSES = [
+    "partial evaluation",
+    "inlining",
+    "folding",
+    "unrolling",
+    "dead functions",
+]
+GENERATION_PASSES = ["ordering", "tail calls"]
+FUNCTION_PASSES = [
+    "dead code",
+    "registers",
+    "loops",
+    "rotation",
+    "selection",
+    "slot sharing",
+]
+PASSES = AST_PASSES + GENERATION_PASSES + FUNCTION_PASSES + ["peephole", "merging"]
+
+# Passes enabled at every optimization level
+OPTIMIZATION_LEVELS = {
+    0: set(),
+    1: {
+        "folding",
+        "dead functions",
+        "ordering",
+        "tail calls",
+        "dead code",
+        "registers",
+        "selection",
+        "peephole",
+    },
+    2: set(PASSES),
+}
+
+# Cycles taken by the moon simulator to fetch an instruction and to access memory
+FETCH_CYCLES = 10
+MEMORY_CYCLES = 10
+MEMORY_INSTRUCTIONS = {"lw", "lb", "sw", "sb"}
+# Times the body of a loop is assumed to run when estimating cycles
+LOOP_TRIPS = 10
+
+
+def enabled_passes(level: int, enable=(), disable=()) -> Set[str]:
+    """Passes run at optimization `level`, along with the passes in `enable`
+    and without those in `disable`"""
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError("Unknown optimization level: {}".format(level))
+    unknown = [name for name in list(enable) + list(disable) if name not in PASSES]
+    if unknown:
+        raise ValueError("Unknown passes: " + ", ".join(unknown))
+    return (OPTIMIZATION_LEVELS[level] | set(enable)) - set(disable)
+
+
+def timed(timings: Dict[str, float], name: str, func, *args):
+    """Result of `func(*args)`, the time it took is added to `timings[name]`"""
+    start = time.perf_counter()
+    result = func(*args)
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+    return result
+
+
+def estimate(prog: Prog) -> Tuple[int, int]:
+    """Number of instructions of `prog` and the cycles it takes to run them once,
+    counting every loop as running `LOOP_TRIPS` times"""
+    instructions = cycles = 0
+    for func in prog.functions:
+        cfg = ControlFlowGraph(func.lines)
+        for block, depth in zip(cfg.blocks, loop_depths(cfg)):
+            for line in block.lines:
+                instructions += 1
+                cost = FETCH_CYCLES
+                if line.instruction in MEMORY_INSTRUCTIONS:
+                    cost += MEMORY_CYCLES
+                cycles += cost * LOOP_TRIPS ** depth
+    return instructions, cycles
+
+
+class PassManager:
+    """Pipeline of named passes run over the code of every function. A pass is
+    called with the lines of a function and its scalar stack slots, and returns
+    the new lines. Passes can be disabled by name, and the time spent in every
+    pass and analysis is accumulated in `timings`."""
+
+    def __init__(self, passes: Iterable = (), disabled: Iterable[str] = ()):
+        self.passes: List = list(passes)
+        self.disabled: Set[str] = set(disabled)
+        self.timings: Dict[str, float] = OrderedDict()
+
+    def add(self, name: str, run: Pass):
+        self.passes.append((name, run))
+
+    def names(self) -> List[str]:
+        return list(OrderedDict.fromkeys(name for name, _ in self.passes))
+
+    def run(self, lines: List[Line], slots: Iterable[int]) -> List[Line]:
+        slots = list(slots)
+        for name, run in self.passes:
+            if name not in self.disabled:
+                lines = timed(self.timings, name, run, lines, slots)
+        return lines
+
+    def analyze(self, name: str, cfg: ControlFlowGraph):
+        """Result of the analysis called `name` in `ANALYSES`"""
+        return timed(self.timings, name, ANALYSES[name], cfg)
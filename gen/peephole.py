@@ -0,0 +1,287 @@
+from collections import Counter, OrderedDict
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from gen.models import Line, Prog
+from gen.regalloc import FORMATS, FunctionFlow, memory_operand
+
+IMMEDIATE_FORMS = {
+    "add",
+    "sub",
+    "mul",
+    "div",
+    "mod",
+    "and",
+    "or",
+    "ceq",
+    "cne",
+    "clt",
+    "cgt",
+    "cle",
+    "cge",
+}
+COMMUTATIVE = {"add", "mul", "and", "or", "ceq", "cne"}
+MIRRORED = {"clt": "cgt", "cgt": "clt", "cle": "cge", "cge": "cle"}
+CONTROL = {"j", "jl", "jr", "bz", "bnz", "hlt"}
+# Immediate operands are 16 bit signed integers
+IMMEDIATE_RANGE = range(-(2 ** 15), 2 ** 15)
+
+
+def is_immediate(value: str) -> bool:
+    try:
+        return int(value) in IMMEDIATE_RANGE
+    except ValueError:
+        return False  # Label
+
+
+class Window:
+    """Lines of a function starting at the line a rule is matched on"""
+
+    def __init__(self, lines: List[Line], protected: Iterable[str]):
+        self.lines = lines
+        self.flow = FunctionFlow(lines, ())
+        self.protected = set(protected)  # Labels referenced by other functions
+        self.renames = {}
+        self.start = 0
+
+    def __getitem__(self, j: int) -> Optional[Line]:
+        if self.start + j < len(self.lines):
+            return self.lines[self.start + j]
+        return None
+
+    def dead_after(self, j: int, register: str) -> bool:
+        return register not in self.flow.live_out[self.start + j]
+
+    def rename(self, label: str, replacement: str):
+        """Make jumps to `label` go to `replacement`"""
+        self.renames[label] = replacement
+
+
+Match = Optional[Tuple[int, List[Line]]]  # Lines matched, replacement lines
+
+
+def redundant_nop(w: Window) -> Match:
+    """Drop nops, moving their label to the next line"""
+    nop, following = w[0], w[1]
+    if nop.instruction != "nop" or nop.args:
+        return None
+    if nop.symbol is None:
+        return 1, []
+    if following is None or nop.symbol in w.protected:
+        return None
+    if following.symbol is None:
+        following = Line(
+            following.instruction, following.args, nop.symbol, following.comment
+        )
+        return 2, [following]
+    w.rename(nop.symbol, following.symbol)
+    return 1, []
+
+
+def jump_to_next(w: Window) -> Match:
+    """`j L` directly followed by `L`"""
+    jump, following = w[0], w[1]
+    if (
+        jump.instruction == "j"
+        and jump.symbol is None
+        and following is not None
+        and following.symbol == jump.args[0]
+    ):
+        return 1, []
+    return None
+
+
+def merge_frames(w: Window) -> Match:
+    """Keep the frame pushed between two calls with the same frame size,
+    addressing the stack from the pushed frame in between"""
+    pop = w[0]
+    if pop.instruction != "subi" or pop.args[:2] != ["r14", "r14"] or pop.symbol:
+        return None
+    size = -int(pop.args[2])
+    body = []
+    for j in range(1, len(w.lines) - w.start):
+        line = w[j]
+        if line.symbol or line.instruction in CONTROL:
+            return None
+        if line.instruction == "addi" and line.args == ["r14", "r14", pop.args[2]]:
+            return j + 1, body
+        line = _shifted(line, size)
+        if line is None:
+            return None
+        body.append(line)
+    return None
+
+
+def _shifted(line: Line, size: int) -> Optional[Line]:
+    """`line` with its stack addresses relative to a frame pushed by `size`"""
+    args = []
+    for role, arg in zip(FORMATS[line.instruction], line.args):
+        if role == "m":
+            offset, base = memory_operand(arg)
+            if base == "r14":
+                if offset + size not in IMMEDIATE_RANGE:
+                    return None
+                arg = "{}(r14)".format(offset + size)
+        elif arg == "r14":
+            if line.instruction != "addi" or role != "u":
+                return None  # Stack pointer modified or used as a value
+            offset = int(line.args[2]) + size
+            if offset not in IMMEDIATE_RANGE:
+                return None
+            args = [line.args[0], "r14", str(offset)]
+            return Line("addi", args, comment=line.comment)
+        args.append(arg)
+    return Line(line.instruction, args, line.symbol, line.comment)
+
+
+def store_load(w: Window) -> Match:
+    """`sw X,rN` followed by `lw rM,X`"""
+    store, load = w[0], w[1]
+    if (
+        load is None
+        or store.instruction != "sw"
+        or load.instruction != "lw"
+        or load.symbol
+        or store.args[0] != load.args[1]
+    ):
+        return None
+    if load.args[0] == store.args[1]:
+        return 2, [store]
+    copy = Line("add", [load.args[0], store.args[1], "r0"], comment=load.comment)
+    return 2, [store, copy]
+
+
+def immediate_operand(w: Window) -> Match:
+    """`addi rN,r0,K` only used by the next instruction, which has an immediate form"""
+    load, op = w[0], w[1]
+    if (
+        op is None
+        or op.symbol
+        or load.instruction != "addi"
+        or load.args[1] != "r0"
+        or not is_immediate(load.args[2])
+        or op.instruction not in IMMEDIATE_FORMS
+    ):
+        return None
+    register, value = load.args[0], load.args[2]
+    if op.args[0] != register and not w.dead_after(1, register):
+        return None
+    replacement = immediate_form(op, register, value)
+    if replacement is None:
+        return None
+    replacement.symbol = load.symbol
+    return 2, [replacement]
+
+
+def immediate_form(line: Line, register: str, value: str) -> Optional[Line]:
+    """`line` using `value` as immediate operand in place of `register`"""
+    if line.instruction not in IMMEDIATE_FORMS:
+        return None
+    instruction = line.instruction
+    target, lhs, rhs = line.args
+    if rhs == register and lhs != register:
+        pass
+    elif lhs == register and rhs != register and (
+        instruction in COMMUTATIVE or instruction in MIRRORED
+    ):
+        instruction, lhs = MIRRORED.get(instruction, instruction), rhs
+    else:
+        return None
+    return Line(instruction + "i", [target, lhs, value], line.symbol, line.comment)
+
+
+def forward_copy(w: Window) -> Match:
+    """Compute a value directly in the register it is copied to"""
+    op, copy = w[0], w[1]
+    if (
+        copy is None
+        or copy.symbol
+        or copy.instruction != "add"
+        or copy.args[2] != "r0"
+        or FORMATS[op.instruction][:1] != "d"
+        or op.instruction == "jl"
+        or op.args[0] != copy.args[1]
+        or not w.dead_after(1, copy.args[1])
+    ):
+        return None
+    return 2, [Line(op.instruction, copy.args[:1] + op.args[1:], op.symbol, op.comment)]
+
+
+def self_move(w: Window) -> Match:
+    """Instructions leaving their register unchanged"""
+    line = w[0]
+    if line.symbol or len(line.args) != 3 or line.args[0] != line.args[1]:
+        return None
+    identity = {"add": "r0", "sub": "r0", "addi": "0", "subi": "0", "muli": "1"}
+    if identity.get(line.instruction) == line.args[2]:
+        return 1, []
+    return None
+
+
+RULES: "OrderedDict[str, Callable[[Window], Match]]" = OrderedDict(
+    (rule.__name__, rule)
+    for rule in (
+        redundant_nop,
+        jump_to_next,
+        merge_frames,
+        store_load,
+        immediate_operand,
+        forward_copy,
+        self_move,
+    )
+)
+
+
+class PeepholeOptimizer:
+    """Rewrites the lines of every function by matching `rules` on a window sliding
+    over them, until none matches. Hits of every rule are counted."""
+
+    def __init__(self, rules: Iterable[str] = None):
+        names = list(RULES if rules is None else rules)
+        unknown = [name for name in names if name not in RULES]
+        if unknown:
+            raise ValueError("Unknown peephole rules: " + ", ".join(unknown))
+        self.rules = [(name, RULES[name]) for name in names]
+        self.hits = Counter({name: 0 for name in names})
+
+    def optimize(self, prog: Prog):
+        if not self.rules:
+            return
+        for func in prog.functions:
+            func.lines = self.optimize_lines(func.lines, protected={func.name})
+
+    def optimize_lines(self, lines: List[Line], protected=()) -> List[Line]:
+        changed = True
+        while changed:
+            lines, changed = self._pass(lines, protected)
+        return lines
+
+    def _pass(self, lines: List[Line], protected) -> Tuple[List[Line], bool]:
+        window = Window(lines, protected)
+        out = []
+        matched = False
+        while window.start < len(lines):
+            for name, rule in self.rules:
+                match = rule(window)
+                if match is not None:
+                    count, replacement = match
+                    out += replacement
+                    window.start += count
+                    self.hits[name] += 1
+                    matched = True
+                    break
+            else:
+                out.append(lines[window.start])
+                window.start += 1
+
+        if window.renames:
+            out = [_renamed(line, window.renames) for line in out]
+        return out, matched
+
+
+def _renamed(line: Line, renames: dict) -> Line:
+    if line.instruction not in ("j", "bz", "bnz") or line.args[-1] not in renames:
+        return line
+    label = line.args[-1]
+    while label in renames:
+        label = renames[label]
+    return Line(line.instruction, line.args[:-1] + [label], line.symbol, line.comment)
@@ -0,0 +1,401 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from gen.models import Line
+
+REGISTERS = ["r" + str(i) for i in range(1, 13)]  # r13 to r15 have fixed roles
+# Registers written by the lib.m routines called by the generated code
+LIBRARY = {"getstr", "putstr", "intstr", "strint"}
+LIBRARY_CLOBBERS = {"r1", "r2", "r3", "r4", "r13", "r15"}
+CALL_CLOBBERS = set(REGISTERS) | {"r13", "r15"}
+# Calling convention of the generated functions: the first word sized arguments
+# are passed in registers and the return value comes back in r13, like lib.m's
+ARGUMENT_REGISTERS = ["r1", "r2", "r3", "r4"]
+RETURN_REGISTER = "r13"
+
+# Operand roles: "d" defined register, "u" used register, "x" used then defined
+# register, "m" memory operand, "k" immediate value or label
+FORMATS = {
+    "lw": "dm",
+    "lb": "dm",
+    "sw": "mu",
+    "sb": "mu",
+    "not": "du",
+    "bz": "uk",
+    "bnz": "uk",
+    "j": "k",
+    "jl": "dk",
+    "jr": "u",
+    "getc": "d",
+    "putc": "u",
+    "sl": "xk",
+    "sr": "xk",
+    "nop": "",
+    "hlt": "",
+    "entry": "",
+}
+for _op in ("add", "sub", "mul", "div", "mod", "and", "or"):
+    FORMATS[_op] = "duu"
+    FORMATS[_op + "i"] = "duk"
+for _op in ("ceq", "cne", "clt", "cgt", "cle", "cge"):
+    FORMATS[_op] = "duu"
+    FORMATS[_op + "i"] = "duk"
+
+BRANCHES = {"bz", "bnz"}
+EXITS = {"jr", "hlt"}
+MEMORY = re.compile(r"^(-?\d+)\((r\d+)\)$")
+
+
+def implicit_uses(line: Line) -> Set[str]:
+    """Registers a line reads without naming them: the arguments of a call to a
+    generated function and the value a function returns"""
+    if line.instruction == "jl" and line.args[1] not in LIBRARY:
+        return set(ARGUMENT_REGISTERS)
+    if line.instruction == "jr":
+        return {RETURN_REGISTER}
+    return set()
+
+
+def memory_operand(arg: str) -> Optional[Tuple[int, str]]:
+    match = MEMORY.match(arg)
+    if match is None:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+class FunctionFlow:
+    """Control flow and liveness of registers and stack slots in a function
+    Stack slots are identified by their offset from r14 at the start of the
+    function. Slots accessed while a frame is pushed for a call, or whose address
+    is taken, are reported as `escaped`, slots which the frames pushed for calls
+    overlap as `overlapped`."""
+
+    def __init__(self, lines: List[Line], slots: Iterable[int]):
+        self.lines = lines
+        self.slots = set(slots)
+        self.escaped: Set[int] = set()
+        self.overlapped: Set[int] = set()
+        self.labels = {line.symbol: i for i, line in enumerate(lines) if line.symbol}
+        self.defs: List[Set] = []
+        self.uses: List[Set] = []
+        self.calls: Dict[int, Set[str]] = {}  # Registers clobbered by each call
+        self._scan()
+        self.successors = [self._successors(i) for i in range(len(lines))]
+        # Blocks start at jump targets and after the lines which do not fall
+        # through, even if nothing jumps there
+        self.leaders = {0} | {
+            s
+            for i, successors in enumerate(self.successors)
+            for s in successors
+            if s != i + 1 or lines[i].instruction in BRANCHES
+        }
+        self.leaders |= {
+            i + 1
+            for i, successors in enumerate(self.successors[:-1])
+            if i + 1 not in successors
+        }
+        self.live_in, self.live_out = self._liveness()
+
+    def _scan(self):
+        frame = 0  # Displacement of r14 from its value at the start of the function
+        frames = []
+        for i, line in enumerate(self.lines):
+            defs, uses = set(), set()
+            fmt = FORMATS.get(line.instruction)
+            if fmt is None:
+                raise ValueError("Unknown instruction " + line.instruction)
+            for role, arg in zip(fmt, line.args):
+                if role == "m":
+                    offset, base = memory_operand(arg)
+                    uses.add(base)
+                    if base == "r14" and offset + frame in self.slots:
+                        if frame:
+                            self.escaped.add(offset + frame)
+                        elif line.instruction in ("lw", "lb"):
+                            uses.add(offset)
+                        else:
+                            defs.add(offset)
+                elif role in "ux":
+                    uses.add(arg)
+                if role in "dx":
+                    defs.add(arg)
+
+            if line.args[:2] == ["r14", "r14"]:
+                # Frame pushed or popped around a call
+                step = int(line.args[2])
+                frame += step if line.instruction == "addi" else -step
+                frames.append(frame)
+            elif "r14" in uses and not any(role == "m" for role in fmt):
+                # Address computed from the stack pointer
+                self.escaped.add(int(line.args[-1]) + frame)
+            if line.instruction == "jl":
+                library = line.args[1] in LIBRARY
+                self.calls[i] = LIBRARY_CLOBBERS if library else CALL_CLOBBERS
+                defs |= self.calls[i]
+            uses |= implicit_uses(line)
+
+            self.defs.append(defs - {"r0"})
+            self.uses.append(uses - {"r0"})
+
+        # Callees write their return value and link below the frame they are given
+        deepest = min(frames, default=0)
+        if deepest < 0:
+            self.overlapped = {slot for slot in self.slots if slot <= deepest}
+
+    def _successors(self, i: int) -> List[int]:
+        line = self.lines[i]
+        following = [i + 1] if i + 1 < len(self.lines) else []
+        if line.instruction in EXITS:
+            return []
+        if line.instruction == "j":
+            return [self.labels[line.args[0]]] if line.args[0] in self.labels else []
+        if line.instruction in BRANCHES and line.args[1] in self.labels:
+            return following + [self.labels[line.args[1]]]
+        return following
+
+    def _liveness(self):
+        count = len(self.lines)
+        live_in = [set() for _ in range(count)]
+        live_out = [set() for _ in range(count)]
+        changed = True
+        while changed:
+            changed = False
+            for i in reversed(range(count)):
+                out = set()
+                for s in self.successors[i]:
+                    out |= live_in[s]
+                new_in = self.uses[i] | (out - self.defs[i])
+                if new_in != live_in[i] or out != live_out[i]:
+                    live_in[i], live_out[i] = new_in, out
+                    changed = True
+        return live_in, live_out
+
+    def used_registers(self) -> Set[str]:
+        registers = set()
+        for line in self.lines:
+            for role, arg in zip(FORMATS[line.instruction], line.args):
+                if role == "m":
+                    registers.add(memory_operand(arg)[1])
+                elif role != "k":
+                    registers.add(arg)
+        return registers
+
+
+class RegisterAllocator:
+    """Linear scan allocation of the scalar stack slots of a function to the
+    registers its code leaves unused. Slots live across a call to another
+    function, or which do not fit in the free registers, stay in memory."""
+
+    def __init__(self, lines: List[Line], slots: Iterable[int]):
+        self.flow = FunctionFlow(lines, slots)
+        self.intervals: Dict[int, List[int]] = {}
+        self.assignment: Dict[int, str] = {}
+        self.spilled: Set[int] = set()
+
+    def allocate(self) -> List[Line]:
+        self._build_intervals()
+        self._linear_scan()
+        if not self.assignment:
+            return self.flow.lines
+        return self._rewrite()
+
+    def _build_intervals(self):
+        flow = self.flow
+        candidates = flow.slots - flow.escaped - flow.overlapped
+        for i in range(len(flow.lines)):
+            for slot in (flow.live_in[i] | flow.defs[i]) & candidates:
+                interval = self.intervals.setdefault(slot, [i, i])
+                interval[1] = i
+
+    def _forbidden(self, slot: int) -> Set[str]:
+        forbidden = set()
+        start, end = self.intervals[slot]
+        for i, clobbers in self.flow.calls.items():
+            if start <= i <= end and slot in self.flow.live_out[i]:
+                forbidden |= clobbers
+        return forbidden
+
+    def _linear_scan(self):
+        free = [r for r in REGISTERS if r not in self.flow.used_registers()]
+        active: List[int] = []
+        for slot in sorted(self.intervals, key=lambda s: self.intervals[s]):
+            start, end = self.intervals[slot]
+            active = [a for a in active if self.intervals[a][1] >= start]
+            forbidden = self._forbidden(slot)
+            taken = {self.assignment[a] for a in active}
+            register = next(
+                (r for r in free if r not in taken and r not in forbidden), None
+            )
+            if register is None:
+                # Spill whichever interval ends last
+                victim = max(
+                    (a for a in active if self.assignment[a] not in forbidden),
+                    key=lambda a: self.intervals[a][1],
+                    default=None,
+                )
+                if victim is None or self.intervals[victim][1] <= end:
+                    self.spilled.add(slot)
+                    continue
+                register = self.assignment.pop(victim)
+                active.remove(victim)
+                self.spilled.add(victim)
+            self.assignment[slot] = register
+            active.append(slot)
+
+    def _slot(self, i: int) -> Optional[int]:
+        """Promoted slot accessed by line `i`"""
+        for slot in self.flow.defs[i] | self.flow.uses[i]:
+            if slot in self.assignment:
+                return slot
+        return None
+
+    def _writes(self, i: int, register: str) -> bool:
+        """Whether line `i` writes `register` once rewritten, stores into a slot
+        may be merged with the instruction computing the stored value"""
+        for j in (i, i + 1):
+            if j < len(self.flow.lines):
+                slot = self._slot(j)
+                if slot in self.flow.defs[j] and self.assignment[slot] == register:
+                    return True
+        return register in self.flow.defs[i]
+
+    def _rewrite(self) -> List[Line]:
+        flow = self.flow
+        lines: List[Optional[Line]] = list(flow.lines)
+        for i, line in enumerate(flow.lines):
+            slot = self._slot(i)
+            if slot is None:
+                continue
+            register = self.assignment[slot]
+            if slot in flow.uses[i]:
+                lines[i] = self._forward_load(lines, i, register)
+            else:
+                lines[i] = self._merge_store(lines, i, register)
+
+        entry = [
+            Line("lw", [register, "{}(r14)".format(slot)])
+            for slot, register in sorted(self.assignment.items(), reverse=True)
+            if slot in flow.live_in[0]
+        ]
+        first = next(i for i, line in enumerate(lines) if line is not None)
+        if entry and first not in flow.leaders - {0}:
+            # Calls enter the function through its label, loops must not
+            entry[0].symbol = lines[first].symbol
+            lines[first] = _unlabeled(lines[first])
+        return compact(entry + lines)
+
+    def _forward_load(self, lines, i: int, register: str) -> Optional[Line]:
+        """Use `register` in place of the loaded register until it is redefined"""
+        flow = self.flow
+        loaded = lines[i].args[0]
+        uses = []
+        for j in range(i + 1, len(lines)):
+            if j in flow.leaders:
+                if loaded in flow.live_in[j]:
+                    return copy_line(lines[i], register, loaded)
+                break
+            if lines[j] is not None and loaded in flow.uses[j]:
+                if loaded in implicit_uses(lines[j]):
+                    return copy_line(lines[i], register, loaded)
+                uses.append(j)
+            if loaded in flow.defs[j]:
+                break
+            if self._writes(j, register) and loaded in flow.live_out[j]:
+                return copy_line(lines[i], register, loaded)
+            if j + 1 not in flow.successors[j]:
+                # Jumps away, the next line is reached from elsewhere
+                if loaded in flow.live_out[j]:
+                    return copy_line(lines[i], register, loaded)
+                break
+        else:
+            if loaded in flow.live_out[-1]:
+                return copy_line(lines[i], register, loaded)
+
+        for j in uses:
+            lines[j] = substitute(lines[j], loaded, register)
+        return removed_line(lines[i])
+
+    def _merge_store(self, lines, i: int, register: str) -> Optional[Line]:
+        """Compute the stored value directly in `register` when possible"""
+        flow = self.flow
+        stored = lines[i].args[1]
+        previous = next(
+            (j for j in range(i - 1, -1, -1) if lines[j] is not None), None
+        )
+        if (
+            previous is not None
+            and i not in flow.leaders
+            and all(j not in flow.leaders for j in range(previous + 1, i))
+            and stored not in self.assignment.values()
+            and stored not in flow.live_out[i]
+            and FORMATS[lines[previous].instruction][:1] == "d"
+            and lines[previous].instruction != "jl"
+            and lines[previous].args[0] == stored
+        ):
+            merged = lines[previous]
+            lines[previous] = Line(
+                merged.instruction,
+                [register] + merged.args[1:],
+                symbol=merged.symbol,
+                comment=merged.comment,
+            )
+            return removed_line(lines[i])
+        return copy_line(lines[i], stored, register)
+
+
+def copy_line(line: Line, source: str, target: str) -> Line:
+    """Register to register move replacing `line`"""
+    return Line("add", [target, source, "r0"], symbol=line.symbol, comment=line.comment)
+
+
+def substitute(line: Line, old: str, new: str) -> Line:
+    args = []
+    for role, arg in zip(FORMATS[line.instruction], line.args):
+        if role == "m":
+            offset, base = memory_operand(arg)
+            if base == old:
+                arg = "{}({})".format(offset, new)
+        elif role == "u" and arg == old:
+            arg = new
+        args.append(arg)
+    args += line.args[len(args) :]
+    return Line(line.instruction, args, symbol=line.symbol, comment=line.comment)
+
+
+def removed_line(line: Line) -> Optional[Line]:
+    """Removed lines keep their label until it can be moved to the next line"""
+    if line.symbol:
+        return Line("nop", [], symbol=line.symbol, comment=line.comment)
+    return None
+
+
+def _unlabeled(line: Line) -> Line:
+    return Line(line.instruction, line.args, comment=line.comment)
+
+
+def compact(lines: List[Optional[Line]]) -> List[Line]:
+    """Drop removed lines, moving the label of a removed line to the next one
+    when that line has none"""
+    out = []
+    pending = None
+    for line in lines:
+        if line is None:
+            continue
+        if pending is not None:
+            if line.symbol is None:
+                line = Line(line.instruction, line.args, pending.symbol, line.comment)
+            else:
+                out.append(pending)
+            pending = None
+        if line.instruction == "nop" and line.symbol and not line.args:
+            pending = line
+            continue
+        out.append(line)
+    if pending is not None:
+        out.append(pending)
+    return out
+
+
+def allocate_registers(lines: List[Line], slots: Iterable[int]) -> List[Line]:
+    """Keep the given stack slots in registers where possible"""
+    return RegisterAllocator(lines, slots).allocate()
@@ -0,0 +1,151 @@
+import operator
+from typing import Dict, List, Optional, Set, Tuple
+
+from gen.models import Line
+from gen.peephole import IMMEDIATE_RANGE, immediate_form, is_immediate
+from gen.regalloc import FORMATS, FunctionFlow
+from gen.vis.constant_folding import divide
+
+# Results of the arithmetic instructions, by name of their register form
+EVALUATE = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "mul": operator.mul,
+    "div": divide,
+    "and": operator.and_,
+    "or": operator.or_,
+    "ceq": lambda a, b: int(a == b),
+    "cne": lambda a, b: int(a != b),
+    "clt": lambda a, b: int(a < b),
+    "cgt": lambda a, b: int(a > b),
+    "cle": lambda a, b: int(a <= b),
+    "cge": lambda a, b: int(a >= b),
+}
+# Instructions setting their register to 0 or 1
+BOOLEAN = {
+    op + suffix
+    for op in ("ceq", "cne", "clt", "cgt", "cle", "cge")
+    for suffix in ("", "i")
+}
+BOOLEAN.add("not")
+
+
+def _shift(value: int) -> Optional[int]:
+    """Shift equivalent to a multiplication by `value`, if it is a power of two"""
+    if value > 1 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
+
+class InstructionSelector:
+    """Picks the cheapest instructions for the arithmetic of a function. Every moon
+    instruction takes as long to fetch, so cheaper means fewer instructions:
+    operations on registers set to a constant in the same block are folded or use
+    immediate operands, and multiplications and divisions by 0, 1 and -1 become
+    loads, copies or negations. Strength reduction stops there: a multiplication
+    by a power of two in place becomes a shift, which costs as much, and only
+    non-negative values are divided by shifting right, as shifts round toward
+    negative infinity while `div` truncates. Shift and add sequences for other
+    constants and biased shifts for signed dividends take two to four instructions
+    where `muli` and `divi` take one, so they are never selected."""
+
+    def __init__(self, lines: List[Line]):
+        self.lines = lines
+        self.selected = 0
+
+    def select(self) -> List[Line]:
+        flow = FunctionFlow(self.lines, ())
+        known: Dict[str, int] = {}  # Registers set to a constant
+        nonnegative: Set[str] = set()
+        out = []
+        for i, line in enumerate(self.lines):
+            if i in flow.leaders:
+                known, nonnegative = {}, set()
+            selected, value = self._select(line, known, nonnegative)
+            if selected is not line:
+                self.selected += 1
+            for register in flow.defs[i]:
+                known.pop(register, None)
+                nonnegative.discard(register)
+            if value is not None:
+                known[selected.args[0]] = value
+            if selected.instruction in BOOLEAN or value is not None and value >= 0:
+                nonnegative.add(selected.args[0])
+            out.append(selected)
+        return out
+
+    def _select(
+        self, line: Line, known: Dict[str, int], nonnegative: Set[str]
+    ) -> Tuple[Line, Optional[int]]:
+        """Replacement for `line` and the constant it sets its register to"""
+        instruction, args = line.instruction, line.args
+        fmt = FORMATS.get(instruction)
+        if instruction == "addi" and args[1] == "r0" and is_immediate(args[2]):
+            return line, int(args[2])
+        if instruction in EVALUATE and fmt == "duu":
+            values = [known.get(arg, 0 if arg == "r0" else None) for arg in args[1:]]
+            if None not in values:
+                return self._constant(line, EVALUATE[instruction](*values))
+            for register, value in zip(args[1:], values):
+                if value is not None and register != "r0":
+                    replacement = immediate_form(line, register, str(value))
+                    if replacement is not None:
+                        return self._select(replacement, known, nonnegative)
+            return line, None
+        if instruction[:-1] in EVALUATE and fmt == "duk" and is_immediate(args[2]):
+            operation = instruction[:-1]
+            target, source, constant = args[0], args[1], int(args[2])
+            if source in known or source == "r0":
+                value = known.get(source, 0)
+                return self._constant(line, EVALUATE[operation](value, constant))
+            if operation == "mul":
+                return self._multiply(line, target, source, constant), None
+            if operation == "div":
+                positive = source in nonnegative
+                return self._divide(line, target, source, constant, positive), None
+        if instruction == "not" and args[1] in known:
+            return self._constant(line, int(known[args[1]] == 0))
+        if instruction in ("sl", "sr") and args[0] in known:
+            value, shift = known[args[0]], int(args[1])
+            return self._constant(
+                line, value << shift if instruction == "sl" else value >> shift
+            )
+        return line, None
+
+    def _constant(self, line: Line, value: Optional[int]) -> Tuple[Line, Optional[int]]:
+        if value is None or value not in IMMEDIATE_RANGE:
+            return line, None
+        return self._line(line, "addi", line.args[0], "r0", str(value)), value
+
+    def _multiply(self, line: Line, target: str, source: str, constant: int) -> Line:
+        if constant == 0:
+            return self._line(line, "addi", target, "r0", "0")
+        if constant == 1:
+            return self._line(line, "add", target, source, "r0")
+        if constant == -1:
+            return self._line(line, "sub", target, "r0", source)
+        shift = _shift(constant)
+        if shift is not None and target == source:
+            return self._line(line, "sl", target, str(shift))
+        return line
+
+    def _divide(
+        self, line: Line, target: str, source: str, constant: int, nonnegative: bool
+    ) -> Line:
+        if constant == 1:
+            return self._line(line, "add", target, source, "r0")
+        if constant == -1:
+            return self._line(line, "sub", target, "r0", source)
+        shift = _shift(constant)
+        if shift is not None and target == source and nonnegative:
+            return self._line(line, "sr", target, str(shift))
+        return line
+
+    @staticmethod
+    def _line(line: Line, instruction: str, *args: str) -> Line:
+        return Line(instruction, list(args), line.symbol, line.comment)
+
+
+def select_instructions(lines: List[Line]) -> List[Line]:
+    """Cheapest instructions for the arithmetic of a function"""
+    return InstructionSelector(lines).select()
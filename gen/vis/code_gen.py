@@ -1,13 +1,25 @@
-from collections import defaultdict
 from contextlib import contextmanager
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from lex.token import Operators as O
-from sem.table import Record, RecordType
+from sem.table import Record, RecordType, SymbolTable
 from sem.visitor import Visitor
-from syn.ast import ASTNode, GroupNodeType
-
-from gen.models import Function, Line
+from syn.ast import (
+    ASTNode,
+    GroupNodeType,
+    LeafNodeType,
+    ListNodeType,
+    node_type_mask,
+)
+
+from gen.deadcode import remove_dead_code
+from gen.frames import SharedSlots
+from gen.loops import optimize_loops, rotate_loops
+from gen.models import Code, Function, Line
+from gen.passes import GENERATION_PASSES, PassManager, timed
+from gen.peephole import is_immediate, MIRRORED
+from gen.regalloc import allocate_registers, ARGUMENT_REGISTERS, RETURN_REGISTER
+from gen.select import select_instructions
 
 OP_TO_INSTRUCTION = {
     O.EQ: "ceq",
@@ -20,40 +32,136 @@ OP_TO_INSTRUCTION = {
     O.MINUS: "sub",
     O.DIV: "div",
     O.MULT: "mul",
-    O.OR: "or",
-    O.AND: "and",
     O.NOT: "not",
 }
 
+# Expressions calling functions, whose side effects keep their operands in order
+CALLS = node_type_mask([GroupNodeType.F_CALL])
+
 
 def _add_line(lines, *args, **kwargs):
     lines.append(Line(*args, **kwargs))
 
 
+def _logical(node: ASTNode) -> bool:
+    """`and` and `or` expressions, whose right operand is evaluated only if needed"""
+    return node.node_type in (
+        GroupNodeType.ADD_EXPR,
+        GroupNodeType.MULT_EXPR,
+    ) and node.token.token_type in (O.AND, O.OR)
+
+
+def _zero(node: ASTNode) -> bool:
+    return node.node_type == LeafNodeType.LITERAL and node.token.lexeme == "0"
+
+
+def _immediate(node: ASTNode) -> bool:
+    """Integer literals which fit in the immediate operand of an instruction"""
+    return node.node_type == LeafNodeType.LITERAL and is_immediate(node.token.lexeme)
+
+
+def _tested(node: ASTNode) -> Optional[ASTNode]:
+    """Operand of an equality with zero, whose truth decides the relation"""
+    if node.node_type != GroupNodeType.REL_EXPR or node.token.token_type not in (
+        O.EQ,
+        O.NEQ,
+    ):
+        return None
+    lhs, rhs = node.children
+    if _zero(rhs):
+        return lhs
+    return rhs if _zero(lhs) else None
+
+
+def _params(table: SymbolTable) -> List[Record]:
+    params = [
+        r
+        for records in table.entries.values()
+        for r in records
+        if r.record_type == RecordType.PARAM
+    ]
+    return sorted(params, key=lambda r: r.offset)
+
+
+def register_params(table: SymbolTable) -> Dict[int, str]:
+    """Registers passing the parameters of a function by their position: the
+    first word sized scalars and pointers to complex arguments, in order"""
+    passed = [
+        i
+        for i, r in enumerate(_params(table))
+        if r.is_pointer() or (not r.type.is_complex() and r.type.size == 4)
+    ]
+    return dict(zip(passed, ARGUMENT_REGISTERS))
+
+
 class CodeGenerator(Visitor):
-    def __init__(self, prog=None):
-        super().__init__(output=None)
+    def __init__(self, context, prog=None, disabled=()):
+        """`disabled` names the passes in `GENERATION_PASSES` and `FUNCTION_PASSES`
+        not to run"""
+        super().__init__(context, output=None)
         self.prog = prog
+        # Temporaries live at once while evaluating the operators generated
+        self._temporaries: Dict[int, int] = {}
+        # Passes run over the code of every function, in order
+        self.passes = PassManager(
+            [
+                ("dead code", remove_dead_code),
+                ("registers", allocate_registers),
+                ("loops", self._optimize_loops),
+                ("rotation", rotate_loops),
+                ("selection", lambda lines, slots: select_instructions(lines)),
+                ("dead code", remove_dead_code),
+                ("slot sharing", self._share_slots),
+            ],
+            disabled,
+        )
         self._register_stack = ["r" + str(i) for i in range(12, 0, -1)]
-        self._counter = defaultdict(int)
-        self._mangled_names = {}
+        self._function_labels: Dict[SymbolTable, str] = {}
+
+    def visit(self, node: ASTNode):
+        node.code = Code()
+        super().visit(node)
 
-    def counter(self, type_):
-        self._counter[type_] += 1
-        return self._counter[type_]
+    def clear_timings(self):
+        """Forget the time spent in every pass. Passes run while generating code
+        are listed first, whichever function they first apply to"""
+        self.passes.timings.clear()
+        for name in GENERATION_PASSES:
+            if name not in self.passes.disabled:
+                self.passes.timings[name] = 0.0
 
-    def new_mangled(self, name, type_):
+    def function_label(self, table: SymbolTable) -> str:
         """As moon symbols cannot contain "::" replace it with "_"
-        To prevent symbol name clashes, use a counter to guarantee uniqueness"""
-        self._mangled_names[(name, type_)] = "{}{}{}".format(
-            type_, self.counter(type_), name.replace("::", "_")
-        )
-        return self._mangled_names[(name, type_)]
+        To prevent symbol name clashes, functions are numbered in symbol table order,
+        which does not depend on the order in which functions are generated"""
+        if table not in self._function_labels:
+            self._number_functions()
+        return self._function_labels[table]
+
+    def _number_functions(self):
+        records = [r for rs in self.context.globals.entries.values() for r in rs]
+        for record in list(records):
+            if record.record_type == RecordType.CLASS:
+                records += [r for rs in record.table.entries.values() for r in rs]
+
+        for record in records:
+            if (
+                record.record_type == RecordType.FUNCTION
+                and record.table is not None
+                and record.name != "main"
+                and record.table not in self._function_labels
+            ):
+                self._function_labels[record.table] = "func{}{}".format(
+                    len(self._function_labels) + 1,
+                    record.table.name.replace("::", "_"),
+                )
 
-    def get_mangled(self, name, type_):
-        if (name, type_) not in self._mangled_names:
-            return self.new_mangled(name, type_)
-        return self._mangled_names[(name, type_)]
+    def new_label(self, type_: str) -> str:
+        """Labels are numbered per function for the same reason"""
+        scope = self.scope.name
+        if scope != "main":
+            scope = self.function_label(self.scope)
+        return "{}{}{}".format(type_, self.context.counter(type_ + scope), scope)
 
     def pop_reg(self) -> str:
         return self._register_stack.pop()
@@ -67,6 +175,51 @@ class CodeGenerator(Visitor):
         yield register
         self.push_reg(register)
 
+    @contextmanager
+    def reserved(self, registers):
+        """Keep `registers` from being used as scratch registers"""
+        stack = self._register_stack
+        self._register_stack = [r for r in stack if r not in registers]
+        yield
+        self._register_stack = stack
+
+    def finish_function(self, func: Function, lines: List[Line]) -> List[Line]:
+        """Run the passes over the code of the current function: remove dead code,
+        keep scalar locals, parameters and temporaries in registers where possible,
+        optimize loops, select cheaper instructions, then share the stack slots
+        left"""
+        records = [r for records in self.scope.entries.values() for r in records]
+        slots = [
+            -r.offset
+            for r in records
+            if r.record_type in (RecordType.LOCAL, RecordType.PARAM, RecordType.TEMP)
+            and not r.type.is_complex()
+            and r.type.size == 4
+        ]
+        self._records = records
+        self._saved = 0
+        lines = self.passes.run(lines, slots)
+        size = self.scope.current_size()
+        func.frame = (size, size - self._saved)
+        return lines
+
+    def _optimize_loops(self, lines: List[Line], slots: List[int]) -> List[Line]:
+        # Pointers to complex parameters and `this` are never written either
+        pointers = [-r.offset for r in self._records if r.is_pointer()]
+        if "::" in self.scope.name:
+            pointers.append(-8)
+        return optimize_loops(lines, slots + pointers)
+
+    def _share_slots(self, lines: List[Line], slots: List[int]) -> List[Line]:
+        # Parameters are placed by the caller
+        params = [-r.offset for r in self._records if r.record_type == RecordType.PARAM]
+        layout = SharedSlots(lines, [s for s in slots if s not in params])
+        for record in self._records:
+            if record.record_type not in (RecordType.FUNCTION, RecordType.CLASS):
+                record.offset = -layout.moved(-record.offset)
+        self._saved = layout.saved
+        return layout.relocate(lines)
+
     def dereference(self, code, record: Record, offset: int, register: str):
         with self.register() as addr_reg:
             _add_line(code, "lw", [addr_reg, record.memory_location()])
@@ -169,6 +322,10 @@ class CodeGenerator(Visitor):
             else:
                 offset = 8  # Leave space for return value and r15 in stack frame
                 offset += self.scope.current_size()
+                args = child.children[1].children
+                # Arguments may call functions, which use the same stack space
+                for arg in args:
+                    node.code += arg.code
 
                 if "::" in child.record.table.name:
                     # Add `this` pointer
@@ -195,21 +352,26 @@ class CodeGenerator(Visitor):
                         )
                     offset += 4
 
-                for arg in child.children[1].children:  # Handle arguments
-                    node.code += arg.code
-                    with self.register() as register:
-                        if arg.record and arg.record.type.is_complex():
-                            # Pass complex arguments as pointers
-                            _add_line(
-                                node.code,
-                                "addi",
-                                [register, "r14", str(-arg.record.offset)],
-                            )
-                        else:
-                            self.load_in_reg(node.code, arg, register)
-                        _add_line(
-                            node.code, "sw", [str(-offset) + "(r14)", register],
-                        )
+                registers = register_params(child.record.table)
+                with self.reserved(registers.values()):
+                    for i, arg in enumerate(args):  # Handle arguments
+                        with self.register() as scratch:
+                            register = registers.get(i, scratch)
+                            if arg.record and arg.record.type.is_complex():
+                                # Pass complex arguments as pointers
+                                _add_line(
+                                    node.code,
+                                    "addi",
+                                    [register, "r14", str(-arg.record.offset)],
+                                )
+                            else:
+                                self.load_in_reg(node.code, arg, register)
+                            if i not in registers:
+                                _add_line(
+                                    node.code,
+                                    "sw",
+                                    [str(-offset) + "(r14)", register],
+                                )
                         if arg.record:
                             if arg.record.type.is_complex():
                                 offset += 4
@@ -219,22 +381,19 @@ class CodeGenerator(Visitor):
                             # TODO Handle float literal
                             offset += 4
 
-                with self.new_frame(node.code):  # Call function
-                    _add_line(
-                        node.code,
-                        "jl",
-                        ["r15", self.get_mangled(child.record.table.name, "func")],
-                    )
-
-                with self.register() as register:  # Retrieve return value
-                    _add_line(
-                        node.code,
-                        "lw",
-                        [register, str(-self.scope.current_size()) + "(r14)"],
-                    )
-                    _add_line(
-                        node.code, "sw", [child.record.memory_location(), register]
-                    )
+                    with self.new_frame(node.code):  # Call function
+                        _add_line(
+                            node.code,
+                            "jl",
+                            ["r15", self.function_label(child.record.table)],
+                        )
+
+                # Retrieve return value
+                _add_line(
+                    node.code,
+                    "sw",
+                    [child.record.memory_location(), RETURN_REGISTER],
+                )
                 record.offset = child.record.offset
 
         node.record = record
@@ -258,37 +417,90 @@ class CodeGenerator(Visitor):
             comment="Adjust stack pointer offset",
         )
 
+        body = Code()
         for stat in node.children[1].children:
-            main.lines += stat.code
+            body += stat.code
 
-        _add_line(main.lines, "hlt", [])
+        _add_line(body, "hlt", [])
+        main.lines += self.finish_function(main, body.release())
 
         self.prog.functions.append(main)
 
     def _visit_func_def(self, node: ASTNode):
-        name = self.get_mangled(node.record.table.name, "func")
+        name = self.function_label(node.record.table)
         func = Function(name)
         # TODO Handle returning floats?
         # TODO Handle returning objects
-        # Return value at 0(r14) and return address at -4(r14)
-        _add_line(func.lines, "sw", ["-4(r14)", "r15"], symbol=name)
-
-        for stat in node.children[-1].children:
-            func.lines += stat.code
-
-        _add_line(func.lines, "sw", ["0(r14)", "r0"])
-        _add_line(func.lines, "lw", ["r15", "-4(r14)"], symbol=name + "return")
-        _add_line(func.lines, "jr", ["r15"])
+        # Return value in r13 and return address at -4(r14), which functions
+        # calling no other function leave in r15
+        body = Code()
+        registers = register_params(node.record.table)
+        for i, param in enumerate(_params(node.record.table)):
+            if i in registers:
+                _add_line(body, "sw", [param.memory_location(), registers[i]])
+        stats = node.children[-1].children
+        for stat in stats:
+            body += stat.code
+        if not stats or stats[-1].node_type != GroupNodeType.RETURN_STAT:
+            _add_line(body, "addi", [RETURN_REGISTER, "r0", "0"])
+        body = body.release()
+        if any(line.args == [name + "tail"] for line in body):
+            # Tail calls start over after the parameters passed in registers
+            start = len(registers)
+            if body[start].symbol:
+                body.insert(start, Line("nop", []))
+            body[start].symbol = name + "tail"
+
+        if any(line.instruction == "jl" for line in body):
+            _add_line(func.lines, "sw", ["-4(r14)", "r15"], symbol=name)
+            func.lines += body
+            _add_line(func.lines, "lw", ["r15", "-4(r14)"], symbol=name + "return")
+            _add_line(func.lines, "jr", ["r15"])
+        else:
+            # The entry label cannot be shared with a loop
+            if body[0].symbol:
+                _add_line(func.lines, "nop", [])
+            func.lines += body
+            func.lines[0].symbol = name
+            _add_line(func.lines, "jr", ["r15"], symbol=name + "return")
+        func.lines = self.finish_function(func, func.lines)
 
         self.prog.functions.append(func)
 
-    def _visit_if_stat(self, node: ASTNode):
-        rel_expr = node.children[0]
-        register = rel_expr.code[-1].args[0]
-        if_sym = self.new_mangled(self.scope.name, "if")
+    def _branch(self, code: Code, node: ASTNode, label: str, when: bool):
+        """Jump to `label` if the truth of `node` is `when`, fall through otherwise.
+        Relations, `not`, `and` and `or` are compiled into branches, skipping the
+        code of right operands once the result is decided"""
+        operand = _tested(node)
+        if node.node_type == GroupNodeType.NOT:
+            self._branch(code, node.children[0], label, not when)
+        elif _logical(node):
+            lhs, rhs = node.children
+            if node.token.token_type == (O.OR if when else O.AND):
+                # Either operand decides
+                self._branch(code, lhs, label, when)
+                self._branch(code, rhs, label, when)
+            else:
+                skip = self.new_label("skip")
+                self._branch(code, lhs, skip, not when)
+                self._branch(code, rhs, label, when)
+                _add_line(code, "nop", [], symbol=skip)
+        elif operand is not None:
+            equal = node.token.token_type == O.EQ
+            self._branch(code, operand, label, when != equal)
+        else:
+            branch = "bnz" if when else "bz"
+            code += node.code
+            if node.node_type == GroupNodeType.REL_EXPR:
+                _add_line(code, branch, [node.code.last().args[0], label])
+                return
+            with self.register() as register:
+                self.load_in_reg(code, node, register)
+                _add_line(code, branch, [register, label])
 
-        node.code += rel_expr.code
-        _add_line(node.code, "bz", [register, if_sym + "else"], symbol=if_sym)
+    def _visit_if_stat(self, node: ASTNode):
+        if_sym = self.new_label("if")
+        self._branch(node.code, node.children[0], if_sym + "else", False)
 
         for stat in node.children[1].children:
             node.code += stat.code
@@ -313,13 +525,9 @@ class CodeGenerator(Visitor):
             self.store_from_reg(node.code, lhs, register)
 
     def _visit_while_stat(self, node: ASTNode):
-        rel_expr = node.children[0]
-        register = rel_expr.code[-1].args[0]
-        while_sym = self.new_mangled(self.scope.name, "while")
-
-        node.code += rel_expr.code
-        node.code[0].symbol = while_sym
-        _add_line(node.code, "bz", [register, while_sym + "done"])
+        while_sym = self.new_label("while")
+        self._branch(node.code, node.children[0], while_sym + "done", False)
+        node.code.first().symbol = while_sym
 
         for stat in node.children[1].children:
             node.code += stat.code
@@ -367,59 +575,167 @@ class CodeGenerator(Visitor):
                 _add_line(node.code, "jl", ["r15", "putstr"])
 
     def _visit_return_stat(self, node: ASTNode):
-        name = self.get_mangled(self.scope.name, "func")
+        name = self.function_label(self.scope)
         child = node.children[0]
+        if "tail calls" not in self.passes.disabled and timed(
+            self.passes.timings, "tail calls", self._tail_call, child
+        ):
+            args = child.children[0].children[1].children
+            timed(self.passes.timings, "tail calls", self._reuse_frame, node.code, args)
+            _add_line(node.code, "j", [name + "tail"])
+            return
         node.code += child.code
-        with self.register() as register:
-            self.load_in_reg(node.code, child, register)
-            _add_line(node.code, "sw", ["0(r14)", register])
-            _add_line(node.code, "j", [name + "return"])
+        self.load_in_reg(node.code, child, RETURN_REGISTER)
+        _add_line(node.code, "j", [name + "return"])
+
+    def _tail_call(self, node: ASTNode) -> bool:
+        """Whether `node` calls the current function, whose frame it can reuse
+        when every parameter is a word sized scalar"""
+        if (
+            node.node_type != ListNodeType.VAR
+            or len(node.children) != 1
+            or node.children[0].node_type != GroupNodeType.F_CALL
+            or node.children[0].record.table is not self.scope
+            or "::" in self.scope.name
+        ):
+            return False
+        params = _params(self.scope)
+        return (
+            0 < len(params) <= len(self._register_stack)
+            and all(
+                not r.is_pointer() and not r.type.is_complex() and r.type.size == 4
+                for r in params
+            )
+        )
+
+    def _reuse_frame(self, code: Code, args: List[ASTNode]):
+        """Replace the parameters of the current function by `args`, which are all
+        evaluated before the first parameter is written"""
+        for arg in args:
+            code += arg.code
+        registers = [self.pop_reg() for _ in args]
+        for arg, register in zip(args, registers):
+            self.load_in_reg(code, arg, register)
+        for param, register in zip(_params(self.scope), registers):
+            _add_line(code, "sw", [param.memory_location(), register])
+        for register in reversed(registers):
+            self.push_reg(register)
+
+    def temporaries(self, node: ASTNode) -> int:
+        """Temporaries live at once while evaluating `node`, its result included.
+        Nodes other than operators keep their result in one, if they have code"""
+        if id(node) in self._temporaries:
+            return self._temporaries[id(node)]
+        return int(bool(node.code))
+
+    def _operands(self, node: ASTNode) -> Tuple[ASTNode, ASTNode]:
+        """Operands of a binary operator in the order their code runs, the right
+        one first unless ordering is enabled, which runs first the one needing more
+        temporaries (Sethi-Ullman). As operands are read back from their
+        temporaries, any operator can be reordered, whether it commutes or not,
+        but operands calling functions keep their order for their side effects"""
+        lhs, rhs = node.children
+        order = rhs, lhs
+        if "ordering" not in self.passes.disabled and timed(
+            self.passes.timings, "ordering", self._left_first, lhs, rhs
+        ):
+            order = lhs, rhs
+        self._temporaries[id(node)] = self._needed(*order)
+        return order
+
+    def _needed(self, first: ASTNode, second: ASTNode) -> int:
+        """Temporaries live at once while evaluating `first` then `second`"""
+        held = int(bool(first.code))
+        return max(self.temporaries(first), held + self.temporaries(second), 1)
+
+    def _left_first(self, lhs: ASTNode, rhs: ASTNode) -> bool:
+        """Whether evaluating the left operand first needs fewer temporaries"""
+        if (lhs.subtree_mask | rhs.subtree_mask) & CALLS:
+            return False
+        return self._needed(lhs, rhs) < self._needed(rhs, lhs)
+
+    def _load_operands(self, node: ASTNode, order, registers) -> Tuple[str, str]:
+        """Load the operands of a binary operator into `registers`, the one evaluated
+        last into the first, right after its result was stored. Returns the
+        registers of the left and right operands"""
+        loaded = {}
+        for operand, register in zip(reversed(order), registers):
+            self.load_in_reg(node.code, operand, register)
+            loaded[operand is node.children[0]] = register
+        return loaded[True], loaded[False]
 
     def _visit_rel_expr(self, node: ASTNode):
         lhs = node.children[0]
         rhs = node.children[1]
-        node.code += rhs.code
-        node.code += lhs.code
-        with self.register() as lhs_reg, self.register() as rhs_reg, self.register() as res_reg:
-            self.load_in_reg(node.code, lhs, lhs_reg)
-            self.load_in_reg(node.code, rhs, rhs_reg)
+        order = self._operands(node)
+        for operand in order:
+            node.code += operand.code
+        instruction = OP_TO_INSTRUCTION[node.token.token_type]
+        if _immediate(lhs) and not _immediate(rhs):
+            lhs, rhs = rhs, lhs
+            instruction = MIRRORED.get(instruction, instruction)
+        # Results overwrite the left operand, which is no longer needed
+        if _immediate(rhs):
+            # Compare with the literal as an immediate operand
+            with self.register() as lhs_reg:
+                self.load_in_reg(node.code, lhs, lhs_reg)
+                _add_line(
+                    node.code, instruction + "i", [lhs_reg, lhs_reg, rhs.token.lexeme]
+                )
+            return
+        with self.register() as first_reg, self.register() as second_reg:
+            lhs_reg, rhs_reg = self._load_operands(node, order, (first_reg, second_reg))
+            _add_line(node.code, instruction, [lhs_reg, lhs_reg, rhs_reg])
+
+    def _dyadic_expr(self, node: ASTNode):
+        order = self._operands(node)
+        for operand in order:
+            node.code += operand.code
+        with self.register() as first_reg, self.register() as second_reg:
+            lhs_reg, rhs_reg = self._load_operands(node, order, (first_reg, second_reg))
             _add_line(
                 node.code,
                 OP_TO_INSTRUCTION[node.token.token_type],
-                [res_reg, lhs_reg, rhs_reg],
+                [lhs_reg, lhs_reg, rhs_reg],
             )
+            _add_line(node.code, "sw", [node.record.memory_location(), lhs_reg])
 
-    def _dyadic_expr(self, node: ASTNode):
-        lhs = node.children[0]
-        rhs = node.children[1]
-        node.code += rhs.code
-        node.code += lhs.code
-        with self.register() as lhs_reg, self.register() as rhs_reg, self.register() as res_reg:
-            self.load_in_reg(node.code, lhs, lhs_reg)
-            self.load_in_reg(node.code, rhs, rhs_reg)
+    def _logical_expr(self, node: ASTNode):
+        """Value of an `and` or `or` expression, 1 if true, 0 otherwise"""
+        logic_sym = self.new_label("logic")
+        self._branch(node.code, node, logic_sym + "false", False)
+        with self.register() as register:
+            _add_line(node.code, "addi", [register, "r0", "1"])
+            _add_line(node.code, "j", [logic_sym + "done"])
+            _add_line(
+                node.code, "addi", [register, "r0", "0"], symbol=logic_sym + "false"
+            )
             _add_line(
                 node.code,
-                OP_TO_INSTRUCTION[node.token.token_type],
-                [res_reg, lhs_reg, rhs_reg],
+                "sw",
+                [node.record.memory_location(), register],
+                symbol=logic_sym + "done",
             )
-            _add_line(node.code, "sw", [node.record.memory_location(), res_reg])
 
     def _visit_add_expr(self, node: ASTNode):
-        self._dyadic_expr(node)
+        if _logical(node):
+            self._logical_expr(node)
+        else:
+            self._dyadic_expr(node)
 
     def _visit_mult_expr(self, node: ASTNode):
-        self._dyadic_expr(node)
+        if _logical(node):
+            self._logical_expr(node)
+        else:
+            self._dyadic_expr(node)
 
     def _visit_not(self, node: ASTNode):
         child = node.children[0]
         node.code += child.code
         with self.register() as res_reg, self.register() as child_reg:
             self.load_in_reg(node.code, child, child_reg)
-            _add_line(
-                node.code,
-                OP_TO_INSTRUCTION[node.token.token_type],
-                [res_reg, child_reg],
-            )
+            # The parser does not keep the token of `not`
+            _add_line(node.code, OP_TO_INSTRUCTION[O.NOT], [res_reg, child_reg])
             _add_line(node.code, "sw", [node.record.memory_location(), res_reg])
 
     def _visit_sign(self, node: ASTNode):
@@ -433,75 +749,3 @@ class CodeGenerator(Visitor):
                 [res_reg, "r0", child_reg],
             )
             _add_line(node.code, "sw", [node.record.memory_location(), res_reg])
-
-    def _visit_member_decl(self, node: ASTNode):
-        return
-
-    def _visit_var_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_param(self, node: ASTNode):
-        return
-
-    def _visit_data_member(self, node: ASTNode):
-        return
-
-    def _visit_f_call(self, node: ASTNode):
-        return
-
-    def _visit_class_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_decl(self, node: ASTNode):
-        return
-
-    def _visit_id(self, node: ASTNode):
-        return
-
-    def _visit_type(self, node: ASTNode):
-        return
-
-    def _visit_literal(self, node: ASTNode):
-        return
-
-    def _visit_visibility(self, node: ASTNode):
-        return
-
-    def _visit_scope_spec(self, node: ASTNode):
-        return
-
-    def _visit_epsilon(self, node: ASTNode):
-        return
-
-    def _visit_class_list(self, node: ASTNode):
-        return
-
-    def _visit_func_list(self, node: ASTNode):
-        return
-
-    def _visit_inher_list(self, node: ASTNode):
-        return
-
-    def _visit_member_list(self, node: ASTNode):
-        return
-
-    def _visit_local_list(self, node: ASTNode):
-        return
-
-    def _visit_param_list(self, node: ASTNode):
-        return
-
-    def _visit_dim_list(self, node: ASTNode):
-        return
-
-    def _visit_stat_block(self, node: ASTNode):
-        return
-
-    def _visit_index_list(self, node: ASTNode):
-        return
-
-    def _visit_arg_list(self, node: ASTNode):
-        return
-
-    def _visit_prog(self, node: ASTNode):
-        return
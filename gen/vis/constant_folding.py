@@ -0,0 +1,241 @@
+from typing import Dict, List, Optional
+
+from lex.token import Literals as L, Operators as O, Token
+from sem.parallel import preorder
+from sem.table import INT, RecordType, SymbolTable
+from sem.visitor import dispatch, Visitor
+from syn.ast import ASTNode, GroupNodeType, LeafNodeType, ListNodeType
+
+from gen.peephole import IMMEDIATE_RANGE
+
+# Variables whose value can be known, keyed by record identity
+Known = Dict[int, int]
+
+
+def divide(lhs: int, rhs: int) -> Optional[int]:
+    """Integer division truncating toward zero, as moon's C implementation"""
+    if rhs == 0:
+        return None  # Left to fail at run time
+    quotient = abs(lhs) // abs(rhs)
+    return quotient if (lhs < 0) == (rhs < 0) else -quotient
+
+
+OPERATIONS = {
+    O.PLUS: lambda a, b: a + b,
+    O.MINUS: lambda a, b: a - b,
+    O.MULT: lambda a, b: a * b,
+    O.DIV: divide,
+    O.AND: lambda a, b: int(bool(a and b)),
+    O.OR: lambda a, b: int(bool(a or b)),
+    O.EQ: lambda a, b: int(a == b),
+    O.NEQ: lambda a, b: int(a != b),
+    O.LT: lambda a, b: int(a < b),
+    O.GT: lambda a, b: int(a > b),
+    O.LTE: lambda a, b: int(a <= b),
+    O.GTE: lambda a, b: int(a >= b),
+}
+
+
+def scalar_variable(node: ASTNode):
+    """Record of a VAR node naming a local integer or parameter, None otherwise"""
+    if node.node_type != ListNodeType.VAR or len(node.children) != 1:
+        return None
+    member = node.children[0]
+    record = member.record
+    if (
+        member.node_type != GroupNodeType.DATA_MEMBER
+        or member.children[1].children
+        or record is None
+        or record.record_type not in (RecordType.LOCAL, RecordType.PARAM)
+        or record.type.base != INT
+        or record.type.dims
+    ):
+        return None
+    return record
+
+
+def remove_temps(table: SymbolTable, node: ASTNode) -> int:
+    """Remove the temporaries of the nodes of a subtree from `table`, returns how
+    many were removed. `update_offsets` must be called after"""
+    removed = 0
+    for n in preorder(node):
+        for record in (n.record, n.temp_record):
+            if (
+                record is not None
+                and record.record_type == RecordType.TEMP
+                and any(r is record for r in table.entries.get(record.name, ()))
+            ):
+                table.remove(record)
+                removed += 1
+    return removed
+
+
+def to_literal(node: ASTNode, value: int):
+    """Turn `node` into an integer literal, the temporaries of the subtree must be
+    removed first"""
+    location = next(n.token.location for n in preorder(node) if n.token)
+    for child in node.children:
+        child.parent = None
+    node.children = []
+    node.node_type = LeafNodeType.LITERAL
+    node.token = Token(L.INTEGER_LITERAL, str(value), location)
+    node.record = node.temp_record = None
+    node.invalidate()
+
+
+@dispatch(default=lambda self, node, values: None)
+class ExpressionFolder:
+    """Replaces constant integer expressions by literals, returns their value"""
+
+    def __init__(self, container: "ConstantFolder", known: Known):
+        self.container = container
+        self.known = known
+
+    def visit(self, node: ASTNode) -> Optional[int]:
+        values = [self.visit(c) for c in node.children]
+        return self.handlers[node.node_type](self, node, values)
+
+    def _fold(self, node: ASTNode, value: Optional[int]) -> Optional[int]:
+        # Results must fit in the immediate operand used to load them
+        if value is None or value not in IMMEDIATE_RANGE:
+            return None
+        self.container.replace(node, value)
+        return value
+
+    def _binary_op(self, node: ASTNode, values: List[Optional[int]]):
+        token_type = node.token.token_type
+        if token_type in (O.AND, O.OR) and values[0] is not None:
+            if bool(values[0]) == (token_type == O.OR):
+                # Decided by the left operand, the right one is never evaluated
+                return self._fold(node, int(token_type == O.OR))
+        if None in values:
+            return None
+        return self._fold(node, OPERATIONS[node.token.token_type](*values))
+
+    def _visit_add_expr(self, node: ASTNode, values: List[Optional[int]]):
+        return self._binary_op(node, values)
+
+    def _visit_mult_expr(self, node: ASTNode, values: List[Optional[int]]):
+        return self._binary_op(node, values)
+
+    def _visit_rel_expr(self, node: ASTNode, values: List[Optional[int]]):
+        return self._binary_op(node, values)
+
+    def _visit_not(self, node: ASTNode, values: List[Optional[int]]):
+        if values[0] is None:
+            return None
+        return self._fold(node, int(values[0] == 0))
+
+    def _visit_sign(self, node: ASTNode, values: List[Optional[int]]):
+        if values[0] is None:
+            return None
+        sign = -1 if node.token.token_type == O.MINUS else 1
+        return self._fold(node, sign * values[0])
+
+    def _visit_var(self, node: ASTNode, values: List[Optional[int]]):
+        record = scalar_variable(node)
+        if record is None or id(record) not in self.known:
+            return None
+        return self._fold(node, self.known[id(record)])
+
+    def _visit_literal(self, node: ASTNode, values: List[Optional[int]]):
+        if node.token.token_type == L.INTEGER_LITERAL:
+            return int(node.token.lexeme)
+        return None
+
+
+class ConstantFolder(Visitor):
+    """Folds constant integer expressions of function bodies into literals and
+    propagates the values assigned to local variables through straight-line code.
+    Conditionals with a constant condition are replaced by the branch taken, and
+    the temporaries of removed nodes are removed from the function's table."""
+
+    def _visit_func_def(self, node: ASTNode):
+        self._fold_function(node)
+
+    def _visit_main(self, node: ASTNode):
+        self._fold_function(node)
+
+    def _fold_function(self, node: ASTNode):
+        self.removed = 0
+        self._block(node.children[-1], {})
+        if self.removed:
+            self.scope.update_offsets()
+
+    def replace(self, node: ASTNode, value: int):
+        """Turn `node` into an integer literal"""
+        self._remove_temps(node)
+        to_literal(node, value)
+
+    def _remove_temps(self, node: ASTNode):
+        self.removed += remove_temps(self.scope, node)
+
+    def _expression(self, node: ASTNode, known: Known) -> Optional[int]:
+        return ExpressionFolder(self, known).visit(node)
+
+    def _target(self, node: ASTNode, known: Known):
+        """Fold the indices of an assigned variable, it is not known anymore"""
+        for child in node.children:
+            self._expression(child, known)
+        record = scalar_variable(node)
+        if record is not None:
+            known.pop(id(record), None)
+        return record
+
+    def _block(self, block: ASTNode, known: Known):
+        i = 0
+        while i < len(block.children):
+            stat = block.children[i]
+            replacement = self._statement(stat, known)
+            if replacement is None:
+                i += 1
+                continue
+            # Statement replaced by the statements of the branch it always takes
+            stat.parent = None
+            for child in replacement:
+                child.parent = block
+            block.children[i : i + 1] = replacement
+            block.invalidate()
+
+    def _statement(self, stat: ASTNode, known: Known) -> Optional[List[ASTNode]]:
+        node_type = stat.node_type
+        if node_type == GroupNodeType.ASSIGN_STAT:
+            value = self._expression(stat.children[1], known)
+            record = self._target(stat.children[0], known)
+            if record is not None and value is not None:
+                known[id(record)] = value
+        elif node_type == GroupNodeType.READ_STAT:
+            self._target(stat.children[0], known)
+        elif node_type == GroupNodeType.IF_STAT:
+            condition = self._expression(stat.children[0], known)
+            if condition is not None:
+                taken, skipped = stat.children[1:]
+                if not condition:
+                    taken, skipped = skipped, taken
+                self._remove_temps(skipped)
+                return taken.children
+            then, else_ = dict(known), dict(known)
+            self._block(stat.children[1], then)
+            self._block(stat.children[2], else_)
+            known.clear()
+            known.update((k, v) for k, v in then.items() if else_.get(k) == v)
+        elif node_type == GroupNodeType.WHILE_STAT:
+            for record in assigned(stat.children[1]):
+                known.pop(id(record), None)
+            if self._expression(stat.children[0], known) == 0:
+                self._remove_temps(stat)
+                return []
+            self._block(stat.children[1], dict(known))
+        else:  # Write, return and function call statements
+            for child in stat.children:
+                self._expression(child, known)
+        return None
+
+
+def assigned(block: ASTNode):
+    """Variables assigned or read anywhere in `block`"""
+    for node in preorder(block):
+        if node.node_type in (GroupNodeType.ASSIGN_STAT, GroupNodeType.READ_STAT):
+            record = scalar_variable(node.children[0])
+            if record is not None:
+                yield record
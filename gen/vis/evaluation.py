@@ -0,0 +1,275 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from lex.token import Literals as L, Operators as O
+from sem.parallel import function_units, preorder
+from sem.table import INT, RecordType
+from sem.visitor import dispatch, Visitor
+from syn.ast import ASTNode, GroupNodeType, ListNodeType
+
+from gen.peephole import IMMEDIATE_RANGE
+from gen.vis.constant_folding import OPERATIONS, remove_temps, to_literal
+from gen.vis.inlining import is_integer
+
+# Most statements and expressions run to evaluate a call at compile time
+EVALUATION_BUDGET = 10000
+# Values of a moon word, computations leaving it are left to run time
+WORD_RANGE = range(-(1 << 31), 1 << 31)
+
+# Values of the variables of a call, keyed by record identity then indices
+Environment = Dict[Tuple, int]
+
+
+class Unevaluable(Exception):
+    """Raised when a call cannot be evaluated at compile time"""
+
+
+def _call(node: ASTNode) -> Optional[ASTNode]:
+    """F_CALL node of a VAR or call statement calling a free function, None
+    otherwise"""
+    if node.node_type not in (ListNodeType.VAR, ListNodeType.F_CALL_STAT):
+        return None
+    if len(node.children) != 1:
+        return None
+    f_call = node.children[0]
+    if f_call.node_type != GroupNodeType.F_CALL or f_call.record is None:
+        return None
+    if f_call.record.table is None or "::" in f_call.record.table.name:
+        return None
+    return f_call
+
+
+def _callees(func_def: ASTNode) -> Optional[Set[int]]:
+    """Tables of the functions called by a function, None unless the function
+    computes its result from its integer parameters and locals alone: it neither
+    reads nor writes and only calls free functions"""
+    callees = set()
+    for node in preorder(func_def.children[-1]):
+        if node.node_type in (GroupNodeType.READ_STAT, GroupNodeType.WRITE_STAT):
+            return None
+        if node.node_type not in (ListNodeType.VAR, ListNodeType.F_CALL_STAT):
+            continue
+        f_call = _call(node)
+        if f_call is not None:
+            callees.add(id(f_call.record.table))
+            continue
+        member = node.children[0]
+        record = member.record
+        if (
+            len(node.children) != 1  # Member of an object or member function
+            or member.node_type != GroupNodeType.DATA_MEMBER
+            or record is None
+            or record.record_type not in (RecordType.LOCAL, RecordType.PARAM)
+            or record.type.base != INT
+        ):
+            return None
+    return callees
+
+
+def pure_functions(root: ASTNode) -> Dict[int, ASTNode]:
+    """Definitions of the free functions returning an integer computed from their
+    integer parameters alone, by the identity of their table. Functions calling
+    an impure function are impure, recursive calls are not."""
+    functions: Dict[int, ASTNode] = {}
+    calls: Dict[int, Set[int]] = {}
+    for unit in function_units(root)[:-1]:
+        record = unit.record
+        if record is None or record.table is None or "::" in record.table.name:
+            continue
+        params = record.params or ()
+        if not is_integer(record) or not all(is_integer(p) for p in params):
+            continue
+        callees = _callees(unit)
+        if callees is not None:
+            functions[id(record.table)] = unit
+            calls[id(record.table)] = callees
+    changed = True
+    while changed:
+        changed = False
+        for table in list(functions):
+            if not calls[table] <= functions.keys():
+                del functions[table]
+                changed = True
+    return functions
+
+
+@dispatch(default=lambda self, node, env: self.fail())
+class Interpreter:
+    """Runs pure functions on the AST, statements return the value returned by a
+    `return` statement they ran, if any. Every statement and expression run takes
+    a step out of `budget`."""
+
+    def __init__(self, functions: Dict[int, ASTNode], budget: int = EVALUATION_BUDGET):
+        self.functions = functions
+        self.steps = budget
+
+    @staticmethod
+    def fail():
+        raise Unevaluable()
+
+    def call(self, func_def: ASTNode, args: List[int]) -> int:
+        table = func_def.record.table
+        params = {
+            r.name: r
+            for entries in table.entries.values()
+            for r in entries
+            if r.record_type == RecordType.PARAM
+        }
+        env = {
+            (id(params[p.name]),): value
+            for p, value in zip(func_def.record.params, args)
+        }
+        value = self._block(func_def.children[-1], env)
+        if value is None:
+            self.fail()  # Ends without returning
+        return value
+
+    def run(self, node: ASTNode, env: Environment) -> Optional[int]:
+        self.steps -= 1
+        if self.steps < 0:
+            self.fail()
+        return self.handlers[node.node_type](self, node, env)
+
+    def value(self, node: ASTNode, env: Environment) -> int:
+        value = self.run(node, env)
+        if value is None or value not in WORD_RANGE:
+            self.fail()
+        return value
+
+    def _block(self, block: ASTNode, env: Environment) -> Optional[int]:
+        for stat in block.children:
+            value = self.run(stat, env)
+            if value is not None:
+                return value
+        return None
+
+    def _visit_stat_block(self, node: ASTNode, env: Environment):
+        return self._block(node, env)
+
+    def _visit_assign_stat(self, node: ASTNode, env: Environment):
+        target, expression = node.children
+        value = self.value(expression, env)
+        key = self._variable(target.children[0], env)
+        env[key] = value
+        return None
+
+    def _visit_if_stat(self, node: ASTNode, env: Environment):
+        condition, then, else_ = node.children
+        return self._block(then if self.value(condition, env) else else_, env)
+
+    def _visit_while_stat(self, node: ASTNode, env: Environment):
+        condition, body = node.children
+        while self.value(condition, env):
+            value = self._block(body, env)
+            if value is not None:
+                return value
+        return None
+
+    def _visit_return_stat(self, node: ASTNode, env: Environment):
+        return self.value(node.children[0], env)
+
+    def _visit_f_call_stat(self, node: ASTNode, env: Environment):
+        self._visit_f_call(node.children[-1], env)
+        return None
+
+    def _visit_f_call(self, node: ASTNode, env: Environment) -> int:
+        func_def = self.functions.get(id(node.record.table))
+        if func_def is None:
+            self.fail()
+        args = [self.value(arg, env) for arg in node.children[1].children]
+        return self.call(func_def, args)
+
+    def _visit_var(self, node: ASTNode, env: Environment) -> int:
+        member = node.children[0]
+        if member.node_type == GroupNodeType.F_CALL:
+            return self._visit_f_call(member, env)
+        key = self._variable(member, env)
+        if key not in env:
+            self.fail()  # Read before it is assigned
+        return env[key]
+
+    def _variable(self, member: ASTNode, env: Environment) -> Tuple:
+        """Key of the variable or array element named by a DATA_MEMBER node"""
+        record = member.record
+        indices = tuple(self.value(i, env) for i in member.children[1].children)
+        for index, dim in zip(indices, record.type.dims):
+            if dim is None or index not in range(int(dim.lexeme)):
+                self.fail()
+        return (id(record),) + indices
+
+    def _visit_literal(self, node: ASTNode, env: Environment) -> int:
+        if node.token.token_type != L.INTEGER_LITERAL:
+            self.fail()
+        return int(node.token.lexeme)
+
+    def _binary_op(self, node: ASTNode, env: Environment) -> int:
+        lhs, rhs = node.children
+        token_type = node.token.token_type
+        value = self.value(lhs, env)
+        if token_type in (O.AND, O.OR) and bool(value) == (token_type == O.OR):
+            return int(token_type == O.OR)  # The right operand is not evaluated
+        value = OPERATIONS[token_type](value, self.value(rhs, env))
+        if value is None:
+            self.fail()  # Division by zero
+        return value
+
+    def _visit_add_expr(self, node: ASTNode, env: Environment) -> int:
+        return self._binary_op(node, env)
+
+    def _visit_mult_expr(self, node: ASTNode, env: Environment) -> int:
+        return self._binary_op(node, env)
+
+    def _visit_rel_expr(self, node: ASTNode, env: Environment) -> int:
+        return self._binary_op(node, env)
+
+    def _visit_not(self, node: ASTNode, env: Environment) -> int:
+        return int(self.value(node.children[0], env) == 0)
+
+    def _visit_sign(self, node: ASTNode, env: Environment) -> int:
+        value = self.value(node.children[0], env)
+        return -value if node.token.token_type == O.MINUS else value
+
+
+class PartialEvaluator(Visitor):
+    """Replaces the calls of pure functions whose arguments are constant by the
+    value they return, computed by running them on the AST within `budget` steps
+    per call. Calls are left to run time when the evaluation runs out of steps
+    or of Python stack, or does what the moon simulator would not do the same
+    way: divide by zero, overflow a word, read a variable before assigning it or
+    index out of bounds. Every replaced call is reported in `evaluated` as its
+    callee, caller and value."""
+
+    def __init__(self, context, output=None, budget: int = EVALUATION_BUDGET):
+        super().__init__(context, output)
+        self.budget = budget
+        self.evaluated: List[Tuple[str, str, int]] = []
+
+    def _visit_prog(self, node: ASTNode):
+        self._functions = pure_functions(node)
+        if not self._functions:
+            return
+        for unit in function_units(node):
+            if unit.record is None or unit.record.table is None:
+                continue
+            self.scope = unit.record.table
+            self.removed = 0
+            self._expressions(unit.children[-1])
+            if self.removed:
+                self.scope.update_offsets()
+
+    def _expressions(self, node: ASTNode):
+        """Replace the calls evaluated in the expressions of a subtree, innermost
+        calls are tried when their enclosing call is not evaluated"""
+        f_call = _call(node) if node.node_type == ListNodeType.VAR else None
+        if f_call is not None and id(f_call.record.table) in self._functions:
+            try:
+                value = Interpreter(self._functions, self.budget).value(node, {})
+            except (Unevaluable, RecursionError):
+                value = None
+            if value is not None and value in IMMEDIATE_RANGE:
+                self.removed += remove_temps(self.scope, node)
+                to_literal(node, value)
+                name = f_call.record.table.name
+                self.evaluated.append((name, self.scope.name, value))
+                return
+        for child in node.children:
+            self._expressions(child)
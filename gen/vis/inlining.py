@@ -0,0 +1,263 @@
+from typing import Dict, List, Optional, Tuple
+
+from lex.token import Generic as G, Literals as L, Operators as O, Symbols as S, Token
+from sem.parallel import function_units, preorder
+from sem.table import INT, Record, RecordType, SymbolTable
+from sem.visitor import Visitor
+from syn.ast import ASTNode, GroupNodeType, LeafNodeType, ListNodeType
+
+from gen.vis.constant_folding import remove_temps
+
+# Largest callee body inlined, in AST nodes
+INLINE_BUDGET = 32
+# Statements whose calls are all evaluated before the statement's own effect
+HOISTED_STATEMENTS = (
+    GroupNodeType.ASSIGN_STAT,
+    GroupNodeType.WRITE_STAT,
+    GroupNodeType.RETURN_STAT,
+    GroupNodeType.IF_STAT,
+    ListNodeType.F_CALL_STAT,
+)
+
+
+def _assigned_member(stat: ASTNode) -> bool:
+    """Whether a statement writes a data member of the object a function runs on"""
+    if stat.node_type not in (GroupNodeType.ASSIGN_STAT, GroupNodeType.READ_STAT):
+        return False
+    record = stat.children[0].children[0].record
+    return record is None or record.record_type == RecordType.DATA
+
+
+def inline_cost(func_def: ASTNode, budget: int = INLINE_BUDGET) -> Optional[int]:
+    """Size of the body of a function which can be inlined, None if it cannot:
+    it must return an integer from its last statement only, take integer
+    parameters, call no function, not write data members and fit in `budget`"""
+    record = func_def.record
+    if record is None or record.table is None or not is_integer(record):
+        return None
+    if not all(is_integer(p) for p in record.params or ()):
+        return None
+    stats = func_def.children[-1].children
+    if not stats or stats[-1].node_type != GroupNodeType.RETURN_STAT:
+        return None
+    nodes = preorder(func_def.children[-1])
+    for node in nodes:
+        if node.node_type in (GroupNodeType.F_CALL, ListNodeType.F_CALL_STAT):
+            return None
+        if node.node_type == GroupNodeType.RETURN_STAT and node is not stats[-1]:
+            return None
+        if _assigned_member(node):
+            return None
+    return len(nodes) if len(nodes) <= budget else None
+
+
+def new_record(table: SymbolTable, name: str, record: Record, record_type) -> Record:
+    """Variable of the type of `record` added to `table`, `update_offsets` must be
+    called after"""
+    last = max(
+        (r.offset for entries in table.entries.values() for r in entries),
+        default=0,
+    )
+    new = Record(name, record.type, record_type, record.location)
+    table.insert(new)
+    # After the variables whose offsets are already computed
+    new.offset = last + 1
+    return new
+
+
+def _short_circuit(node: ASTNode) -> bool:
+    return node.token is not None and node.token.token_type in (O.AND, O.OR)
+
+
+def is_integer(record: Record) -> bool:
+    """Whether `record` is an integer scalar"""
+    return record.type.base == INT and not record.type.dims
+
+
+def integer_literal(value: int, location) -> ASTNode:
+    """LITERAL node of an integer"""
+    return ASTNode(LeafNodeType.LITERAL, Token(L.INTEGER_LITERAL, str(value), location))
+
+
+def _variable(record: Record, location) -> ASTNode:
+    """VAR node naming a scalar variable"""
+    var = ASTNode(ListNodeType.VAR)
+    member = var.make_child(GroupNodeType.DATA_MEMBER)
+    member.make_child(LeafNodeType.ID, Token(G.ID, record.name, location))
+    member.make_child(ListNodeType.INDEX_LIST)
+    member.record = record
+    return var
+
+
+def _assign(record: Record, value: ASTNode, location) -> ASTNode:
+    stat = ASTNode(GroupNodeType.ASSIGN_STAT, Token(S.ASSIGN, "=", location))
+    stat.adopt(_variable(record, location))
+    stat.adopt(value)
+    return stat
+
+
+def _evaluation_order(node: ASTNode) -> List[ASTNode]:
+    """Calls of an expression in the order their code runs, operands of binary
+    operators and assignments are generated right to left"""
+    children = list(node.children)
+    if node.node_type in (
+        GroupNodeType.ASSIGN_STAT,
+        GroupNodeType.REL_EXPR,
+        GroupNodeType.ADD_EXPR,
+        GroupNodeType.MULT_EXPR,
+    ):
+        children.reverse()
+    calls = []
+    for child in children:
+        calls += _evaluation_order(child)
+    if node.node_type in (ListNodeType.VAR, ListNodeType.F_CALL_STAT) and any(
+        c.node_type == GroupNodeType.F_CALL for c in node.children
+    ):
+        calls.append(node)
+    return calls
+
+
+class Inliner(Visitor):
+    """Substitutes the bodies of small leaf functions at their call sites.
+    The parameters and locals of the callee become variables of the caller, the
+    arguments are assigned to them and the body is moved before the statement
+    making the call, whose value becomes the returned expression. Every inlined
+    call is reported in `inlined` as a pair of callee and caller names."""
+
+    def __init__(self, context, output=None, budget: int = INLINE_BUDGET):
+        super().__init__(context, output)
+        self.budget = budget
+        self.inlined: List[Tuple[str, str]] = []
+        self._count = 0
+
+    def _visit_prog(self, node: ASTNode):
+        units = function_units(node)
+        self._callees: Dict[int, ASTNode] = {
+            id(unit.record.table): unit
+            for unit in units[:-1]
+            if inline_cost(unit, self.budget) is not None
+        }
+        for unit in units:
+            if unit.record is None or unit.record.table is None:
+                continue
+            self.scope = unit.record.table
+            self._changed = False
+            self._block(unit.children[-1])
+            if self._changed:
+                self.scope.update_offsets()
+
+    def _block(self, block: ASTNode):
+        i = 0
+        while i < len(block.children):
+            stat = block.children[i]
+            for child in stat.children:
+                if child.node_type == ListNodeType.STAT_BLOCK:
+                    self._block(child)
+            hoisted = self._statement(stat)
+            if hoisted is None:
+                i += 1
+                continue
+            for new in hoisted:
+                new.parent = block
+            replaced = int(stat.node_type == ListNodeType.F_CALL_STAT)
+            if replaced:
+                stat.parent = None
+            block.children[i : i + replaced] = hoisted
+            block.invalidate()
+            i += len(hoisted) + 1 - replaced
+
+    def _statement(self, stat: ASTNode) -> Optional[List[ASTNode]]:
+        """Statements replacing the calls of `stat`, None if they are not inlined"""
+        if stat.node_type not in HOISTED_STATEMENTS:
+            return None
+        expressions = [
+            c for c in stat.children if c.node_type != ListNodeType.STAT_BLOCK
+        ]
+        calls = [c for e in expressions for c in _evaluation_order(e)]
+        if stat.node_type == ListNodeType.F_CALL_STAT:
+            calls = _evaluation_order(stat)
+        if not calls or not all(self._inlinable(c) for c in calls):
+            return None
+        if any(_short_circuit(n) for e in expressions for n in preorder(e)):
+            return None  # Calls in right operands may not be evaluated
+        hoisted = []
+        for call in calls:
+            hoisted += self._inline(call)
+        self._changed = True
+        return hoisted
+
+    def _inlinable(self, call: ASTNode) -> bool:
+        *prefix, f_call = call.children
+        if f_call.record is None or id(f_call.record.table) not in self._callees:
+            return False
+        if not prefix:
+            return "::" not in f_call.record.table.name
+        # Member functions run on a local object or a data member of this
+        obj = prefix[-1].record
+        return (
+            len(prefix) == 1
+            and not prefix[0].children[1].children
+            and obj is not None
+            and obj.record_type in (RecordType.LOCAL, RecordType.DATA)
+        )
+
+    def _inline(self, call: ASTNode) -> List[ASTNode]:
+        """Statements computing the call, which is replaced by the returned value"""
+        *prefix, f_call = call.children
+        callee = self._callees[id(f_call.record.table)]
+        location = f_call.children[0].token.location
+        self._count += 1
+        records: Dict[int, Record] = {}
+        params: Dict[str, Record] = {}
+        for entries in callee.record.table.entries.values():
+            for record in entries:
+                if record.record_type in (RecordType.PARAM, RecordType.LOCAL):
+                    records[id(record)] = params[record.name] = self._new_record(
+                        "_{}{}".format(record.name, self._count),
+                        record,
+                        RecordType.LOCAL,
+                    )
+
+        hoisted = []
+        args, f_call.children[1].children = f_call.children[1].children, []
+        for param, arg in zip(callee.record.params, args):
+            arg.parent = None
+            hoisted.append(_assign(params[param.name], arg, location))
+        body = [self._clone(s, records, prefix) for s in callee.children[-1].children]
+        value = body.pop().children[0]
+        hoisted += body
+
+        remove_temps(self.scope, f_call)
+        if call.node_type == ListNodeType.F_CALL_STAT:
+            # The returned value is not used
+            remove_temps(self.scope, value)
+        else:
+            parent = call.parent
+            parent.children[parent.children.index(call)] = value
+            value.parent = parent
+            parent.invalidate()
+            call.parent = None
+        self.inlined.append((callee.record.table.name, self.scope.name))
+        return hoisted
+
+    def _new_record(self, name: str, record: Record, record_type) -> Record:
+        return new_record(self.scope, name, record, record_type)
+
+    def _clone(
+        self, node: ASTNode, records: Dict[int, Record], prefix: List[ASTNode]
+    ) -> ASTNode:
+        clone = ASTNode(node.node_type, node.token)
+        for attribute in ("record", "temp_record"):
+            record = getattr(node, attribute)
+            if record is not None and record.record_type == RecordType.TEMP:
+                records[id(record)] = self._new_record("", record, RecordType.TEMP)
+            if record is not None:
+                setattr(clone, attribute, records.get(id(record), record))
+        if node.node_type == ListNodeType.VAR and prefix:
+            first = node.children[0].record
+            if first is not None and first.record_type == RecordType.DATA:
+                # Data members of the object the function was called on
+                clone.adopt(self._clone(prefix[0], {}, []))
+        for child in node.children:
+            clone.adopt(self._clone(child, records, prefix))
+        return clone
@@ -0,0 +1,54 @@
+from typing import List
+
+from sem.parallel import function_units, preorder
+from sem.table import Record, RecordType, SymbolTable
+from sem.visitor import Visitor
+from syn.ast import ASTNode, GroupNodeType
+
+
+class DeadFunctionElimination(Visitor):
+    """Removes the definitions of the functions and member functions which main
+    never calls, directly or through other functions, along with their records"""
+
+    def _visit_prog(self, node: ASTNode):
+        units = function_units(node)
+        by_table = {
+            id(unit.record.table): unit
+            for unit in units
+            if unit.record and unit.record.table
+        }
+        main = units[-1]
+        reachable = {id(main)}
+        pending = [main]
+        while pending:
+            for n in preorder(pending.pop()):
+                if n.node_type != GroupNodeType.F_CALL or n.record is None:
+                    continue
+                callee = by_table.get(id(n.record.table))
+                if callee is not None and id(callee) not in reachable:
+                    reachable.add(id(callee))
+                    pending.append(callee)
+
+        func_list = node.children[1]
+        for func_def in func_list.children:
+            if id(func_def) not in reachable:
+                func_def.parent = None
+                if func_def.record is not None:
+                    self._remove(func_def.record)
+        func_list.children = [f for f in func_list.children if id(f) in reachable]
+        func_list.invalidate()
+
+    def _remove(self, record: Record):
+        for table in self._tables():
+            if any(r is record for r in table.entries.get(record.name, ())):
+                table.remove(record)
+                return
+
+    def _tables(self) -> List[SymbolTable]:
+        globals_ = self.context.globals
+        return [globals_] + [
+            r.table
+            for records in globals_.entries.values()
+            for r in records
+            if r.record_type == RecordType.CLASS
+        ]
@@ -0,0 +1,291 @@
+from typing import Dict, List, Optional, Tuple
+
+from lex.token import Literals as L, Operators as O, Token
+from sem.parallel import preorder
+from sem.table import Record, RecordType
+from sem.visitor import Visitor
+from syn.ast import ASTNode, GroupNodeType, LeafNodeType, ListNodeType
+
+from gen.peephole import is_immediate
+from gen.vis.constant_folding import assigned, OPERATIONS, scalar_variable
+from gen.vis.inlining import _assign, _variable, integer_literal, new_record
+
+# Copies of the body of a loop in every iteration of the unrolled loop
+UNROLL_FACTOR = 4
+# Most AST nodes added to a function by unrolling one of its loops
+UNROLL_BUDGET = 256
+# Most temporaries added to a function by unrolling one of its loops
+UNROLL_TEMPS = 64
+# Loops running more iterations are not unrolled, their trip count is not computed
+MAX_TRIPS = 1 << 16
+
+MIRRORED = {O.LT: O.GT, O.GT: O.LT, O.LTE: O.GTE, O.GTE: O.LTE, O.NEQ: O.NEQ}
+
+
+def _literal(node: ASTNode) -> Optional[int]:
+    if node.node_type == LeafNodeType.LITERAL and node.token.token_type == (
+        L.INTEGER_LITERAL
+    ):
+        return int(node.token.lexeme)
+    return None
+
+
+def _condition(node: ASTNode) -> Optional[Tuple[Record, O, int]]:
+    """Counter, relation and bound of a condition comparing a variable to a literal,
+    with the variable on the left"""
+    if node.node_type != GroupNodeType.REL_EXPR or node.token.token_type == O.EQ:
+        return None
+    relation = node.token.token_type
+    lhs, rhs = node.children
+    if _literal(lhs) is not None:
+        lhs, rhs = rhs, lhs
+        relation = MIRRORED[relation]
+    record, bound = scalar_variable(lhs), _literal(rhs)
+    if record is None or bound is None:
+        return None
+    return record, relation, bound
+
+
+def _step(stat: ASTNode, record: Record) -> Optional[int]:
+    """Constant added to `record` by an assignment of the form `i = i + 1`"""
+    if stat.node_type != GroupNodeType.ASSIGN_STAT:
+        return None
+    target, value = stat.children
+    if scalar_variable(target) is not record:
+        return None
+    if value.node_type != GroupNodeType.ADD_EXPR or value.token.token_type not in (
+        O.PLUS,
+        O.MINUS,
+    ):
+        return None
+    lhs, rhs = value.children
+    if value.token.token_type == O.PLUS and _literal(lhs) is not None:
+        lhs, rhs = rhs, lhs
+    if scalar_variable(lhs) is not record or _literal(rhs) is None:
+        return None
+    return _literal(rhs) if value.token.token_type == O.PLUS else -_literal(rhs)
+
+
+def trip_count(start: int, relation: O, bound: int, step: int) -> Optional[int]:
+    """Iterations of a loop whose counter starts at `start` and moves by `step`
+    while it stands in `relation` to `bound`, None if it does not end within
+    `MAX_TRIPS` iterations"""
+    value = start
+    for trips in range(MAX_TRIPS + 1):
+        if not OPERATIONS[relation](value, bound):
+            return trips
+        value += step
+    return None
+
+
+def unroll_factor(trips: int, factor: int) -> Optional[int]:
+    """Factor by which to unroll a loop running `trips` iterations, at most `factor`.
+    Factors leaving no iteration to a remainder loop are preferred, otherwise the
+    unrolled loop must iterate at least twice to pay for the remainder loop."""
+    for exact in range(min(factor, trips), 1, -1):
+        if trips % exact == 0:
+            return exact
+    return factor if factor > 1 and trips >= 2 * factor else None
+
+
+def _operator(token_type: O, location) -> Token:
+    lexemes = {O.LT: "<", O.GT: ">", O.PLUS: "+", O.MINUS: "-"}
+    return Token(token_type, lexemes[token_type], location)
+
+
+def _rename(node: ASTNode, record: Record, new: Record):
+    """Make the variables of a subtree naming `record` name `new`"""
+    for var in preorder(node):
+        if scalar_variable(var) is record:
+            member = var.children[0]
+            member.record = new
+            name = member.children[0]
+            name.token = Token(name.token.token_type, new.name, name.token.location)
+
+
+def clone(node: ASTNode) -> ASTNode:
+    """Copy of a subtree sharing the records of its nodes"""
+    copy = ASTNode(node.node_type, node.token)
+    copy.record, copy.temp_record = node.record, node.temp_record
+    for child in node.children:
+        copy.adopt(clone(child))
+    return copy
+
+
+class LoopUnroller(Visitor):
+    """Unrolls innermost `while` loops counting a local variable from a known value
+    to a literal bound by a literal step. The unrolled loop runs `factor` copies of
+    the body per iteration for as many iterations as the trip count allows, the
+    original loop follows to run the remaining ones. Every copy computes into
+    temporaries of its own, so that register allocation keeps their values apart;
+    slot sharing gives their stack slots back once the function is generated.
+    After the first, copies read a local set to the counter plus the steps of the
+    copies before them, so that the counter is stepped once per iteration, as loop
+    optimizations expect. The factor is reduced for loops whose copies would add
+    more than `budget` AST nodes or `UNROLL_TEMPS` temporaries, and to leave no
+    remainder where it can. Every unrolled loop is reported in `unrolled` as its
+    function name, trip count and factor."""
+
+    def __init__(
+        self,
+        context,
+        output=None,
+        factor: int = UNROLL_FACTOR,
+        budget: int = UNROLL_BUDGET,
+    ):
+        super().__init__(context, output)
+        self.factor = factor
+        self.budget = budget
+        self.unrolled: List[Tuple[str, int, int]] = []
+
+    def _visit_func_def(self, node: ASTNode):
+        self._unroll_function(node)
+
+    def _visit_main(self, node: ASTNode):
+        self._unroll_function(node)
+
+    def _unroll_function(self, node: ASTNode):
+        self._changed = False
+        self._block(node.children[-1])
+        if self._changed:
+            self.scope.update_offsets()
+
+    def _block(self, block: ASTNode):
+        i = 0
+        while i < len(block.children):
+            stat = block.children[i]
+            for child in stat.children:
+                if child.node_type == ListNodeType.STAT_BLOCK:
+                    self._block(child)
+            unrolled = None
+            if stat.node_type == GroupNodeType.WHILE_STAT:
+                unrolled = self._unroll(stat, block.children[:i])
+            if unrolled is None:
+                i += 1
+                continue
+            for new in unrolled:
+                new.parent = block
+            block.children[i : i + 1] = unrolled
+            block.invalidate()
+            i += len(unrolled)
+
+    def _start(self, record: Record, previous: List[ASTNode]) -> Optional[int]:
+        """Value of `record` when the statements before a loop assign it a literal"""
+        for stat in reversed(previous):
+            if any(r is record for r in assigned(stat)):
+                if stat.node_type != GroupNodeType.ASSIGN_STAT:
+                    return None
+                if scalar_variable(stat.children[0]) is not record:
+                    return None  # Assigned in a nested block
+                return _literal(stat.children[1])
+        return None
+
+    def _unroll(
+        self, loop: ASTNode, previous: List[ASTNode]
+    ) -> Optional[List[ASTNode]]:
+        """Unrolled loop followed by the original one if iterations remain, None if
+        the loop cannot be unrolled"""
+        condition, body = loop.children
+        counted = _condition(condition)
+        if counted is None or not body.children:
+            return None
+        record, relation, bound = counted
+        *stats, increment = body.children
+        step = _step(increment, record)
+        if not step or any(r is record for s in stats for r in assigned(s)):
+            return None
+        nodes = preorder(body)
+        if any(n.node_type == GroupNodeType.WHILE_STAT for n in nodes):
+            return None  # Not innermost
+        start = self._start(record, previous)
+        if start is None:
+            return None
+        trips = trip_count(start, relation, bound, step)
+        if trips is None:
+            return None
+
+        temps = {
+            id(n.record)
+            for n in nodes
+            if n.record is not None and n.record.record_type == RecordType.TEMP
+        }
+        most = min(
+            self.factor,
+            self.budget // len(nodes) + 1,
+            UNROLL_TEMPS // max(len(temps), 1) + 1,
+        )
+        factor = unroll_factor(trips, most)
+        if factor is None:
+            return None
+        end = start + trips // factor * factor * step
+        if not is_immediate(str(end)) or not is_immediate(str(factor * step)):
+            return None
+
+        lhs, rhs = condition.children
+        location = condition.token.location
+        relation = _operator(O.LT if step > 0 else O.GT, location)
+        test = ASTNode(GroupNodeType.REL_EXPR, relation)
+        test.record = condition.record
+        test.adopt(clone(rhs if _literal(lhs) is not None else lhs))
+        test.adopt(integer_literal(end, location))
+
+        unrolled = ASTNode(GroupNodeType.WHILE_STAT, loop.token)
+        unrolled.adopt(test)
+        copies = unrolled.make_child(ListNodeType.STAT_BLOCK, body.token)
+        reads = any(scalar_variable(n) is record for s in stats for n in preorder(s))
+        # The temporaries of the body are left to the loop running the remaining
+        # iterations, or to the first copy when there are none
+        exact = trips % factor == 0
+        if reads:
+            name = "_{}{}".format(record.name, len(self.scope.entries))
+            local = new_record(self.scope, name, record, RecordType.LOCAL)
+        for m in range(factor):
+            temps = None if exact and m == 0 else {}
+            shifted = None
+            if reads and m:
+                shifted = local
+                copies.adopt(self._shift(record, shifted, m * step))
+            for stat in stats:
+                copy = self._copy(stat, temps)
+                if shifted is not None:
+                    _rename(copy, record, shifted)
+                copies.adopt(copy)
+        stepped = self._copy(increment, None if exact else {})
+        value = stepped.children[1]
+        literal = value.children[int(scalar_variable(value.children[0]) is record)]
+        literal.token = integer_literal(abs(factor * step), location).token
+        copies.adopt(stepped)
+
+        self._changed = True
+        self.unrolled.append((self.scope.name, trips, factor))
+        if exact:
+            return [unrolled]  # The original loop would not iterate
+        return [unrolled, loop]
+
+    def _copy(self, node: ASTNode, temps: Optional[Dict[int, Record]]) -> ASTNode:
+        """Clone of a statement computing into the temporaries of `temps`, added to
+        it as needed, or into those of the statement when None"""
+        copy = clone(node)
+        if temps is None:
+            return copy
+        for n in preorder(copy):
+            record = n.record
+            if record is None or record.record_type != RecordType.TEMP:
+                continue
+            if id(record) not in temps:
+                new = new_record(self.scope, "", record, RecordType.TEMP)
+                # Temporaries of calls hold their function
+                new.table, new.params = record.table, record.params
+                temps[id(record)] = new
+            n.record = temps[id(record)]
+        return copy
+
+    def _shift(self, record: Record, shifted: Record, offset: int) -> ASTNode:
+        """Statement assigning `record` plus `offset` to `shifted`"""
+        location = record.location
+        operator = O.PLUS if offset > 0 else O.MINUS
+        value = ASTNode(GroupNodeType.ADD_EXPR, _operator(operator, location))
+        value.record = new_record(self.scope, "", record, RecordType.TEMP)
+        value.adopt(_variable(record, location))
+        value.adopt(integer_literal(abs(offset), location))
+        return _assign(shifted, value, location)
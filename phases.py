@@ -1,6 +1,6 @@
 from lex import output as lex_out, Scanner
 from syn import output as syn_out, Parser
-from sem import output as sem_out, SemanticAnalyzer
+from sem import output as sem_out, CompilationContext, SemanticAnalyzer
 from gen import output as gen_out, Generator
 
 PHASES = {
@@ -13,18 +13,22 @@ PHASES = {
 
 
 class PhaseHandler:
-    def __init__(self, f, phase):
+    def __init__(self, f, phase, jobs=1, level=2, enable=(), disable=(), stats=False):
         self._file = f
         self._phase = phase
+        self._stats = stats
         self.success = True
 
         self.output = GenericOutput(f.name)
+        self.context = CompilationContext()
 
         self.lex = Scanner(f)
         self.fork = TokenForkWrapper(self.lex, self.output.token)
         self.syn = Parser(prodcution_handler=self.output, error_handler=self.output)
-        self.sem = SemanticAnalyzer(output=self.output)
-        self.gen = Generator()
+        self.sem = SemanticAnalyzer(self.context, output=self.output, jobs=jobs)
+        self.gen = Generator(
+            self.context, jobs=jobs, level=level, enable=enable, disable=disable
+        )
 
     def run(self):
         getattr(self, "_" + self._phase, self._error)()
@@ -46,15 +50,18 @@ class PhaseHandler:
     def _sem(self):
         result = self._syn()
         self.sem.start(result.ast)
-        self.output.tables()
+        if self._phase == "sem":
+            self.output.tables(self.context.globals)
         return result
 
     def _gen(self):
         result = self._sem()
-        if self.output.did_fail():
-            return
-        executable = self.gen.start(result.ast)
-        self.output.executable(executable)
+        if not self.output.did_fail():
+            self.output.executable(self.gen.generate(result.ast))
+            if self._stats:
+                self.output.summary(self.gen.timings, self.gen.prog)
+        # With the stack offsets of the generated functions
+        self.output.tables(self.context.globals)
 
     def _exe(self):
         self._gen()
@@ -80,9 +87,13 @@ class GenericOutput(lex_out.TokenOutput, syn_out.ParserOutput, sem_out.SemanticO
         super().__init__(source_file)
         self.source_file = source_file
         self.gen_out = gen_out.ExecutableOutput(self.source_file)
+        self._summary = None
+
+    def executable(self, prog):
+        self.gen_out.emit(prog)
 
-    def executable(self, exe: str):
-        self.gen_out.write(exe)
+    def summary(self, timings, prog):
+        self._summary = gen_out.summary(timings, prog)
 
     def _print_errors(self):
         errors = [e for e in lex_out.TokenOutput.list_errors(self)]
@@ -145,6 +156,8 @@ class GenericOutput(lex_out.TokenOutput, syn_out.ParserOutput, sem_out.SemanticO
     def finish(self, phase):
         self._print_errors()
         self._print_status(phase)
+        if self._summary:
+            print(self._summary)
         self._list_files(phase)
 
     def did_fail(self):
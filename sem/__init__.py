@@ -1 +1,3 @@
 from .analysis import SemanticAnalyzer
+from .context import CompilationContext
+from .incremental import AnalysisCache
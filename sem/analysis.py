@@ -1,14 +1,46 @@
+from .context import CompilationContext
+from .incremental import AnalysisCache, IncrementalTypeCheck
+from .parallel import ParallelTypeCheck
 from .vis.table_builder import TableBuilder
 from .vis.table_check import TableCheck
 from .vis.type_check import TypeCheck
-from .table import GLOBALS
 
 
 class SemanticAnalyzer:
-    def __init__(self, output=None):
-        self.visitors = [vis(output) for vis in (TableBuilder, TableCheck, TypeCheck)]
+    def __init__(
+        self,
+        context: CompilationContext = None,
+        output=None,
+        jobs=1,
+        cache: AnalysisCache = None,
+    ):
+        self.context = context or CompilationContext()
+        self.output = output
+        self.jobs = jobs
+        self.cache = cache
+        self.visitors = [
+            vis(self.context, output) for vis in (TableBuilder, TableCheck, TypeCheck)
+        ]
 
     def start(self, root):
-        GLOBALS.entries.clear()
-        for visitor in self.visitors:
-            root.accept(visitor)
+        self.context.reset()
+        if self.jobs <= 1 and self.cache is None:
+            for visitor in self.visitors:
+                root.accept(visitor)
+            return
+
+        table_builder, table_check, _ = self.visitors
+        root.accept(table_builder)
+        if self.cache is None:
+            # Declarations are checked serially, function bodies are independent
+            root.accept(table_check)
+            ParallelTypeCheck(self.context, self.output, self.jobs).start(root)
+            return
+
+        # Functions are checked along with their type check, only when they changed
+        root.children[0].accept(table_check)  # Class declarations
+        table_check.visit(root)
+        type_check = IncrementalTypeCheck(
+            self.context, self.output, self.cache, self.jobs
+        )
+        type_check.start(root)
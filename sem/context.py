@@ -0,0 +1,32 @@
+from collections import defaultdict
+from typing import Dict
+
+from .table import BaseType, BUILTIN_TYPES, SymbolTable
+
+
+class CompilationContext:
+    """State owned by a single compilation: the global scope, the registry of
+    base types and the counters used to generate unique names.
+    Independent compilations each use their own context and never share state."""
+
+    def __init__(self):
+        self.globals: SymbolTable = None
+        self.types: Dict[str, BaseType] = {}
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.reset()
+
+    def reset(self):
+        """Forget everything about the previous compilation"""
+        self.globals = SymbolTable("global", context=self)
+        self.globals.search_in_scope = self.globals.search_member  # No parent scope
+        self.types = {type_.name: type_ for type_ in BUILTIN_TYPES}
+        self.counters.clear()
+
+    def base_type(self, name: str) -> BaseType:
+        if name not in self.types:
+            self.types[name] = BaseType(name, context=self)
+        return self.types[name]
+
+    def counter(self, type_: str) -> int:
+        self.counters[type_] += 1
+        return self.counters[type_]
@@ -0,0 +1,177 @@
+"""Incremental semantic analysis: only the checks of function bodies are cached.
+Every analysis still builds the symbol tables from scratch with `TableBuilder`,
+checks the class declarations and the program with `TableCheck`, and hashes every
+function to look it up, so its cost grows with the size of the program rather
+than with the size of the change. Only `TableCheck` and `TypeCheck` of unchanged
+function bodies are replayed from the cache."""
+
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Dict, List, Set, Tuple
+
+from syn.ast import ASTNode, LeafNodeType
+from .context import CompilationContext
+from .parallel import fan_out, function_units, preorder, RecordIndex, UnitTypeCheck
+from .vis.table_check import TableCheck
+from .vis.type_check import TypeCheck
+
+NAMED_NODE_TYPES = {LeafNodeType.ID, LeafNodeType.TYPE, LeafNodeType.SCOPE_SPEC}
+
+
+def summarize(nodes: List[ASTNode]) -> Tuple[bytes, Set[str]]:
+    """Structural digest of the given nodes, listed in preorder, and every
+    identifier or type name they use. Locations are left out so moving code
+    around keeps the digest."""
+    structure = []
+    names = set()
+    for node in nodes:
+        code = node.node_type._name_ + str(len(node.children))
+        if node.token is not None:
+            code += ":" + node.token.lexeme
+            if node.node_type in NAMED_NODE_TYPES:
+                names.add(node.token.lexeme)
+        structure.append(code)
+    return blake2b("\0".join(structure).encode(), digest_size=16).digest(), names
+
+
+class DependencyGraph:
+    """Global declarations of a program grouped by name
+    A class is declared by its class declaration and the signatures of its member
+    function definitions, a free function by its signature. Each name has a
+    fingerprint of its declarations and edges to the names they refer to."""
+
+    def __init__(self, root: ASTNode):
+        self.order: Dict[str, int] = {}
+        self.edges: Dict[str, Set[str]] = defaultdict(set)
+        self.fingerprints: Dict[str, bytes] = {}
+        declarations: Dict[str, List[ASTNode]] = defaultdict(list)
+        for class_decl in root.children[0].children:
+            name = class_decl.children[0].token.lexeme
+            self._declare(declarations, name, [class_decl])
+        for func_def in root.children[1].children:
+            scope, name = func_def.children[0].token, func_def.children[1].token.lexeme
+            signature = func_def.children[:4]
+            self._declare(declarations, scope.lexeme if scope else name, signature)
+
+        for name, nodes in declarations.items():
+            nodes = [n for node in nodes for n in preorder(node)]
+            self.fingerprints[name], self.edges[name] = summarize(nodes)
+
+    def _declare(self, declarations, name: str, nodes: List[ASTNode]):
+        self.order.setdefault(name, len(self.order))
+        declarations[name] += nodes
+
+    def closure(self, names: Set[str]) -> tuple:
+        """Fingerprints of every declaration reachable from `names`, in program order
+        Undeclared names are kept since declaring them later changes the result"""
+        seen = set(names)
+        pending = list(names)
+        while pending:
+            for name in self.edges.get(pending.pop(), ()):
+                if name not in seen:
+                    seen.add(name)
+                    pending.append(name)
+        return tuple(
+            (name, self.fingerprints.get(name))
+            for name in sorted(seen, key=lambda n: (self.order.get(n, -1), n))
+        )
+
+
+class AnalysisCache:
+    """Type check results of function bodies kept between analyses of successive
+    versions of a program, see `IncrementalTypeCheck`"""
+
+    def __init__(self):
+        self.entries: Dict[tuple, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+
+class IncrementalTypeCheck(UnitTypeCheck):
+    """Checks only the functions which changed, or which depend on a declaration
+    that changed, since the last analysis using the same cache. Results of the
+    other functions are replayed, which leaves the tables, the AST and the
+    diagnostics exactly as running `TableCheck` and `TypeCheck` on them would."""
+
+    checks = (TableCheck, TypeCheck)
+
+    def __init__(
+        self,
+        context: CompilationContext,
+        output=None,
+        cache: AnalysisCache = None,
+        jobs=1,
+    ):
+        super().__init__(context, output)
+        self.cache = cache or AnalysisCache()
+        self.jobs = jobs
+
+    def start(self, root: ASTNode):
+        units = function_units(root)
+        self.index = RecordIndex(self.context, units)
+        graph = DependencyGraph(root)
+        nodes = [preorder(unit) for unit in units]
+        keys = [self._key(unit, n, graph) for unit, n in zip(units, nodes)]
+        misses = [
+            unit for unit, key in zip(units, keys) if key not in self.cache.entries
+        ]
+        forked = self.jobs > 1 and len(misses) > 1
+        if forked:
+            results = fan_out(lambda i: self.check(misses[i]), len(misses), self.jobs)
+        else:
+            results = [self.check(unit) for unit in misses]
+        checked = dict(zip(map(id, misses), results))
+
+        entries = {}
+        for unit, unit_nodes, key in zip(units, nodes, keys):
+            if id(unit) in checked:
+                result = checked[id(unit)]
+                cached = self._relocate(result, unit_nodes)
+                if key is not None and cached is not None:
+                    entries[key] = cached
+                if not forked:
+                    # Temporaries and records were added by the check itself
+                    result = (result[0], [], [])
+            else:
+                entries[key] = self.cache.entries[key]
+                result = self._locate(entries[key], unit_nodes)
+            # The body is the last subtree of the function
+            body = unit_nodes[unit_nodes.index(unit.children[-1]) :]
+            self.merge(unit, *result, body=body)
+
+        # Only keep what the current version of the program uses
+        self.cache.entries = entries
+        self.cache.misses = len(misses)
+        self.cache.hits = len(units) - len(misses)
+        self.context.globals.update_offsets()
+
+    def _key(self, unit: ASTNode, nodes: List[ASTNode], graph: DependencyGraph):
+        table_ref = self.index.table_ref(unit.record.table)
+        if table_ref[0][0] == "#":
+            return None  # Not reachable from the global table
+        digest, names = summarize(nodes)
+        return digest, table_ref, graph.closure(names)
+
+    @staticmethod
+    def _relocate(result: tuple, nodes: List[ASTNode]) -> tuple:
+        """Replace the locations of diagnostics by the position of their node in
+        the function, None when one of them is not found"""
+        messages, temps, annotations = result
+        positions = {}
+        if messages:
+            for i in reversed(range(len(nodes))):
+                if nodes[i].token is not None:
+                    positions[nodes[i].token.location] = i
+        if any(location not in positions for _, _, location in messages):
+            return None
+        return (
+            [(kind, msg, positions[location]) for kind, msg, location in messages],
+            temps,
+            annotations,
+        )
+
+    @staticmethod
+    def _locate(cached: tuple, nodes: List[ASTNode]) -> tuple:
+        messages, temps, annotations = cached
+        messages = [(kind, msg, nodes[i].token.location) for kind, msg, i in messages]
+        return messages, temps, annotations
@@ -4,7 +4,7 @@ from typing import List, Set
 
 from lex.token import Location, Token, TokenType
 from syn.sets import EPSILON
-from .table import GLOBALS, SymbolTable, Record, RecordType
+from .table import SymbolTable, Record, RecordType
 
 EXTENSION = re.compile(r"\.src$")
 
@@ -32,12 +32,12 @@ class SemanticOutput:
             location=error[0]
         )
 
-    def tables(self):
+    def tables(self, table: SymbolTable):
         self.__errors_file.write(
             "\n".join(self.__format_error(e) for e in sorted(self.__errors))
         )
 
-        formatter = TableFormatter(GLOBALS)
+        formatter = TableFormatter(table)
         self.__tables_file.write(formatter.output())
 
     def did_fail(self):
@@ -0,0 +1,185 @@
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Tuple
+
+from syn.ast import ASTNode
+from .context import CompilationContext
+from .table import Record, RecordType, SymbolTable, SymbolType
+from .vis.type_check import TypeCheck
+
+_TASK: Callable[[int], object] = None
+
+
+def _initialize(task):
+    global _TASK
+    _TASK = task
+
+
+def _run(index: int):
+    return _TASK(index)
+
+
+def fan_out(task: Callable[[int], object], count: int, jobs: int) -> list:
+    """Run `task(i)` for every `i < count` on `jobs` forked processes
+    Workers inherit the task and all the state it reads when they are forked,
+    only the results are pickled. Results are returned in index order."""
+    with get_context("fork").Pool(
+        jobs, initializer=_initialize, initargs=(task,)
+    ) as pool:
+        return pool.map(_run, range(count), chunksize=max(1, count // (jobs * 4)))
+
+
+def function_units(root: ASTNode) -> List[ASTNode]:
+    """Independent units of work: every function definition, then main"""
+    return root.children[1].children + [root.children[2]]
+
+
+def preorder(node: ASTNode) -> List[ASTNode]:
+    """Nodes of the subtree, every node before its children"""
+    nodes = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node.children))
+    return nodes
+
+
+class Diagnostics:
+    """Output stand-in recording the messages of a worker so they can be replayed"""
+
+    def __init__(self):
+        self.messages: List[Tuple[str, str, object]] = []
+
+    def warn(self, msg, location):
+        self.messages.append(("warn", msg, location))
+
+    def error(self, msg, location):
+        self.messages.append(("error", msg, location))
+
+
+class RecordIndex:
+    """Addresses tables and records by their path of (name, position) steps from
+    the global table. Paths stay valid in processes forked from the same state and
+    across compilations of programs with the same declarations"""
+
+    def __init__(self, context: CompilationContext, units: List[ASTNode]):
+        self._tables: Dict[tuple, SymbolTable] = {}
+        self._table_refs: Dict[int, tuple] = {}
+        self._record_refs: Dict[int, tuple] = {}
+        self._add_table(context.globals, ())
+        for i, unit in enumerate(units):
+            if unit.record and unit.record.table:
+                # Member functions defined without a declaration are in no table
+                self._add_table(unit.record.table, (("#", i),))
+
+    def _add_table(self, table: SymbolTable, path: tuple):
+        if id(table) in self._table_refs:
+            return
+        self._table_refs[id(table)] = path
+        self._tables[path] = table
+        for name, records in table.entries.items():
+            for i, record in enumerate(records):
+                self._record_refs[id(record)] = (path, name, i)
+                if record.table is not None:
+                    self._add_table(record.table, path + ((name, i),))
+
+    def table_ref(self, table: SymbolTable) -> tuple:
+        return None if table is None else self._table_refs[id(table)]
+
+    def table(self, ref: tuple) -> SymbolTable:
+        return None if ref is None else self._tables[ref]
+
+    def record_ref(self, record: Record, scope: SymbolTable) -> tuple:
+        if record is None:
+            return None
+        if id(record) in self._record_refs:
+            return self._record_refs[id(record)]
+        # Temporaries are created by the type check, after the index was built
+        return (self.table_ref(scope), record.name, 0)
+
+    def record(self, ref: tuple) -> Record:
+        if ref is None:
+            return None
+        table, name, i = ref
+        return self._tables[table].entries[name][i]
+
+
+class UnitTypeCheck:
+    """Type checks function bodies one at a time. Results only refer to tables
+    and records through a `RecordIndex` so they can be replayed on another copy
+    of the same tables."""
+
+    checks = (TypeCheck,)
+
+    def __init__(self, context: CompilationContext, output=None):
+        self.context = context
+        self.output = output
+        self.index: RecordIndex = None
+
+    def check(self, unit: ASTNode) -> tuple:
+        """Diagnostics, temporaries added to the function table and records
+        attached to the nodes of the body"""
+        diagnostics = Diagnostics()
+        for check in self.checks:
+            unit.accept(check(self.context, diagnostics))
+
+        table = unit.record.table
+        temps = [
+            (r.type.base.name, r.type.dims, self.index.table_ref(r.table))
+            for records in table.entries.values()
+            for r in records
+            if r.record_type == RecordType.TEMP
+        ]
+        annotations = [
+            (
+                j,
+                self.index.record_ref(node.record, table),
+                self.index.record_ref(node.temp_record, table),
+            )
+            for j, node in enumerate(preorder(unit.children[-1]))  # Stat block
+            if node.record or node.temp_record
+        ]
+        return diagnostics.messages, temps, annotations
+
+    def merge(self, unit: ASTNode, messages, temps, annotations, body=None):
+        """Replay the result of `check`, `body` lists the nodes of the function
+        body in preorder when the caller already has them"""
+        if self.output:
+            for kind, msg, location in messages:
+                getattr(self.output, kind)(msg, location)
+
+        table = unit.record.table
+        for base, dims, callee in temps:
+            type_ = SymbolType(self.context.base_type(base), dims)
+            record = Record("", type_, RecordType.TEMP, None)
+            record.table = self.index.table(callee)
+            table.insert(record)
+
+        body = body or preorder(unit.children[-1])
+        for j, record, temp_record in annotations:
+            body[j].record = self.index.record(record)
+            body[j].temp_record = self.index.record(temp_record)
+
+
+class ParallelTypeCheck(UnitTypeCheck):
+    """Type checks function bodies on a process pool
+    Each worker sends back the result of `UnitTypeCheck.check` and the parent
+    merges them in declaration order, which leaves the tables and the AST
+    exactly as the serial `TypeCheck` would."""
+
+    def __init__(self, context: CompilationContext, output=None, jobs=2):
+        super().__init__(context, output)
+        self.jobs = jobs
+        self.units: List[ASTNode] = []
+
+    def start(self, root: ASTNode):
+        self.units = function_units(root)
+        self.index = RecordIndex(self.context, self.units)
+        results = fan_out(self._check, len(self.units), self.jobs)
+        for unit, result in zip(self.units, results):
+            self.merge(unit, *result)
+
+        self.context.globals.update_offsets()
+
+    def _check(self, i: int):
+        return self.check(self.units[i])
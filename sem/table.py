@@ -6,31 +6,22 @@ from lex.token import Token, Location, TokenType, Keywords as K
 
 
 class BaseType:
-    __instances = {}
-
-    def __new__(cls, name, *args, **kwargs):
-        if name in cls.__instances:
-            return cls.__instances[name]
-        instance = super().__new__(cls)
-        instance.__is_new = True
-        cls.__instances[name] = instance
-        return instance
-
-    def __init__(self, name, simple_type=False, size=0):
-        if self.__is_new:  # pylint: disable=access-member-before-definition
-            self.name = name
-            self.simple_type = simple_type
-            self._size = size
-            self.__is_new = False
+    """Types are interned per compilation, see `CompilationContext.base_type`"""
+
+    def __init__(self, name, simple_type=False, size=0, context=None):
+        self.name = name
+        self.simple_type = simple_type
+        self._size = size
+        self.context: "sem.context.CompilationContext" = context
 
     @property
     def table(self) -> "SymbolTable":
-        if self.simple_type:
+        if self.simple_type or self.context is None:
             return None
         return next(
             (
                 r.table
-                for r in GLOBALS.search_in_scope(self.name)
+                for r in self.context.globals.search_in_scope(self.name)
                 if r.record_type == RecordType.CLASS
             ),
             None,
@@ -51,11 +42,12 @@ FLOAT = BaseType("float", simple_type=True, size=8)
 INT = BaseType("integer", simple_type=True, size=4)
 VOID = BaseType("void", simple_type=True, size=0)
 BOOLEAN = BaseType("boolean", simple_type=True, size=0)
+BUILTIN_TYPES = (FLOAT, INT, VOID, BOOLEAN)
 
 
 class SymbolType:
-    def __init__(self, base: str, dims: List[Token]):
-        self.base: BaseType = base if type(base) == BaseType else BaseType(base)
+    def __init__(self, base: BaseType, dims: List[Token]):
+        self.base = base
         self.dims = dims
 
     def __eq__(self, other):
@@ -71,7 +63,8 @@ class SymbolType:
         )
 
     def __hash__(self):
-        return hash(str(self))
+        # Consistent with `__eq__`, the size of dimensions is not part of the type
+        return hash((self.base.name, len(self.dims)))
 
     def is_array(self):
         return len(self.dims) > 0
@@ -176,22 +169,43 @@ class Record:
 def equal_params(left: List[Record], right: List[Record]):
     if left is None or right is None:
         return left is right
-    return tuple(p.type for p in left) == tuple(p.type for p in right)
+    return signature(left) == signature(right)
+
+
+def signature(params: List[Record]) -> tuple:
+    """Key of a function in the overload index of its table"""
+    return tuple(p.type for p in params)
 
 
 class SymbolTable:
-    def __init__(self, name: str, inherits: List[BaseType] = None, is_function=False):
+    def __init__(
+        self,
+        name: str,
+        inherits: List[BaseType] = None,
+        is_function=False,
+        context: "sem.context.CompilationContext" = None,
+    ):
         self.name = name
         self.inherits = inherits
         self.is_function = is_function
+        self.context = context
         self.entries: Dict[str, List[Record]] = defaultdict(list)
+        # Functions by name, then by signature
+        self.overloads: Dict[str, Dict[tuple, List[Record]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
         self._temp_count = 0
+        self._insert_count = 0
 
     def insert(self, record: Record):
-        record.offset = sum(len(r) for r in self.entries.values())
+        # Insertion order, until `update_offsets` computes the actual offsets
+        record.offset = self._insert_count
+        self._insert_count += 1
         if record.record_type == RecordType.TEMP:
             record.name = self._temp_name()
         self.entries[record.name].append(record)
+        if record.record_type == RecordType.FUNCTION:
+            self.overloads[record.name][signature(record.params)].append(record)
 
     def has_private_access(self, scope):
         return self.name.startswith(scope.name + "::")
@@ -204,6 +218,19 @@ class SymbolTable:
             if r.type.base.table is not None and r.record_type in DATA_RECORD_TYPES
         )
 
+    def remove(self, record: Record):
+        """Remove a record, `update_offsets` must be called after removing variables"""
+        records = self.entries[record.name]
+        records.pop(next(i for i, r in enumerate(records) if r is record))
+        if not records:
+            del self.entries[record.name]
+        if record.record_type == RecordType.FUNCTION:
+            overloads = self.overloads[record.name]
+            key = signature(record.params)
+            overloads[key] = [r for r in overloads[key] if r is not record]
+            if not overloads[key]:
+                del overloads[key]
+
     def remove_dependency(self, type_: BaseType):
         if type_ in self.inherits:
             self.inherits.remove(type_)
@@ -212,10 +239,18 @@ class SymbolTable:
                 record = next((r for r in records if r.type.base == type_), None)
                 if record:
                     records.remove(record)
+                    if record.record_type == RecordType.FUNCTION:
+                        overloads = self.overloads[record.name]
+                        key = signature(record.params)
+                        overloads[key].remove(record)
+                        if not overloads[key]:
+                            del overloads[key]
                     break
 
     def search_in_scope(self, name) -> List[Record]:
-        return self.search_member(name, K.PRIVATE) + GLOBALS.search_member(name)
+        return self.search_member(name, K.PRIVATE) + self.context.globals.search_member(
+            name
+        )
 
     def search_member(self, name, visibility: TokenType = K.PRIVATE) -> List[Record]:
         return [
@@ -230,6 +265,29 @@ class SymbolTable:
             )
         ]
 
+    def search_overload(
+        self, name, params: tuple, visibility: TokenType = K.PRIVATE
+    ) -> Record:
+        """First function found by `search_member` taking `params`, see `signature`"""
+        overloads = self.overloads.get(name)
+        for record in overloads.get(params, ()) if overloads else ():
+            if visibility == K.PRIVATE or record.visibility == K.PUBLIC:
+                return record
+        for parent in self.inherits or []:
+            record = parent.table.search_overload(
+                name,
+                params,
+                visibility if self.has_private_access(parent) else K.PUBLIC,
+            )
+            if record:
+                return record
+        return None
+
+    def search_overload_in_scope(self, name, params: tuple) -> Record:
+        """First function found by `search_in_scope` taking `params`"""
+        record = self.search_overload(name, params)
+        return record or self.context.globals.search_overload(name, params)
+
     def current_size(self) -> int:
         return sum(
             entry.type.size
@@ -284,7 +342,3 @@ class SymbolTable:
 
         for table in tables:
             table.update_offsets()
-
-
-GLOBALS = SymbolTable("global")
-GLOBALS.search_in_scope = GLOBALS.search_member  # Avoid recursive lookup
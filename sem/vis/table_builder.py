@@ -1,10 +1,8 @@
 from sem.visitor import Visitor
 from sem.table import (
-    BaseType,
-    equal_params,
-    GLOBALS,
     Record,
     RecordType,
+    signature,
     SymbolTable,
     SymbolType,
     VOID,
@@ -15,13 +13,7 @@ from syn.ast import ASTNode
 class TableBuilder(Visitor):
     def _visit_class_list(self, node: ASTNode):
         for child in node.children:
-            GLOBALS.insert(child.record)
-
-    def _visit_func_list(self, node: ASTNode):
-        return
-
-    def _visit_inher_list(self, node: ASTNode):
-        return
+            self.context.globals.insert(child.record)
 
     def _visit_member_list(self, node: ASTNode):
         for child in node.children:
@@ -31,25 +23,16 @@ class TableBuilder(Visitor):
         for child in node.children:
             child.record.record_type = RecordType.LOCAL
 
-    def _visit_param_list(self, node: ASTNode):
-        return
-
-    def _visit_dim_list(self, node: ASTNode):
-        return
-
-    def _visit_arg_list(self, node: ASTNode):
-        return
-
     def _visit_prog(self, node: ASTNode):
-        GLOBALS.insert(node.children[2].record)
+        self.context.globals.insert(node.children[2].record)
 
     def _visit_main(self, node: ASTNode):
-        table = SymbolTable("main")
+        table = SymbolTable("main", context=self.context)
         for child in node.children[0].children:  # Locals
             table.insert(child.record)
         node.record = Record(
             "main",
-            SymbolType("void", []),
+            SymbolType(VOID, []),
             RecordType.FUNCTION,
             node.token.location,
             params=[],
@@ -60,7 +43,11 @@ class TableBuilder(Visitor):
         name = node.children[0].token.lexeme
         table = SymbolTable(
             name,
-            [BaseType(inherit.token.lexeme) for inherit in node.children[1].children],
+            [
+                self.context.base_type(inherit.token.lexeme)
+                for inherit in node.children[1].children
+            ],
+            context=self.context,
         )
 
         for child in node.children[2].children:  # Members
@@ -73,7 +60,7 @@ class TableBuilder(Visitor):
         # Only for member function
         node.record = Record(
             node.children[0].token.lexeme,
-            SymbolType(node.children[2].token.lexeme, []),
+            SymbolType(self.context.base_type(node.children[2].token.lexeme), []),
             RecordType.FUNCTION,
             node.children[0].token.location,
             params=[param.record for param in node.children[1].children],
@@ -81,7 +68,7 @@ class TableBuilder(Visitor):
 
     def _visit_func_def(self, node: ASTNode):
         name = node.children[1].token.lexeme
-        table = SymbolTable(name, is_function=True)
+        table = SymbolTable(name, is_function=True, context=self.context)
         params = [param.record for param in node.children[2].children]
         for param in params:
             table.insert(param)
@@ -91,7 +78,7 @@ class TableBuilder(Visitor):
 
         node.record = Record(
             name,
-            SymbolType(node.children[3].token.lexeme, []),
+            SymbolType(self.context.base_type(node.children[3].token.lexeme), []),
             RecordType.FUNCTION,
             node.children[1].token.location,
             params=params,
@@ -100,21 +87,19 @@ class TableBuilder(Visitor):
 
         scope = node.children[0].token
         if scope:
-            parent = BaseType(scope.lexeme).table
+            parent = self.context.base_type(scope.lexeme).table
             if not parent:
                 self.error(
                     'Use of undeclared class "{name}"'.format(name=scope.lexeme),
                     scope.location,
                 )
                 return
-            records = parent.entries.get(name, [])
+            overloads = parent.overloads.get(name, {})
             record = next(
                 (
                     r
-                    for r in records
-                    if r.record_type == RecordType.FUNCTION
-                    and equal_params(r.params, params)
-                    and r.type.base is node.record.type.base
+                    for r in overloads.get(signature(params), [])
+                    if r.type.base is node.record.type.base
                 ),
                 None,
             )
@@ -127,11 +112,11 @@ class TableBuilder(Visitor):
                 )
                 return
             record.table = table  # Attach table on existing record in the class table
-            table.inherits = [BaseType(scope.lexeme)]
+            table.inherits = [self.context.base_type(scope.lexeme)]
             table.name = scope.lexeme + "::" + table.name
             node.record = record
         else:
-            GLOBALS.insert(node.record)
+            self.context.globals.insert(node.record)
 
     def _visit_member_decl(self, node: ASTNode):
         node.record = node.children[1].record
@@ -141,7 +126,7 @@ class TableBuilder(Visitor):
         node.record = Record(
             node.children[1].token.lexeme,  # ID
             SymbolType(
-                node.children[0].token.lexeme,
+                self.context.base_type(node.children[0].token.lexeme),
                 [child.token for child in node.children[2].children],
             ),
             None,
@@ -152,78 +137,9 @@ class TableBuilder(Visitor):
         node.record = Record(
             node.children[1].token.lexeme,  # ID
             SymbolType(
-                node.children[0].token.lexeme,
+                self.context.base_type(node.children[0].token.lexeme),
                 [child.token for child in node.children[2].children],
             ),
             RecordType.PARAM,
             node.children[1].token.location,
         )
-
-    def _visit_id(self, node: ASTNode):
-        return
-
-    def _visit_type(self, node: ASTNode):
-        return
-
-    def _visit_literal(self, node: ASTNode):
-        return
-
-    def _visit_visibility(self, node: ASTNode):
-        return
-
-    def _visit_scope_spec(self, node: ASTNode):
-        return
-
-    def _visit_stat_block(self, node: ASTNode):
-        return
-
-    def _visit_var(self, node: ASTNode):
-        return
-
-    def _visit_f_call_stat(self, node: ASTNode):
-        return
-
-    def _visit_index_list(self, node: ASTNode):
-        return
-
-    def _visit_data_member(self, node: ASTNode):
-        return
-
-    def _visit_f_call(self, node: ASTNode):
-        return
-
-    def _visit_if_stat(self, node: ASTNode):
-        return
-
-    def _visit_assign_stat(self, node: ASTNode):
-        return
-
-    def _visit_while_stat(self, node: ASTNode):
-        return
-
-    def _visit_read_stat(self, node: ASTNode):
-        return
-
-    def _visit_write_stat(self, node: ASTNode):
-        return
-
-    def _visit_return_stat(self, node: ASTNode):
-        return
-
-    def _visit_rel_expr(self, node: ASTNode):
-        return
-
-    def _visit_add_expr(self, node: ASTNode):
-        return
-
-    def _visit_mult_expr(self, node: ASTNode):
-        return
-
-    def _visit_not(self, node: ASTNode):
-        return
-
-    def _visit_sign(self, node: ASTNode):
-        return
-
-    def _visit_epsilon(self, node: ASTNode):
-        return
@@ -1,31 +1,26 @@
 from collections import defaultdict
-from itertools import chain
 from typing import List
 
 from lex import Generic as G
-from sem.visitor import Visitor
+from sem.visitor import dispatch, Visitor
 from sem.table import (
     BaseType,
     equal_params,
-    GLOBALS,
     VOID,
     RecordType,
     SymbolTable,
 )
-from syn.ast import ASTNode, GroupNodeType, LeafNodeType, ListNodeType
+from syn.ast import ASTNode
 
 
+@dispatch(default=lambda self, n, t: any(t))
 class ReturnVisitor:
     def __init__(self, container):
-        self.handlers = {
-            node_type: getattr(self, "_visit_" + str(node_type), lambda n, t: any(t))
-            for node_type in chain(GroupNodeType, LeafNodeType, ListNodeType)
-        }
         self.error = container.error
 
     def visit(self, node: ASTNode) -> bool:
         branches = [self.visit(c) for c in node.children]
-        return self.handlers[node.node_type](node, branches)
+        return self.handlers[node.node_type](self, node, branches)
 
     def _visit_return_stat(self, node: ASTNode, branches: List[bool]):
         return True
@@ -49,10 +44,9 @@ class ReturnVisitor:
 
 
 class TableCheck(Visitor):
-    def __init__(self, output=None):
-        super().__init__(output=output)
+    def __init__(self, context, output=None):
+        super().__init__(context, output=output)
         self.cycles = set()
-        self.return_visitor = ReturnVisitor(self)
 
     def _add_cycle(self, cycle: List[BaseType], location):
         cycle = [type_.name for type_ in cycle]
@@ -69,7 +63,8 @@ class TableCheck(Visitor):
 
     def check_dependency_cycles(self, node: ASTNode):
         table = node.record.table
-        inherits = [(parent, [BaseType(table.name)]) for parent in table.dependencies()]
+        type_ = self.context.base_type(table.name)
+        inherits = [(parent, [type_]) for parent in table.dependencies()]
         while inherits:
             parent, introduced_by = inherits.pop(0)
             if len(set(introduced_by)) != len(introduced_by):
@@ -93,8 +88,9 @@ class TableCheck(Visitor):
                     node.children[0].token.location,
                 )
 
-        if BaseType(name) in table.inherits:
-            table.inherits.remove(BaseType(name))
+        type_ = self.context.base_type(name)
+        if type_ in table.inherits:
+            table.inherits.remove(type_)
             self.error(
                 'Class "{name}" cannot inherit from itself'.format(name=name),
                 node.children[0].token.location,
@@ -108,12 +104,9 @@ class TableCheck(Visitor):
 
             if len(records_per_type[RecordType.FUNCTION]) > 1:
                 name = ((table.name + "::") if is_class_scope else "") + name
-                params_lookup = defaultdict(list)
-                for record in records_per_type[RecordType.FUNCTION]:
-                    params_lookup[tuple(r.type for r in record.params)].append(record)
-                if len(params_lookup) != len(records_per_type[RecordType.FUNCTION]):
-                    while params_lookup:
-                        _, dup_records = params_lookup.popitem()
+                overloads = table.overloads[records[0].name]
+                if len(overloads) != len(records_per_type[RecordType.FUNCTION]):
+                    for dup_records in reversed(list(overloads.values())):
                         if len(dup_records) > 1:
                             self.error(
                                 'Multiply declared function "{name}{type}"'.format(
@@ -185,7 +178,7 @@ class TableCheck(Visitor):
                         )
 
     def _visit_prog(self, node: ASTNode):
-        self.check_duplicate_entries(GLOBALS)
+        self.check_duplicate_entries(self.context.globals)
 
     def _visit_main(self, node: ASTNode):
         self.check_duplicate_entries(node.record.table)
@@ -197,7 +190,8 @@ class TableCheck(Visitor):
         self.check_shadowed_members(node.record.table)
 
     def check_has_return_stat(self, node: ASTNode):
-        if not self.return_visitor.visit(node.children[-1]):  # Visit stat_block
+        # Not kept on the instance: the cycle would delay flushing the outputs
+        if not ReturnVisitor(self).visit(node.children[-1]):  # Visit stat_block
             scope = node.children[0].token.lexeme if node.children[0].token else ""
             token = node.children[1].token
             self.error(
@@ -225,107 +219,11 @@ class TableCheck(Visitor):
 
     def _visit_type(self, node: ASTNode):
         token = node.token
-        if token.token_type == G.ID and BaseType(token.lexeme).table is None:
+        if (
+            token.token_type == G.ID
+            and self.context.base_type(token.lexeme).table is None
+        ):
             self.error(
                 'Use of undeclared class "{name}"'.format(name=token.lexeme),
                 token.location,
             )
-
-    def _visit_id(self, node: ASTNode):
-        return
-
-    def _visit_literal(self, node: ASTNode):
-        return
-
-    def _visit_visibility(self, node: ASTNode):
-        return
-
-    def _visit_scope_spec(self, node: ASTNode):
-        return
-
-    def _visit_epsilon(self, node: ASTNode):
-        return
-
-    def _visit_class_list(self, node: ASTNode):
-        return
-
-    def _visit_func_list(self, node: ASTNode):
-        return
-
-    def _visit_inher_list(self, node: ASTNode):
-        return
-
-    def _visit_member_list(self, node: ASTNode):
-        return
-
-    def _visit_local_list(self, node: ASTNode):
-        return
-
-    def _visit_param_list(self, node: ASTNode):
-        return
-
-    def _visit_dim_list(self, node: ASTNode):
-        return
-
-    def _visit_stat_block(self, node: ASTNode):
-        return
-
-    def _visit_var(self, node: ASTNode):
-        return
-
-    def _visit_f_call_stat(self, node: ASTNode):
-        return
-
-    def _visit_index_list(self, node: ASTNode):
-        return
-
-    def _visit_arg_list(self, node: ASTNode):
-        return
-
-    def _visit_member_decl(self, node: ASTNode):
-        return
-
-    def _visit_var_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_param(self, node: ASTNode):
-        return
-
-    def _visit_data_member(self, node: ASTNode):
-        return
-
-    def _visit_f_call(self, node: ASTNode):
-        return
-
-    def _visit_if_stat(self, node: ASTNode):
-        return
-
-    def _visit_assign_stat(self, node: ASTNode):
-        return
-
-    def _visit_while_stat(self, node: ASTNode):
-        return
-
-    def _visit_read_stat(self, node: ASTNode):
-        return
-
-    def _visit_write_stat(self, node: ASTNode):
-        return
-
-    def _visit_return_stat(self, node: ASTNode):
-        return
-
-    def _visit_rel_expr(self, node: ASTNode):
-        return
-
-    def _visit_add_expr(self, node: ASTNode):
-        return
-
-    def _visit_mult_expr(self, node: ASTNode):
-        return
-
-    def _visit_not(self, node: ASTNode):
-        return
-
-    def _visit_sign(self, node: ASTNode):
-        return
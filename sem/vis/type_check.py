@@ -1,14 +1,11 @@
-from itertools import chain
 from typing import List
 
 from lex.token import Keywords as K, Literals as L, Location, Operators as O
-from sem.visitor import Visitor
+from sem.visitor import dispatch, Visitor
 from sem.table import (
     BOOLEAN,
     DATA_RECORD_TYPES,
-    equal_params,
     FLOAT,
-    GLOBALS,
     INT,
     Record,
     RecordType,
@@ -16,15 +13,12 @@ from sem.table import (
     SymbolType,
     VOID,
 )
-from syn.ast import ASTNode, GroupNodeType, LeafNodeType, ListNodeType
+from syn.ast import ASTNode, GroupNodeType, ListNodeType
 
 
+@dispatch(default=lambda self, n, t: t)
 class TypeExtractor:
     def __init__(self, container: Visitor, scope: SymbolTable):
-        self.handlers = {
-            node_type: getattr(self, "_visit_" + str(node_type), lambda n, t: t)
-            for node_type in chain(GroupNodeType, LeafNodeType, ListNodeType)
-        }
         self.scope = scope
         self.container = container
         self.error = container.error
@@ -32,7 +26,7 @@ class TypeExtractor:
 
     def visit(self, node: ASTNode) -> List[SymbolType]:
         types = [self.visit(c) for c in node.children]
-        return self.handlers[node.node_type](node, types)
+        return self.handlers[node.node_type](self, node, types)
 
     def _temp_record(self, type_, node):
         if type_:
@@ -43,9 +37,9 @@ class TypeExtractor:
         if None in types:
             return None
 
-        expected_types = (
-            (BOOLEAN) if node.token.token_type in (O.AND, O.OR) else (FLOAT, INT)
-        )
+        # Logical operators take integers, any non-zero value being true
+        logical = node.token.token_type in (O.AND, O.OR)
+        expected_types = (INT,) if logical else (FLOAT, INT)
         if sum(len(t.dims) for t in types) > 2 or types[0].base not in expected_types:
             self.error(
                 'Cannot apply operation "{bin_op}" on types "{left}" and "{right}"'.format(
@@ -134,28 +128,20 @@ class TypeExtractor:
         self,
         node: ASTNode,
         types: List[SymbolType],
-        records: List[Record],
+        scope: SymbolTable,
         is_first: bool,
     ) -> SymbolType:
-        params = [
-            Record("", t, RecordType.PARAM, node.children[0].token.location)
-            for t in types
-        ]
-        record = next(
-            (
-                r
-                for r in records
-                if r.record_type == RecordType.FUNCTION
-                and equal_params(r.params, params)
-            ),
-            None,
-        )
+        name = node.children[0].token.lexeme
+        if is_first:
+            record = scope.search_overload_in_scope(name, tuple(types))
+        else:
+            record = scope.search_overload(name, tuple(types), self._visibility(scope))
         if record is None:
             self.error(
                 'Use of undeclared {type} "{name}({f_type})"'.format(
                     type="function" if is_first else "member function",
-                    name=node.children[0].token.lexeme,
-                    f_type=", ".join(p.format_type() for p in params),
+                    name=name,
+                    f_type=", ".join(str(t) for t in types),
                 ),
                 node.children[0].token.location,
             )
@@ -164,6 +150,9 @@ class TypeExtractor:
         node.record.table = record.table
         return record.type
 
+    def _visibility(self, scope: SymbolTable):
+        return K.PRIVATE if self.scope.has_private_access(scope) else K.PUBLIC
+
     def _type_for_node(
         self, node: ASTNode, types: List[SymbolType], scope: SymbolTable, is_first: bool
     ):
@@ -178,9 +167,7 @@ class TypeExtractor:
         if is_first:
             records = scope.search_in_scope(name)
         else:
-            records = scope.search_member(
-                name, K.PRIVATE if self.scope.has_private_access(scope) else K.PUBLIC
-            )
+            records = scope.search_member(name, self._visibility(scope))
         if not records:
             self.error(
                 'Use of undeclared {type} "{name}"'.format(
@@ -193,7 +180,7 @@ class TypeExtractor:
         if node_type == GroupNodeType.DATA_MEMBER:
             return self._type_for_data_member(node, types, records, is_first)
         else:
-            return self._type_for_func_call(node, types, records, is_first)
+            return self._type_for_func_call(node, types, scope, is_first)
 
     def _type_for_node_chain(
         self, node: ASTNode, types: List[SymbolType]
@@ -328,97 +315,4 @@ class TypeCheck(Visitor):
             )
 
     def _visit_prog(self, node: ASTNode):
-        GLOBALS.update_offsets()
-
-    def _visit_id(self, node: ASTNode):
-        return
-
-    def _visit_type(self, node: ASTNode):
-        return
-
-    def _visit_literal(self, node: ASTNode):
-        return
-
-    def _visit_visibility(self, node: ASTNode):
-        return
-
-    def _visit_scope_spec(self, node: ASTNode):
-        return
-
-    def _visit_epsilon(self, node: ASTNode):
-        return
-
-    def _visit_class_list(self, node: ASTNode):
-        return
-
-    def _visit_func_list(self, node: ASTNode):
-        return
-
-    def _visit_inher_list(self, node: ASTNode):
-        return
-
-    def _visit_member_list(self, node: ASTNode):
-        return
-
-    def _visit_local_list(self, node: ASTNode):
-        return
-
-    def _visit_param_list(self, node: ASTNode):
-        return
-
-    def _visit_dim_list(self, node: ASTNode):
-        return
-
-    def _visit_stat_block(self, node: ASTNode):
-        return
-
-    def _visit_var(self, node: ASTNode):
-        return
-
-    def _visit_index_list(self, node: ASTNode):
-        return
-
-    def _visit_arg_list(self, node: ASTNode):
-        return
-
-    def _visit_main(self, node: ASTNode):
-        return
-
-    def _visit_class_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_def(self, node: ASTNode):
-        return
-
-    def _visit_member_decl(self, node: ASTNode):
-        return
-
-    def _visit_var_decl(self, node: ASTNode):
-        return
-
-    def _visit_func_param(self, node: ASTNode):
-        return
-
-    def _visit_data_member(self, node: ASTNode):
-        return
-
-    def _visit_f_call(self, node: ASTNode):
-        return
-
-    def _visit_rel_expr(self, node: ASTNode):
-        return
-
-    def _visit_add_expr(self, node: ASTNode):
-        return
-
-    def _visit_mult_expr(self, node: ASTNode):
-        return
-
-    def _visit_not(self, node: ASTNode):
-        return
-
-    def _visit_sign(self, node: ASTNode):
-        return
+        self.context.globals.update_offsets()
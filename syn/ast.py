@@ -1,5 +1,6 @@
 from collections import namedtuple
 from enum import Enum, unique, auto
+from itertools import chain
 from typing import List
 
 from lex import Token
@@ -59,6 +60,20 @@ class LeafNodeType(NodeType):
     SCOPE_SPEC = auto()
 
 
+NODE_TYPES = list(chain(GroupNodeType, LeafNodeType, ListNodeType))
+NODE_TYPE_BITS = {node_type: 1 << i for i, node_type in enumerate(NODE_TYPES)}
+# Read as an attribute while walking, a dict lookup would hash the member
+for node_type, bit in NODE_TYPE_BITS.items():
+    node_type.bit = bit
+
+
+def node_type_mask(node_types) -> int:
+    mask = 0
+    for node_type in node_types:
+        mask |= NODE_TYPE_BITS[node_type]
+    return mask
+
+
 class ASTNode:
     def __init__(self, node_type: NodeType, token: Token = None):
         self.node_type = node_type
@@ -68,6 +83,29 @@ class ASTNode:
         self.record: "sem.table.Record" = None
         self.temp_record: "sem.table.Record" = None
         self.code = []
+        self._subtree_mask: int = None
+
+    @property
+    def subtree_mask(self) -> int:
+        """Bitmask of all node types found in this subtree, computed once and cached"""
+        if self._subtree_mask is None:
+            self._mask()
+        return self._subtree_mask
+
+    def _mask(self) -> int:
+        mask = self.node_type.bit
+        for c in self.children:
+            child_mask = c._subtree_mask
+            mask |= c._mask() if child_mask is None else child_mask
+        self._subtree_mask = mask
+        return mask
+
+    def invalidate(self):
+        """Drop cached subtree masks after the structure of the tree changed"""
+        node = self
+        while node is not None and node._subtree_mask is not None:
+            node._subtree_mask = None
+            node = node.parent
 
     def make_child(self, node_type: NodeType, token: Token = None) -> "ASTNode":
         """Create a new node and adopt it"""
@@ -79,6 +117,7 @@ class ASTNode:
         """Adopt an existing node"""
         self.children.append(node)
         node.parent = self
+        self.invalidate()
 
     def insert_commutative(self, node: "ASTNode"):
         """Insert a new node into an existing commutative operator tree"""
@@ -87,6 +126,8 @@ class ASTNode:
         node.children = top_children
         for c in top_children:
             c.parent = node
+        for c in self.children:
+            c.parent = self
 
         top_attributes = self.node_type, self.token
         self.node_type, self.token = node.node_type, node.token
@@ -99,14 +140,20 @@ class ASTNode:
             children = temp_node.children
 
         temp_node.children = [self] + children
+        self.parent = temp_node
+        self.invalidate()
+        node.invalidate()
 
     def absorb(self):
         """Self becomes its first child"""
         child = self.children[0]
         self.children, child.children = child.children, []
+        for c in self.children:
+            c.parent = self
         self.node_type = child.node_type
         self.token = child.token
         child.parent = None
+        self.invalidate()
 
     def to_xml(self, indent=0) -> str:
         if self.children:
@@ -122,7 +169,10 @@ class ASTNode:
         )
 
     def accept(self, visitor):
-        """Allow the visitor to recursively walk the AST"""
+        """Allow the visitor to recursively walk the AST
+        Subtrees without any node type handled by the visitor are skipped entirely"""
+        if not self.subtree_mask & visitor.interests:
+            return
         if (
             (
                 self.node_type == GroupNodeType.FUNC_DEF
@@ -134,4 +184,5 @@ class ASTNode:
             visitor.scope = self.record.table
         for c in self.children:
             c.accept(visitor)
-        visitor.visit(self)
+        if self.node_type.bit & visitor.interests:
+            visitor.visit(self)
@@ -0,0 +1,102 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+
+SOURCE = """class Counter {
+  public integer total;
+  public add(integer a, integer b) : integer;
+};
+Counter::add(integer a, integer b) : integer
+  do
+    total = total + a * b;
+    return (total);
+  end;
+sum(integer a, integer b, integer c, integer d, integer e) : integer
+  do
+    return (a + b + c + d + e);
+  end;
+first(integer v[3], integer k) : integer
+  do
+    return (v[k]);
+  end;
+fact(integer n) : integer
+  local
+    integer r;
+  do
+    r = 1;
+    if (n > 1)
+      then
+        r = n * fact(n - 1);
+      else
+    ;
+    return (r);
+  end;
+main
+  local
+    Counter c;
+    integer v[3];
+    integer x;
+  do
+    read(x);
+    c.total = 0;
+    v[0] = 7;
+    v[1] = x;
+    v[2] = 9;
+    write(fact(x));
+    write(sum(1, 2, sum(x, x, x, x, x), 4, fact(3)));
+    write(c.add(x, 2) + c.add(first(v, 1), 3));
+    write(first(v, 2));
+  end
+"""
+
+
+def functions(executable: str) -> dict:
+    """Lines of each function of an executable by name"""
+    out = {}
+    for part in executable.split("% begin function ")[1:]:
+        name, _, body = part.partition(" definition\n")
+        out[name] = [line.split() for line in body.splitlines()]
+    return out
+
+
+class CallsTestCase(TestCase):
+    def test_leaf_functions(self):
+        _, executable = bench._generate(SOURCE, disable=["inlining"])
+        code = functions(executable)
+        for name in ("func1sum", "func2first", "func4Counter_add"):
+            with self.subTest(name):
+                self.assertNotIn(["sw", "-4(r14),r15"], code[name][:2])
+        self.assertEqual(code["func3fact"][0], ["func3fact", "sw", "-4(r14),r15"])
+
+    def test_arguments_in_registers(self):
+        _, executable = bench._generate(
+            SOURCE,
+            disable=[
+                "inlining",
+                "partial evaluation",
+                "registers",
+                "loops",
+                "slot sharing",
+            ],
+            peephole=(),
+        )
+        main = functions(executable)["main"]
+        call = main.index(["jl", "r15,func1sum"])
+        loads = main[call - 7 : call - 1]
+        self.assertEqual(
+            [line[1].split(",")[0] for line in loads],
+            ["r1", "r2", "r3", "r4", "r5", "-92(r14)"],
+        )
+        # Only the fifth argument is passed on the stack
+        self.assertEqual(loads[-1][0], "sw")
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class CallsMoonTestCase(TestCase):
+    def test_nested_calls(self):
+        for stdin, expected in (("0\n", [1, 13, 0, 9]), ("5\n", [120, 38, 40, 9])):
+            with self.subTest(stdin):
+                for options in ({}, dict(disable=["registers", "loops"], peephole=())):
+                    executable = bench.compile_source(SOURCE, **options)
+                    output, _ = bench.run(executable, stdin)
+                    self.assertEqual(output.split(), [str(n) for n in expected])
@@ -0,0 +1,50 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import bench
+from gen.models import Code, Line
+from gen.output import ExecutableOutput
+from .test_calls import SOURCE
+
+
+def _code(*instructions):
+    code = Code()
+    for instruction in instructions:
+        code.append(Line(instruction, []))
+    return code
+
+
+class CodeTestCase(TestCase):
+    def test_linked_code_released_in_order(self):
+        inner = _code("add", "sub")
+        outer = Code()
+        outer += Code()
+        outer += inner
+        outer += [Line("mul", [])]
+        outer.append(Line("div", []))
+        self.assertEqual(outer.first().instruction, "add")
+        self.assertEqual(outer.last().instruction, "div")
+        lines = outer.release()
+        self.assertEqual([l.instruction for l in lines], ["add", "sub", "mul", "div"])
+        # The buffers of every node are freed
+        self.assertIsNone(outer.first())
+        self.assertIsNone(inner.first())
+
+    def test_deep_nesting(self):
+        code = _code("nop")
+        for _ in range(10000):
+            parent = Code()
+            parent += code
+            code = parent
+        self.assertEqual(len(code.release()), 1)
+
+
+class ExecutableOutputTestCase(TestCase):
+    def test_streamed_executable(self):
+        generator, executable = bench._generate(SOURCE)
+        with tempfile.TemporaryDirectory() as directory:
+            output = ExecutableOutput(os.path.join(directory, "prog.src"))
+            output.emit(generator.prog)
+            with open(output.collect_files()[0]) as f:
+                self.assertEqual(f.read(), executable)
@@ -0,0 +1,90 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from sem.parallel import preorder
+from .test_constant_folding import expression, fold
+
+SOURCE = """
+touch(integer x) : integer
+  do
+    write(x);
+    return (x);
+  end;
+main
+  local
+    integer a;
+    integer b;
+    integer i;
+  do
+    read(a);
+    if ((a and touch(1)) <> 0)
+      then
+        write(10);
+      else
+        write(20);
+    ;
+    if ((a or touch(2)) == 0)
+      then
+        write(30);
+      else
+        write(40);
+    ;
+    if (not a == 0)
+      then
+        write(50);
+      else
+    ;
+    b = not a or touch(3) and a;
+    write(b);
+    i = 6;
+    while ((i and (i - 2)) <> 0)
+      do
+        i = i - 1;
+      end;
+    write(i);
+  end
+"""
+
+
+class ConditionsTestCase(TestCase):
+    def test_decided_operations_folded(self):
+        ast = fold(
+            SOURCE.replace("read(a);", "a = 0; write(a and touch(1));").replace(
+                "b = not a", "b = 2 - a"
+            )
+        )
+        main = ast.children[-1].children[-1].children
+        # Decided by the left operand, `touch` is not called
+        self.assertEqual(expression(main[1].children[0]), "0")
+        self.assertEqual(expression(main[4].children[1]), "1")
+        # Otherwise the right operand is kept
+        self.assertIn("touch", [n.token.lexeme for n in preorder(main[3]) if n.token])
+
+    def test_literal_compared_as_immediate(self):
+        generator, _ = bench._generate(
+            SOURCE.replace("i = 6;", "if (3 == a) then i = 6; else i = 5;;").replace(
+                "while ((i and (i - 2)) <> 0)", "while (10 > i)"
+            ),
+            level=0,
+        )
+        instructions = [
+            line.instruction for func in generator.prog.functions for line in func.lines
+        ]
+        self.assertIn("ceqi", instructions)
+        # The literal moves to the right of the mirrored relation
+        self.assertIn("clti", instructions)
+        self.assertNotIn("clt", instructions)
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class ConditionsMoonTestCase(TestCase):
+    def test_right_operand_skipped(self):
+        executable = bench.compile_source(SOURCE)
+        for stdin, expected in (
+            ("0\n", [20, 2, 40, 1, 2]),
+            ("5\n", [1, 10, 40, 50, 3, 1, 2]),
+        ):
+            with self.subTest(stdin):
+                output, _ = bench.run(executable, stdin)
+                self.assertEqual(output.split(), [str(n) for n in expected])
@@ -0,0 +1,119 @@
+import io
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.vis.constant_folding import ConstantFolder
+from lex import Scanner
+from sem import CompilationContext, SemanticAnalyzer
+from sem.parallel import preorder
+from sem.table import RecordType
+from syn import Parser
+from syn.ast import GroupNodeType, LeafNodeType
+
+SOURCE = """
+f(integer a) : integer
+  local
+    integer x;
+    integer y;
+  do
+    x = 4 * 8 + 2;
+    y = x / -3;
+    if (y < 0)
+      then
+        a = a + 1;
+      else
+        a = a - 1;
+    ;
+    while (a > 0)
+      do
+        a = a - 10;
+        x = x + 1;
+      end;
+    return (x + 1000 * 1000 + y / 0);
+  end;
+main
+  local
+    integer r;
+  do
+    r = f(2);
+    write(r);
+  end
+"""
+
+
+def fold(source):
+    ast = Parser().start(Scanner(io.StringIO(source))).ast
+    context = CompilationContext()
+    SemanticAnalyzer(context).start(ast)
+    ast.accept(ConstantFolder(context))
+    return ast
+
+
+def statements(ast):
+    return ast.children[1].children[0].children[-1].children
+
+
+def expression(node):
+    if node.node_type == LeafNodeType.LITERAL:
+        return node.token.lexeme
+    if len(node.children) == 2:
+        lhs, rhs = map(expression, node.children)
+        return "({} {} {})".format(lhs, node.token.lexeme, rhs)
+    # Variable
+    return node.children[0].children[0].token.lexeme
+
+
+class ConstantFoldingTestCase(TestCase):
+    def setUp(self):
+        self.ast = fold(SOURCE)
+        self.stats = statements(self.ast)
+
+    def test_literals_folded(self):
+        self.assertEqual(expression(self.stats[0].children[1]), "34")
+
+    def test_constants_propagated(self):
+        # Division truncates toward zero
+        self.assertEqual(expression(self.stats[1].children[1]), "-11")
+
+    def test_constant_condition(self):
+        self.assertEqual(
+            [s.node_type for s in self.stats],
+            [GroupNodeType.ASSIGN_STAT] * 3
+            + [GroupNodeType.WHILE_STAT, GroupNodeType.RETURN_STAT],
+        )
+        self.assertEqual(expression(self.stats[2].children[1]), "(a + 1)")
+
+    def test_loop_variables_not_propagated(self):
+        body = self.stats[3].children[1].children
+        self.assertEqual(expression(body[1].children[1]), "(x + 1)")
+        self.assertEqual(
+            expression(self.stats[4].children[0]), "((x + (1000 * 1000)) + (-11 / 0))"
+        )
+
+    def test_temporaries_removed(self):
+        table = self.ast.children[1].children[0].record.table
+        temps = [
+            r
+            for records in table.entries.values()
+            for r in records
+            if r.record_type == RecordType.TEMP
+        ]
+        folded = sum(
+            1
+            for stat in self.stats
+            for node in preorder(stat)
+            if node.node_type in (GroupNodeType.ADD_EXPR, GroupNodeType.MULT_EXPR)
+        )
+        self.assertEqual(len(temps), folded)
+        self.assertEqual(table.current_size(), 4 * (3 + folded))
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class ConstantFoldingMoonTestCase(TestCase):
+    def test_same_output(self):
+        source = SOURCE.replace(" + y / 0", "")
+        output, cycles = bench.run(bench.compile_source(source, disable=["folding"]))
+        folded, folded_cycles = bench.run(bench.compile_source(source))
+        self.assertEqual(folded, output)
+        self.assertLess(folded_cycles, cycles)
@@ -0,0 +1,105 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.deadcode import remove_dead_code
+from .test_regalloc import code, lines
+
+SOURCE = """
+class A {
+  public used() : integer;
+  public unused() : integer;
+};
+A::used() : integer
+  do
+    return (1);
+  end;
+A::unused() : integer
+  do
+    return (2);
+  end;
+unused(integer a) : integer
+  do
+    return (a);
+  end;
+used(integer a) : integer
+  local
+    integer x;
+  do
+    x = a * 3;
+    x = a + 1;
+    return (x);
+  end;
+main
+  local
+    A obj;
+  do
+    write(used(2) + obj.used());
+  end
+"""
+
+
+class DeadCodeTestCase(TestCase):
+    def test_dead_store(self):
+        self.assertEqual(
+            code(
+                remove_dead_code(
+                    lines(
+                        "lw r1,-8(r14)",
+                        "muli r2,r1,3",
+                        "sw -12(r14),r2",
+                        "addi r2,r1,1",
+                        "sw -12(r14),r2",
+                        "lw r3,-12(r14)",
+                        "sw 0(r14),r3",
+                        "jr r15",
+                    ),
+                    [-8, -12],
+                )
+            ),
+            [
+                "lw r1,-8(r14)",
+                "addi r2,r1,1",
+                "sw -12(r14),r2",
+                "lw r3,-12(r14)",
+                "sw 0(r14),r3",
+                "jr r15",
+            ],
+        )
+
+    def test_escaping_store_kept(self):
+        source = [
+            "addi r1,r0,1",
+            "sw -12(r14),r1",
+            "addi r2,r14,-12",
+            "sw -28(r14),r2",
+            "jr r15",
+        ]
+        self.assertEqual(code(remove_dead_code(lines(*source), [-12])), source)
+
+    def test_unreachable_functions(self):
+        generator, executable = bench._generate(
+            SOURCE, disable=["inlining", "partial evaluation"]
+        )
+        self.assertIn("used", executable)
+        self.assertNotIn("unused", executable)
+        globals_ = generator.passes[-1].context.globals
+        class_table = globals_.entries["A"][0].table
+        for table in (globals_, class_table):
+            self.assertIn("used", table.entries)
+            self.assertNotIn("unused", table.entries)
+            self.assertFalse(table.overloads["unused"])
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class DeadCodeMoonTestCase(TestCase):
+    def test_same_output(self):
+        source = bench.compile_source(
+            SOURCE, disable=["dead functions", "dead code", "partial evaluation"]
+        )
+        output, cycles = bench.run(source)
+        optimized, optimized_cycles = bench.run(
+            bench.compile_source(SOURCE, disable=["partial evaluation"])
+        )
+        self.assertEqual(optimized, output)
+        self.assertLess(optimized_cycles, cycles)
@@ -0,0 +1,145 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.vis.evaluation import pure_functions
+
+SOURCE = """
+class A {
+  public integer total;
+  public get() : integer;
+};
+A::get() : integer
+  do
+    return (total);
+  end;
+fact(integer n) : integer
+  local
+    integer r;
+  do
+    r = 1;
+    if (n > 1)
+      then
+        r = n * fact(n - 1);
+      else
+    ;
+    return (r);
+  end;
+squares(integer n) : integer
+  local
+    integer a[4];
+    integer i;
+    integer sum;
+  do
+    i = 0;
+    sum = 0;
+    while (i < 4)
+      do
+        a[i] = (n + i) * (n + i);
+        i = i + 1;
+      end;
+    while (0 < i)
+      do
+        i = i - 1;
+        sum = sum + a[i];
+      end;
+    return (sum);
+  end;
+spin(integer n) : integer
+  do
+    while (n < 30000)
+      do
+        n = n + 1;
+      end;
+    return (n);
+  end;
+quotient(integer n) : integer
+  do
+    return (100 / n);
+  end;
+loud(integer n) : integer
+  do
+    write(n);
+    return (n);
+  end;
+louder(integer n) : integer
+  do
+    return (loud(n) * 2);
+  end;
+main
+  local
+    integer x;
+    A obj;
+  do
+    read(x);
+    obj.total = 5;
+    write(fact(5) + squares(fact(2)));
+    write(squares(x));
+    write(spin(7) - x);
+    write(quotient(4));
+    if (x < 0)
+      then
+        write(quotient(0));
+      else
+    ;
+    write(louder(3) + obj.get());
+  end
+"""
+
+DEEP = """
+sum(integer n) : integer
+  do
+    if (n == 0)
+      then
+        return (0);
+      else
+        return (n + sum(n - 1));
+    ;
+  end;
+main
+  do
+    write(sum(20));
+    write(sum(500));
+  end
+"""
+
+
+class EvaluationTestCase(TestCase):
+    def test_pure_functions(self):
+        root = bench._parse(SOURCE)
+        bench.SemanticAnalyzer(bench.CompilationContext()).start(root)
+        names = {f.record.table.name for f in pure_functions(root).values()}
+        # Writing, calling an impure function or a member function is impure
+        self.assertEqual(names, {"fact", "squares", "spin", "quotient"})
+
+    def test_evaluated_calls(self):
+        generator, _ = bench._generate(SOURCE)
+        # Not the calls running out of steps, dividing by zero or taking variables
+        self.assertEqual(
+            generator.evaluator.evaluated,
+            [("fact", "main", 120), ("squares", "main", 54), ("quotient", "main", 25)],
+        )
+        generator, _ = bench._generate(SOURCE, level=1)
+        self.assertEqual(generator.evaluator.evaluated, [])
+
+    def test_deep_recursion(self):
+        generator, executable = bench._generate(DEEP)
+        # Nested deeper than the interpreter can recurse, the call is kept
+        self.assertEqual(generator.evaluator.evaluated, [("sum", "main", 210)])
+        self.assertIn("jl    r15,func1sum", executable)
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class EvaluationMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("2\n", "5\n"):
+            with self.subTest(stdin):
+                executable = bench.compile_source(
+                    SOURCE, disable=["partial evaluation"]
+                )
+                output, cycles = bench.run(executable, stdin)
+                evaluated, evaluated_cycles = bench.run(
+                    bench.compile_source(SOURCE), stdin
+                )
+                self.assertEqual(evaluated, output)
+                self.assertLess(evaluated_cycles, cycles)
@@ -0,0 +1,89 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.frames import SharedSlots
+from .test_calls import SOURCE
+from .test_regalloc import code, lines
+
+
+class SharedSlotsTestCase(TestCase):
+    def test_disjoint_slots_shared(self):
+        source = lines(
+            "addi r1,r0,1",
+            "sw -12(r14),r1",
+            "addi r2,r0,2",
+            "sw -16(r14),r2",
+            "lw r1,-12(r14)",
+            "lw r2,-16(r14)",
+            "add r3,r1,r2",
+            "sw -20(r14),r3",
+            "lw r3,-20(r14)",
+            "sw -28(r14),r3",
+            "addi r14,r14,-24",
+            "jl r15,putstr",
+            "subi r14,r14,-24",
+            "lw r13,-20(r14)",
+            "jr r15",
+        )
+        layout = SharedSlots(source, [-12, -16, -20, -24])
+        # -12 and -16 are live together, -24 is overlapped by the pushed frame
+        self.assertEqual(layout.shared, {-20: -12})
+        self.assertEqual(layout.saved, 4)
+        self.assertEqual(
+            code(layout.relocate(source)),
+            [
+                "addi r1,r0,1",
+                "sw -12(r14),r1",
+                "addi r2,r0,2",
+                "sw -16(r14),r2",
+                "lw r1,-12(r14)",
+                "lw r2,-16(r14)",
+                "add r3,r1,r2",
+                "sw -12(r14),r3",
+                "lw r3,-12(r14)",
+                "sw -24(r14),r3",
+                "addi r14,r14,-20",
+                "jl r15,putstr",
+                "subi r14,r14,-20",
+                "lw r13,-12(r14)",
+                "jr r15",
+            ],
+        )
+
+    def test_escaped_slot_kept(self):
+        source = lines(
+            "addi r1,r0,1",
+            "sw -12(r14),r1",
+            "addi r2,r14,-16",
+            "sw -28(r14),r2",
+            "jr r15",
+        )
+        self.assertEqual(SharedSlots(source, [-12, -16]).shared, {})
+
+    def test_frames_shrink(self):
+        generator, _ = bench._generate(
+            SOURCE, disable=["registers", "partial evaluation"]
+        )
+        frames = {func.name: func.frame for func in generator.prog.functions}
+        before, after = frames["func3fact"]
+        self.assertLess(after, before)
+        table = generator.passes[-1].context.globals.entries["fact"][0].table
+        offsets = [r.offset for records in table.entries.values() for r in records]
+        self.assertLess(len(set(offsets)), len(offsets))
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class SharedSlotsMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("0\n", "5\n"):
+            with self.subTest(stdin):
+                unshared = bench.compile_source(
+                    SOURCE, disable=["registers", "slot sharing"], peephole=()
+                )
+                output, _ = bench.run(unshared, stdin)
+                executable = bench.compile_source(
+                    SOURCE, disable=["registers"], peephole=()
+                )
+                shared, _ = bench.run(executable, stdin)
+                self.assertEqual(shared, output)
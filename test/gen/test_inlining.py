@@ -0,0 +1,104 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.vis.inlining import inline_cost
+from sem.parallel import function_units
+
+SOURCE = """
+class Point {
+  public integer x;
+  public getX() : integer;
+  public scaled(integer k) : integer;
+  public setX(integer v) : integer;
+};
+Point::getX() : integer
+  do
+    return (x);
+  end;
+Point::scaled(integer k) : integer
+  do
+    return (x * k);
+  end;
+Point::setX(integer v) : integer
+  do
+    x = v;
+    return (v);
+  end;
+square(integer n) : integer
+  local
+    integer s;
+  do
+    s = n * n;
+    return (s);
+  end;
+twice(integer n) : integer
+  do
+    return (square(n) + square(n));
+  end;
+main
+  local
+    Point p;
+    integer a;
+    integer i;
+  do
+    read(a);
+    p.x = a;
+    i = 0;
+    while (i < 2)
+      do
+        write(square(i) + p.scaled(i));
+        i = i + 1;
+      end;
+    if (square(a) > 10)
+      then
+        write(twice(a));
+      else
+        write(p.setX(a + 1) + p.getX());
+    ;
+    write((a and square(a)) + p.x);
+  end
+"""
+
+
+class InliningTestCase(TestCase):
+    def test_cost(self):
+        root = bench._parse(SOURCE)
+        bench.SemanticAnalyzer(bench.CompilationContext()).start(root)
+        units = function_units(root)
+        get_x, scaled, set_x, square, twice = map(inline_cost, units[:-1])
+        self.assertLess(get_x, scaled)
+        self.assertLess(scaled, square)
+        # Writes a data member, calls a function
+        self.assertIsNone(set_x)
+        self.assertIsNone(twice)
+        self.assertIsNone(inline_cost(units[3], budget=square - 1))
+
+    def test_inlined_calls(self):
+        generator, executable = bench._generate(SOURCE)
+        self.assertEqual(
+            generator.inliner.inlined,
+            [
+                ("square", "twice"),
+                ("square", "twice"),
+                # Right operands first, as the generated code evaluates them
+                ("Point::scaled", "main"),
+                ("square", "main"),
+                ("square", "main"),
+            ],
+        )
+        # Only called through the right operand of `and` and from `twice`
+        self.assertIn("square", executable)
+        self.assertNotIn("scaled", executable)
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class InliningMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("0\n", "2\n", "5\n"):
+            with self.subTest(stdin):
+                executable = bench.compile_source(SOURCE, disable=["inlining"])
+                output, cycles = bench.run(executable, stdin)
+                inlined, inlined_cycles = bench.run(bench.compile_source(SOURCE), stdin)
+                self.assertEqual(inlined, output)
+                self.assertLess(inlined_cycles, cycles)
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from gen.ir import ControlFlowGraph, dominators, liveness, reaching_definitions
+from gen.passes import PassManager
+from .test_regalloc import code, lines
+
+LOOP = lines(
+    "addi r1,r0,0",
+    "sw -8(r14),r1",
+    "loop: lw r1,-8(r14)",
+    "clti r2,r1,10",
+    "bz r2,done",
+    "addi r1,r1,1",
+    "sw -8(r14),r1",
+    "j loop",
+    "addi r3,r0,7",
+    "done: lw r13,-8(r14)",
+    "jr r15",
+)
+
+
+class ControlFlowGraphTestCase(TestCase):
+    def setUp(self):
+        self.cfg = ControlFlowGraph(LOOP, [-8])
+
+    def test_blocks(self):
+        self.assertEqual(
+            [(b.start, len(b.lines), b.label) for b in self.cfg.blocks],
+            [(0, 2, None), (2, 3, "loop"), (5, 3, None), (8, 1, None), (9, 2, "done")],
+        )
+        self.assertEqual(
+            [b.successors for b in self.cfg.blocks], [[1], [2, 4], [1], [4], []]
+        )
+        self.assertEqual(code(self.cfg.lines()), code(LOOP))
+
+    def test_liveness(self):
+        live_in, live_out = liveness(self.cfg)
+        self.assertIn(-8, live_in[1])
+        self.assertIn(-8, live_out[2])
+        self.assertNotIn("r1", live_in[1])
+
+    def test_reaching_definitions(self):
+        reaching = reaching_definitions(self.cfg)
+        # Both stores of the slot reach the loop header and the exit
+        self.assertTrue({1, 6} <= reaching[1])
+        self.assertTrue({1, 6} <= reaching[4])
+        # The loads and compare of the header replace those of the previous trip
+        self.assertEqual(reaching[2], {1, 2, 3, 6})
+
+    def test_dominators(self):
+        self.assertEqual(
+            dominators(self.cfg), [{0}, {0, 1}, {0, 1, 2}, {3}, {0, 1, 4}]
+        )
+
+
+class PassManagerTestCase(TestCase):
+    def test_disabled_passes_skipped(self):
+        manager = PassManager(
+            [
+                ("first", lambda lines, slots: lines + lines[:1]),
+                ("second", lambda lines, slots: lines[1:]),
+            ],
+            disabled=["second"],
+        )
+        self.assertEqual(code(manager.run(LOOP[:2], [-8])), code(LOOP[:2] + LOOP[:1]))
+        self.assertEqual(list(manager.timings), ["first"])
+        manager.analyze("dominators", ControlFlowGraph(LOOP))
+        self.assertEqual(list(manager.timings), ["first", "dominators"])
@@ -0,0 +1,278 @@
+import os
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.loops import LoopOptimizer, rotate_loops
+from .test_regalloc import code, FIXTURES, lines
+
+EARLY_RETURN = """
+f1(integer p0, integer p1) : integer
+  local
+    integer i1;
+    integer i2;
+  do
+    i2 = 5;
+    i1 = -2;
+    while (i1 <= 3)
+      do
+        if (i2 >= 17)
+          then
+            do
+              p1 = 1;
+            end
+          else
+            do
+              return (p0);
+            end
+        ;
+        i1 = i1 + 1;
+      end;
+    return (i1 * i2);
+  end;
+main
+  do
+    write(f1(3, 3));
+  end
+"""
+
+IF_LAST = """
+main
+  local
+    integer i;
+    integer n;
+  do
+    i = 0;
+    n = 0;
+    while (i < 10)
+      do
+        n = n + i;
+        if (i == 7)
+          then
+            i = 100;
+          else
+            i = i + 1;
+        ;
+      end;
+    write(i);
+    write(n);
+  end
+"""
+
+
+class LoopOptimizerTestCase(TestCase):
+    def test_invariant_hoisted(self):
+        optimizer = LoopOptimizer(
+            lines(
+                "addi r7,r0,0",
+                "loop: sub r8,r5,r6",
+                "addi r2,r0,1",
+                "sub r8,r8,r2",
+                "clt r3,r7,r8",
+                "bz r3,done",
+                "lw r1,-8(r14)",
+                "lw r2,0(r1)",
+                "add r10,r10,r2",
+                "addi r7,r7,1",
+                "j loop",
+                "done: sw 0(r14),r10",
+                "jr r15",
+            ),
+            [-8],
+        )
+        self.assertEqual(
+            code(optimizer.optimize()),
+            [
+                "addi r7,r0,0",
+                "sub r4,r5,r6",
+                "subi r9,r4,1",
+                "lw r1,-8(r14)",
+                "loop: addi r2,r0,1",
+                "clt r3,r7,r9",
+                "bz r3,done",
+                "lw r2,0(r1)",
+                "add r10,r10,r2",
+                "addi r7,r7,1",
+                "j loop",
+                "done: sw 0(r14),r10",
+                "jr r15",
+            ],
+        )
+        self.assertEqual(optimizer.hoisted, 3)
+
+    def test_stored_slot_not_hoisted(self):
+        source = [
+            "loop: lw r1,-8(r14)",
+            "bz r1,done",
+            "subi r1,r1,1",
+            "sw -8(r14),r1",
+            "j loop",
+            "done: jr r15",
+        ]
+        optimized = LoopOptimizer(lines(*source), [-8]).optimize()
+        self.assertEqual(code(optimized), source)
+
+    def test_pointer_stepped(self):
+        optimizer = LoopOptimizer(
+            lines(
+                "lw r4,-8(r14)",
+                "addi r7,r0,0",
+                "loop: clti r3,r7,5",
+                "bz r3,done",
+                "addi r8,r7,1",
+                "muli r2,r8,4",
+                "sub r8,r4,r2",
+                "lw r1,0(r8)",
+                "muli r2,r7,4",
+                "sub r9,r4,r2",
+                "sw 0(r9),r1",
+                "addi r7,r7,1",
+                "j loop",
+                "done: jr r15",
+            ),
+            [-8],
+        )
+        self.assertEqual(
+            code(optimizer.optimize()),
+            [
+                "lw r4,-8(r14)",
+                "addi r7,r0,0",
+                "muli r5,r7,4",
+                "sub r5,r4,r5",
+                "loop: clti r3,r7,5",
+                "bz r3,done",
+                "addi r8,r7,1",
+                "muli r2,r8,4",
+                "lw r1,-4(r5)",
+                "muli r2,r7,4",
+                "sw 0(r5),r1",
+                "addi r7,r7,1",
+                "addi r5,r5,-4",
+                "j loop",
+                "done: jr r15",
+            ],
+        )
+        self.assertEqual(optimizer.reduced, 2)
+
+
+class RotationTestCase(TestCase):
+    def test_condition_at_bottom(self):
+        rotated = rotate_loops(
+            lines(
+                "addi r7,r0,0",
+                "loop: clti r3,r7,10",
+                "bz r3,done",
+                "add r10,r10,r7",
+                "addi r7,r7,1",
+                "j loop",
+                "done: sw 0(r14),r10",
+                "jr r15",
+            )
+        )
+        self.assertEqual(
+            code(rotated),
+            [
+                "addi r7,r0,0",
+                "loop: clti r3,r7,10",
+                "bz r3,done",
+                "loopbody: add r10,r10,r7",
+                "addi r7,r7,1",
+                "clti r3,r7,10",
+                "bnz r3,loopbody",
+                "done: sw 0(r14),r10",
+                "jr r15",
+            ],
+        )
+
+    def test_labelled_jump_back(self):
+        rotated = rotate_loops(
+            lines(
+                "loop: clti r3,r7,10",
+                "bz r3,done",
+                "bz r7,skip",
+                "addi r7,r7,1",
+                "skip: j loop",
+                "done: jr r15",
+            )
+        )
+        # Branching to the jump back now branches to the condition
+        self.assertEqual(
+            code(rotated),
+            [
+                "loop: clti r3,r7,10",
+                "bz r3,done",
+                "loopbody: bz r7,skip",
+                "addi r7,r7,1",
+                "skip: clti r3,r7,10",
+                "bnz r3,loopbody",
+                "done: jr r15",
+            ],
+        )
+
+    def test_not_rotated(self):
+        for source in (
+            # Condition with a call
+            ["loop: jl r15,f", "bz r13,done", "j loop", "done: jr r15"],
+            # Either operand of `or` enters the loop
+            [
+                "loop: bnz r1,skip",
+                "bz r2,done",
+                "skip: addi r1,r1,-1",
+                "j loop",
+                "done: jr r15",
+            ],
+            # Header jumped to from the loop body
+            [
+                "loop: bz r1,done",
+                "bz r2,loop",
+                "addi r1,r1,-1",
+                "j loop",
+                "done: jr r15",
+            ],
+        ):
+            with self.subTest(source[0]):
+                self.assertEqual(code(rotate_loops(lines(*source))), source)
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class LoopOptimizerMoonTestCase(TestCase):
+    def test_fixtures(self):
+        for name in ("bubblesort", "matrix", "staticbubblesort"):
+            with open(os.path.join(FIXTURES, name + ".src")) as f:
+                source = f.read()
+            with self.subTest(name):
+                output, cycles = bench.run(
+                    bench.compile_source(source, disable=["loops"])
+                )
+                optimized, optimized_cycles = bench.run(bench.compile_source(source))
+                self.assertEqual(optimized, output)
+                self.assertLess(optimized_cycles, cycles)
+
+    def test_rotation(self):
+        with open(os.path.join(FIXTURES, "bubblesort.src")) as f:
+            bubblesort = f.read()
+        for name, source in (
+            ("loops", bench.nested_loops(6)),
+            ("bubblesort", bubblesort),
+        ):
+            with self.subTest(name):
+                output, cycles = bench.run(
+                    bench.compile_source(source, disable=["rotation"])
+                )
+                rotated, rotated_cycles = bench.run(bench.compile_source(source))
+                self.assertEqual(rotated, output)
+                self.assertLess(rotated_cycles, cycles)
+
+    def test_early_return(self):
+        # The copy of the returned value is the only one on the path leaving the loop
+        for options in (dict(), dict(level=0, enable=["loops", "folding"])):
+            with self.subTest(**options):
+                executable = bench.compile_source(EARLY_RETURN, **options)
+                self.assertEqual(bench.run(executable)[0].split(), ["3"])
+
+    def test_if_last_in_body(self):
+        # The label after the `if` ends up on the jump back to the condition
+        for options in (dict(), dict(level=0, enable=["registers", "rotation"])):
+            with self.subTest(**options):
+                executable = bench.compile_source(IF_LAST, **options)
+                self.assertEqual(bench.run(executable)[0].split(), ["100", "28"])
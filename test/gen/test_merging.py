@@ -0,0 +1,113 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+
+SOURCE = """
+class A {
+  public integer x;
+  public integer y;
+  public gety() : integer;
+  public twice() : integer;
+};
+class B {
+  public integer p;
+  public integer q;
+  public getq() : integer;
+  public twice() : integer;
+};
+A::gety() : integer
+  do
+    return (y);
+  end;
+A::twice() : integer
+  do
+    return (gety() * 2);
+  end;
+B::getq() : integer
+  do
+    return (q);
+  end;
+B::twice() : integer
+  do
+    return (getq() * 2);
+  end;
+fact(integer n) : integer
+  local
+    integer r;
+  do
+    r = 1;
+    if (n > 1)
+      then
+        r = n * fact(n - 1);
+      else
+    ;
+    return (r);
+  end;
+fact2(integer n) : integer
+  local
+    integer r;
+  do
+    r = 1;
+    if (n > 1)
+      then
+        r = n * fact2(n - 1);
+      else
+    ;
+    return (r);
+  end;
+main
+  local
+    A a;
+    B b;
+    integer n;
+  do
+    read(n);
+    a.y = n;
+    b.q = n + 1;
+    write(a.gety() + b.getq());
+    write(a.twice() - b.twice());
+    write(fact(n) + fact2(n + 1));
+  end
+"""
+
+
+class MergingTestCase(TestCase):
+    def test_merged_functions(self):
+        generator, executable = bench._generate(
+            SOURCE, disable=["inlining", "partial evaluation"]
+        )
+        # Callers become identical once the functions they call are merged
+        self.assertEqual(
+            generator.merger.merged,
+            [
+                ("func5B_getq", "func3A_gety"),
+                ("func2fact2", "func1fact"),
+                ("func6B_twice", "func4A_twice"),
+            ],
+        )
+        self.assertEqual(
+            [(f.name, f.aliases) for f in generator.prog.functions[:-1]],
+            [
+                ("func3A_gety", ["func5B_getq"]),
+                ("func4A_twice", ["func6B_twice"]),
+                ("func1fact", ["func2fact2"]),
+            ],
+        )
+        self.assertNotIn("func5B_getq", executable.replace("% alias func5B_getq", ""))
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class MergingMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("1\n", "4\n"):
+            with self.subTest(stdin):
+                disabled = ["inlining", "partial evaluation"]
+                executable = bench.compile_source(
+                    SOURCE, disable=disabled + ["merging"]
+                )
+                output, _ = bench.run(executable, stdin)
+                merged, _ = bench.run(
+                    bench.compile_source(SOURCE, disable=disabled), stdin
+                )
+                self.assertEqual(merged, output)
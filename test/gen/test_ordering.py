@@ -0,0 +1,55 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.passes import estimate
+
+TERMS = " + ".join("(a * {} - b)".format(i) for i in range(2, 20))
+
+SOURCE = """
+f(integer n) : integer
+  do
+    write(n);
+    return (n);
+  end;
+main
+  local
+    integer a;
+    integer b;
+    integer c;
+  do
+    read(a);
+    read(b);
+    c = (a + b) * (a - b) + (a * 3 + b * 5) * (a * 7 - b * 9);
+    c = c + {};
+    write(c);
+    write(f(a) - (f(b) + f(c)) * 2);
+  end
+""".format(TERMS)
+
+
+class OrderingTestCase(TestCase):
+    def test_fewer_temporaries(self):
+        generator, _ = bench._generate(SOURCE, disable=["ordering"])
+        ordered, _ = bench._generate(SOURCE)
+        main, ordered_main = generator.prog.functions[-1], ordered.prog.functions[-1]
+        # Left deep sums no longer keep every term in a temporary
+        self.assertLess(ordered_main.frame[1], main.frame[1])
+        self.assertLess(estimate(ordered.prog), estimate(generator.prog))
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class OrderingMoonTestCase(TestCase):
+    def test_same_output(self):
+        for level, disabled in ((2, []), (2, ["registers"]), (1, [])):
+            with self.subTest(level=level, disabled=disabled):
+                executable = bench.compile_source(
+                    SOURCE, level=level, disable=disabled + ["ordering"]
+                )
+                output, _ = bench.run(executable, "3\n5\n")
+                ordered, _ = bench.run(
+                    bench.compile_source(SOURCE, level=level, disable=disabled),
+                    "3\n5\n",
+                )
+                # Calls are still made right operands first
+                self.assertEqual(ordered, output)
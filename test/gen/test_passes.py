@@ -0,0 +1,51 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.passes import enabled_passes, estimate, OPTIMIZATION_LEVELS, PASSES
+from .test_inlining import SOURCE
+
+
+class OptimizationLevelTestCase(TestCase):
+    def test_enabled_passes(self):
+        self.assertEqual(enabled_passes(0), set())
+        self.assertEqual(enabled_passes(2), set(PASSES))
+        self.assertEqual(
+            enabled_passes(1, enable=["loops"], disable=["peephole"]),
+            (OPTIMIZATION_LEVELS[1] | {"loops"}) - {"peephole"},
+        )
+        with self.assertRaises(ValueError):
+            enabled_passes(3)
+        with self.assertRaises(ValueError):
+            enabled_passes(2, disable=["vectorization"])
+
+    def test_levels_trade_passes_for_code(self):
+        estimates = []
+        for level in sorted(OPTIMIZATION_LEVELS):
+            generator, _ = bench._generate(SOURCE, level=level)
+            self.assertEqual(
+                [name for name in PASSES if name in generator.timings],
+                [name for name in PASSES if name in OPTIMIZATION_LEVELS[level]],
+            )
+            estimates.append(estimate(generator.prog))
+        self.assertEqual(estimates, sorted(estimates, reverse=True))
+
+    def test_parallel_timings(self):
+        generator, _ = bench._generate(SOURCE, jobs=2, disable=["loops"])
+        self.assertEqual(
+            list(generator.timings), [name for name in PASSES if name != "loops"]
+        )
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class OptimizationLevelMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("0\n", "5\n"):
+            results = [
+                bench.run(bench.compile_source(SOURCE, level=level), stdin)
+                for level in sorted(OPTIMIZATION_LEVELS)
+            ]
+            with self.subTest(stdin):
+                self.assertEqual(len({output for output, _ in results}), 1)
+                cycles = [c for _, c in results]
+                self.assertEqual(cycles, sorted(cycles, reverse=True))
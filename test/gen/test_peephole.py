@@ -0,0 +1,106 @@
+import os
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.peephole import PeepholeOptimizer, RULES
+from .test_regalloc import code, FIXTURES, lines
+
+
+class PeepholeTestCase(TestCase):
+    def _assert_optimized(self, rule, source, expected):
+        optimizer = PeepholeOptimizer([rule])
+        self.assertEqual(code(optimizer.optimize_lines(lines(*source))), expected)
+        self.assertGreater(optimizer.hits[rule], 0)
+
+    def test_store_load(self):
+        self._assert_optimized(
+            "store_load",
+            ["sw -8(r14),r1", "lw r2,-8(r14)", "sw 0(r14),r2", "jr r15"],
+            ["sw -8(r14),r1", "add r2,r1,r0", "sw 0(r14),r2", "jr r15"],
+        )
+
+    def test_immediate_operand(self):
+        self._assert_optimized(
+            "immediate_operand",
+            ["addi r2,r0,10", "clt r3,r2,r1", "sw 0(r14),r3", "jr r15"],
+            ["cgti r3,r1,10", "sw 0(r14),r3", "jr r15"],
+        )
+
+    def test_immediate_still_used(self):
+        source = ["addi r2,r0,10", "add r3,r1,r2", "add r3,r3,r2", "jr r15"]
+        optimized = PeepholeOptimizer(["immediate_operand"]).optimize_lines(
+            lines(*source)
+        )
+        self.assertEqual(code(optimized), source)
+
+    def test_jump_to_next(self):
+        self._assert_optimized(
+            "jump_to_next",
+            ["bz r1,done", "addi r2,r0,1", "j done", "done: nop", "hlt"],
+            ["bz r1,done", "addi r2,r0,1", "done: nop", "hlt"],
+        )
+
+    def test_redundant_nop(self):
+        self._assert_optimized(
+            "redundant_nop",
+            ["bz r1,else", "addi r2,r0,1", "else: nop", "done: hlt", "nop"],
+            ["bz r1,done", "addi r2,r0,1", "done: hlt"],
+        )
+
+    def test_merge_frames(self):
+        self._assert_optimized(
+            "merge_frames",
+            [
+                "addi r14,r14,-20",
+                "jl r15,putstr",
+                "subi r14,r14,-20",
+                "lw r1,-16(r14)",
+                "addi r2,r14,-4",
+                "sw -28(r14),r1",
+                "addi r14,r14,-20",
+                "jl r15,putstr",
+                "subi r14,r14,-20",
+                "hlt",
+            ],
+            [
+                "addi r14,r14,-20",
+                "jl r15,putstr",
+                "lw r1,4(r14)",
+                "addi r2,r14,16",
+                "sw -8(r14),r1",
+                "jl r15,putstr",
+                "subi r14,r14,-20",
+                "hlt",
+            ],
+        )
+
+    def test_forward_copy(self):
+        self._assert_optimized(
+            "forward_copy",
+            ["add r8,r7,r2", "add r7,r8,r0", "sw 0(r14),r7", "jr r15"],
+            ["add r7,r7,r2", "sw 0(r14),r7", "jr r15"],
+        )
+
+    def test_unknown_rule(self):
+        with self.assertRaises(ValueError):
+            PeepholeOptimizer(["constant_folding"])
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class PeepholeMoonTestCase(TestCase):
+    def test_fixtures(self):
+        for name in ("array", "bubblesort", "easy", "intpolynomial", "simplemain"):
+            with open(os.path.join(FIXTURES, name + ".src")) as f:
+                source = f.read()
+            output, cycles = bench.run(bench.compile_source(source, peephole=()), "7\n")
+            for rule in RULES:
+                with self.subTest(name=name, rule=rule):
+                    executable = bench.compile_source(source, peephole=[rule])
+                    self.assertEqual(bench.run(executable, "7\n")[0], output)
+            with self.subTest(name):
+                optimized, optimized_cycles = bench.run(
+                    bench.compile_source(source), "7\n"
+                )
+                self.assertEqual(optimized, output)
+                self.assertLess(optimized_cycles, cycles)
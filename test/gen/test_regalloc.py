@@ -0,0 +1,163 @@
+import os
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.models import Line
+from gen.regalloc import allocate_registers
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+
+
+def lines(*code):
+    out = []
+    for line in code:
+        symbol, _, line = line.rpartition(":")
+        instruction, _, args = line.strip().partition(" ")
+        out.append(Line(instruction, args.split(",") if args else [], symbol or None))
+    return out
+
+
+def code(allocated):
+    out = []
+    for line in allocated:
+        text = (line.instruction + " " + ",".join(line.args)).rstrip()
+        out.append(line.symbol + ": " + text if line.symbol else text)
+    return out
+
+
+class RegisterAllocatorTestCase(TestCase):
+    def test_temporary_kept_in_register(self):
+        allocated = allocate_registers(
+            lines(
+                "lw r1,-8(r14)",
+                "addi r2,r0,2",
+                "mul r3,r1,r2",
+                "sw -12(r14),r3",
+                "lw r1,-12(r14)",
+                "sw 0(r14),r1",
+                "jr r15",
+            ),
+            [-8, -12],
+        )
+        self.assertEqual(
+            code(allocated),
+            [
+                "lw r4,-8(r14)",
+                "addi r2,r0,2",
+                "mul r4,r4,r2",
+                "sw 0(r14),r4",
+                "jr r15",
+            ],
+        )
+
+    def test_loop_labels_preserved(self):
+        allocated = allocate_registers(
+            lines(
+                "addi r1,r0,0",
+                "sw -8(r14),r1",
+                "loop: lw r1,-8(r14)",
+                "addi r2,r0,10",
+                "clt r3,r1,r2",
+                "bz r3,done",
+                "lw r1,-8(r14)",
+                "addi r2,r1,1",
+                "sw -8(r14),r2",
+                "j loop",
+                "done: hlt",
+            ),
+            [-8],
+        )
+        self.assertEqual(
+            code(allocated),
+            [
+                "addi r4,r0,0",
+                "loop: addi r2,r0,10",
+                "clt r3,r4,r2",
+                "bz r3,done",
+                "addi r4,r4,1",
+                "j loop",
+                "done: hlt",
+            ],
+        )
+
+    def test_live_across_call_stays_in_memory(self):
+        source = lines(
+            "addi r1,r0,3",
+            "sw -8(r14),r1",
+            "addi r14,r14,-12",
+            "jl r15,func1f",
+            "subi r14,r14,-12",
+            "lw r1,-8(r14)",
+            "sw 0(r14),r1",
+            "jr r15",
+        )
+        self.assertEqual(code(allocate_registers(source, [-8])), code(source))
+
+    def test_live_across_library_call(self):
+        allocated = allocate_registers(
+            lines(
+                "addi r1,r0,3",
+                "sw -8(r14),r1",
+                "addi r14,r14,-12",
+                "jl r15,putstr",
+                "subi r14,r14,-12",
+                "lw r1,-8(r14)",
+                "sw 0(r14),r1",
+                "jr r15",
+            ),
+            [-8],
+        )
+        self.assertEqual(code(allocated)[0], "addi r5,r0,3")
+
+    def test_escaping_slots_stay_in_memory(self):
+        source = lines(
+            "addi r1,r0,3",
+            "sw -8(r14),r1",
+            "sw -16(r14),r1",
+            "addi r2,r14,-8",
+            "addi r14,r14,-12",
+            "sw -8(r14),r2",
+            "jl r15,putstr",
+            "subi r14,r14,-12",
+            "lw r1,-16(r14)",
+            "sw 0(r14),r1",
+            "jr r15",
+        )
+        # -8 has its address taken, the callee frame overlaps -16
+        self.assertEqual(code(allocate_registers(source, [-8, -16])), code(source))
+
+    def test_spill_under_pressure(self):
+        busy = ["addi r{},r0,0".format(i) for i in range(1, 12)]
+        allocated = allocate_registers(
+            lines(
+                *busy,
+                "sw -8(r14),r1",
+                "sw -12(r14),r2",
+                "lw r1,-12(r14)",
+                "lw r2,-8(r14)",
+                "add r3,r1,r2",
+                "sw 0(r14),r3",
+                "jr r15",
+            ),
+            [-8, -12],
+        )
+        memory = [l for l in code(allocated) if "(r14)" in l and "0(r14)" not in l]
+        self.assertEqual(len(memory), 2)  # One slot stored and loaded
+        self.assertIn("add r12,r2,r0", code(allocated))
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class RegisterAllocationMoonTestCase(TestCase):
+    def _assert_faster(self, source, stdin="7\n"):
+        stack = bench.compile_source(source, disable=["registers"], peephole=())
+        output, cycles = bench.run(stack, stdin)
+        allocated = bench.compile_source(source, peephole=())
+        allocated, allocated_cycles = bench.run(allocated, stdin)
+        self.assertEqual(allocated, output)
+        self.assertLess(allocated_cycles, cycles)
+
+    def test_fixtures(self):
+        for name in ("array", "bubblesort", "easy", "intpolynomial", "simplemain"):
+            with open(os.path.join(FIXTURES, name + ".src")) as f, self.subTest(name):
+                self._assert_faster(f.read())
@@ -0,0 +1,65 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.select import select_instructions
+from .test_regalloc import code, lines
+
+SOURCE = """
+main
+  local
+    integer a;
+    integer b;
+    integer arr[4];
+  do
+    read(a);
+    b = a * 8;
+    write(b);
+    write(a / 4);
+    write(-a / 4);
+    write(a * -1 + 1 * a);
+    arr[2] = a / -1;
+    write(arr[2] * 0);
+  end
+"""
+
+
+class InstructionSelectorTestCase(TestCase):
+    def _assert_selected(self, source, expected):
+        self.assertEqual(code(select_instructions(lines(*source))), expected)
+
+    def test_constant_operands_folded(self):
+        self._assert_selected(
+            ["addi r2,r0,2", "muli r2,r2,4", "sub r3,r1,r2", "sw 0(r3),r4"],
+            ["addi r2,r0,2", "addi r2,r0,8", "subi r3,r1,8", "sw 0(r3),r4"],
+        )
+
+    def test_multiplication_shifted(self):
+        self._assert_selected(
+            ["muli r2,r2,8", "muli r3,r2,8", "muli r4,r3,1", "muli r5,r3,-1"],
+            ["sl r2,3", "muli r3,r2,8", "add r4,r3,r0", "sub r5,r0,r3"],
+        )
+        # Longer than one multiplication as shifts and adds
+        self._assert_selected(
+            ["muli r2,r2,10", "muli r3,r3,-4"], ["muli r2,r2,10", "muli r3,r3,-4"]
+        )
+
+    def test_signed_division(self):
+        self._assert_selected(
+            ["divi r1,r1,4", "clti r2,r1,0", "divi r2,r2,2", "divi r3,r1,-1"],
+            ["divi r1,r1,4", "clti r2,r1,0", "sr r2,1", "sub r3,r0,r1"],
+        )
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class InstructionSelectorMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("7\n", "-7\n"):
+            with self.subTest(stdin):
+                executable = bench.compile_source(SOURCE, disable=["selection"])
+                output, cycles = bench.run(executable, stdin)
+                selected, selected_cycles = bench.run(
+                    bench.compile_source(SOURCE), stdin
+                )
+                self.assertEqual(selected, output)
+                self.assertLess(selected_cycles, cycles)
@@ -0,0 +1,82 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from .test_calls import functions
+
+SOURCE = """
+gcd(integer a, integer b) : integer
+  do
+    if (b == 0)
+      then
+        return (a);
+      else
+        return (gcd(b, a - a / b * b));
+    ;
+  end;
+sum(integer n, integer acc) : integer
+  do
+    while (n > 30000)
+      do
+        acc = acc + n;
+        n = n - 1;
+      end;
+    if (n == 0)
+      then
+        return (acc);
+      else
+    ;
+    return (sum(n - 1, acc + n));
+  end;
+fact(integer n) : integer
+  do
+    if (n < 2)
+      then
+        return (1);
+      else
+    ;
+    return (n * fact(n - 1));
+  end;
+main
+  local
+    integer x;
+  do
+    read(x);
+    write(gcd(x * 84, 36));
+    write(sum(x * 10, 0));
+    write(fact(x));
+  end
+"""
+
+
+class TailCallsTestCase(TestCase):
+    def test_jumps(self):
+        for options in (dict(), dict(disable=["registers"], peephole=())):
+            with self.subTest(**options):
+                code = functions(bench.compile_source(SOURCE, **options))
+                # Leaf functions once they call themselves no more
+                for name in ("func1gcd", "func2sum"):
+                    self.assertFalse(any("jl" in line for line in code[name]))
+                # The returned value is not the call
+                self.assertIn(["jl", "r15,func3fact"], code["func3fact"])
+        for options in (dict(disable=["tail calls"]), dict(level=0)):
+            with self.subTest(**options):
+                code = functions(bench.compile_source(SOURCE, **options))
+                self.assertIn(["jl", "r15,func1gcd"], code["func1gcd"])
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class TailCallsMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("1\n", "6\n"):
+            with self.subTest(stdin):
+                executable = bench.compile_source(SOURCE, disable=["tail calls"])
+                output, cycles = bench.run(executable, stdin)
+                jumped, jumped_cycles = bench.run(bench.compile_source(SOURCE), stdin)
+                self.assertEqual(jumped, output)
+                self.assertLess(jumped_cycles, cycles)
+
+    def test_deep_recursion(self):
+        # Runs out of stack when every call takes a frame
+        output, _ = bench.run(bench.compile_source(SOURCE), "900\n")
+        self.assertEqual(output.split()[:2], ["36", "40504500"])
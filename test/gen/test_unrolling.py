@@ -0,0 +1,95 @@
+import shutil
+from unittest import skipUnless, TestCase
+
+import bench
+from gen.vis.unrolling import trip_count, unroll_factor
+from lex.token import Operators as O
+
+SOURCE = """
+main
+  local
+    integer a;
+    integer i;
+    integer j;
+    integer k;
+    integer sum;
+    integer arr[12];
+  do
+    read(a);
+    sum = 0;
+    i = 0;
+    while (i < 12)
+      do
+        arr[i] = a * i;
+        i = i + 1;
+      end;
+    k = 11;
+    while (0 < k)
+      do
+        sum = sum + arr[k] - arr[k - 1];
+        k = k - 1;
+      end;
+    i = 0;
+    while (i < a)
+      do
+        sum = sum + i;
+        i = i + 1;
+      end;
+    i = 0;
+    while (i < 5)
+      do
+        j = 0;
+        while (j <= 6)
+          do
+            sum = sum + i * j;
+            j = j + 2;
+          end;
+        i = i + 1;
+      end;
+    write(sum);
+  end
+"""
+
+
+class UnrollingTestCase(TestCase):
+    def test_trip_count(self):
+        self.assertEqual(trip_count(0, O.LT, 12, 1), 12)
+        self.assertEqual(trip_count(11, O.GT, 0, -1), 11)
+        self.assertEqual(trip_count(0, O.LTE, 6, 4), 2)
+        self.assertEqual(trip_count(5, O.LT, 0, 1), 0)
+        self.assertIsNone(trip_count(0, O.NEQ, 5, 2))
+
+    def test_factor(self):
+        self.assertEqual(unroll_factor(12, 4), 4)
+        self.assertEqual(unroll_factor(9, 4), 3)
+        self.assertEqual(unroll_factor(11, 4), 4)
+        # A remainder loop would run as often as the unrolled one
+        self.assertIsNone(unroll_factor(7, 4))
+        self.assertIsNone(unroll_factor(12, 1))
+
+    def test_unrolled_loops(self):
+        generator, _ = bench._generate(SOURCE)
+        # Not the loop with a variable bound nor the outer loop
+        self.assertEqual(
+            generator.unroller.unrolled,
+            [("main", 12, 4), ("main", 11, 4), ("main", 4, 4)],
+        )
+        generator, _ = bench._generate(SOURCE, unroll_factor=2)
+        self.assertEqual(
+            generator.unroller.unrolled,
+            [("main", 12, 2), ("main", 11, 2), ("main", 4, 2)],
+        )
+
+
+@skipUnless(shutil.which(bench.MOON), "moon simulator not built")
+class UnrollingMoonTestCase(TestCase):
+    def test_same_output(self):
+        for stdin in ("0\n", "3\n", "7\n"):
+            with self.subTest(stdin):
+                executable = bench.compile_source(SOURCE, disable=["unrolling"])
+                output, cycles = bench.run(executable, stdin)
+                unrolled, unrolled_cycles = bench.run(
+                    bench.compile_source(SOURCE), stdin
+                )
+                self.assertEqual(unrolled, output)
+                self.assertLess(unrolled_cycles, cycles)
@@ -0,0 +1,52 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from gen import Generator
+from lex import Scanner
+from sem import CompilationContext, SemanticAnalyzer
+from syn import Parser
+
+FIXTURES = [
+    os.path.join(os.path.dirname(__file__), "..", "fixtures", name)
+    for name in ("intpolynomial.src", "array.src")
+]
+
+
+def compile_source(source: str, context: CompilationContext) -> str:
+    ast = Parser().start(Scanner(io.StringIO(source))).ast
+    SemanticAnalyzer(context).start(ast)
+    return Generator(context).start(ast)
+
+
+class CompilationContextTestCase(TestCase):
+    def setUp(self):
+        self.sources = []
+        for name in FIXTURES:
+            with open(name) as f:
+                self.sources.append(f.read())
+        self.expected = [compile_source(s, CompilationContext()) for s in self.sources]
+
+    def test_isolated_globals(self):
+        first, second = CompilationContext(), CompilationContext()
+        compile_source(self.sources[0], first)
+        compile_source(self.sources[1], second)
+
+        self.assertIn("LINEAR", first.globals.entries)
+        self.assertNotIn("LINEAR", second.globals.entries)
+        self.assertIsNot(first.base_type("LINEAR"), second.base_type("LINEAR"))
+
+    def test_reused_context(self):
+        context = CompilationContext()
+        compile_source(self.sources[0], context)
+        self.assertEqual(compile_source(self.sources[1], context), self.expected[1])
+        self.assertNotIn("LINEAR", context.globals.entries)
+
+    def test_concurrent_compilations(self):
+        sources = self.sources * 8
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(
+                pool.map(lambda s: compile_source(s, CompilationContext()), sources)
+            )
+        self.assertListEqual(results, self.expected * 8)
@@ -0,0 +1,82 @@
+import io
+import os
+from unittest import TestCase
+
+from gen import Generator
+from lex import Scanner
+from sem import AnalysisCache, CompilationContext, SemanticAnalyzer
+from sem.output import TableFormatter
+from sem.parallel import Diagnostics
+from syn import Parser
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "fixtures", "bubblesort.src")
+SEMANTIC_ERRORS = [
+    os.path.join(os.path.dirname(__file__), "src", name)
+    for name in (
+        "duplicates.src",
+        "inheritance_errors.src",
+        "polynomialsemanticerrors_mod.src",
+    )
+]
+
+
+def analyze(source: str, cache: AnalysisCache = None):
+    ast = Parser().start(Scanner(io.StringIO(source))).ast
+    context = CompilationContext()
+    diagnostics = Diagnostics()
+    SemanticAnalyzer(context, diagnostics, cache=cache).start(ast)
+    tables = TableFormatter(context.globals).output()
+    if any(kind == "error" for kind, _, _ in diagnostics.messages):
+        return sorted(diagnostics.messages), tables, None
+    return sorted(diagnostics.messages), tables, Generator(context).start(ast)
+
+
+class IncrementalAnalysisTestCase(TestCase):
+    def setUp(self):
+        with open(FIXTURE) as f:
+            self.source = f.read()
+        self.cache = AnalysisCache()
+        self.assertEqual(analyze(self.source, self.cache), analyze(self.source))
+        self.assertEqual(self.cache.misses, 3)
+
+    def _assert_incremental(self, source: str, misses: int):
+        self.assertEqual(analyze(source, self.cache), analyze(source))
+        self.assertEqual(self.cache.misses, misses)
+        self.assertEqual(self.cache.hits, 3 - misses)
+
+    def test_unchanged(self):
+        self._assert_incremental(self.source, 0)
+
+    def test_edited_body(self):
+        self._assert_incremental(self.source.replace("i = i+1;", "i = i+2;", 1), 1)
+
+    def test_moved_diagnostics(self):
+        source = self.source.replace("n = size;", "n = size;\n    n = 1.5;", 1)
+        self._assert_incremental(source, 1)
+        # The cached error of bubbleSort moves down two lines
+        source = "\n\n" + source.replace("while (i<n)", "while (i<n+1)")
+        self._assert_incremental(source, 1)
+
+    def test_edited_signature(self):
+        source = self.source.replace(
+            "printArray(integer arr[], integer size) : void",
+            "printArray(integer arr[], float size) : void",
+        )
+        # printArray itself and main, which calls it
+        self._assert_incremental(source, 2)
+
+    def test_new_declaration(self):
+        source = "class temp { public integer x; };\n" + self.source
+        # Every function body declares a local named temp or calls a function
+        self._assert_incremental(source, 1)
+
+    def test_semantic_errors(self):
+        for name in SEMANTIC_ERRORS:
+            with open(name) as f, self.subTest(name):
+                source = f.read()
+                cache = AnalysisCache()
+                expected = analyze(source)
+                self.assertEqual(analyze(source, cache), expected)
+                # Replayed from the cache
+                self.assertEqual(analyze(source, cache), expected)
+                self.assertGreater(cache.hits, 0)
@@ -0,0 +1,58 @@
+import io
+from unittest import TestCase
+
+from lex import Scanner
+from sem import CompilationContext, SemanticAnalyzer
+from sem.parallel import Diagnostics
+from syn import Parser
+
+SOURCE = """
+class A {
+  public integer a;
+  public f(integer x) : integer;
+  public f(float x) : float;
+  private g(integer x) : integer;
+};
+class B inherits A {
+  public h(integer x[]) : integer;
+};
+A::f(integer x) : integer do return (x); end;
+A::f(float x) : float do return (x); end;
+A::g(integer x) : integer do return (f(x)); end;
+B::h(integer x[]) : integer do return (f(x[0]) + g(1)); end;
+k(integer x) : integer do return (x); end;
+k(integer y) : integer do return (y); end;
+main
+  local
+    B b;
+    integer arr[3];
+    integer i;
+    float r;
+  do
+    i = b.f(1);
+    r = b.f(1.5);
+    i = b.h(arr);
+    i = b.g(1);
+    i = b.f(arr);
+    i = k(1, 2);
+  end
+"""
+
+
+class OverloadTestCase(TestCase):
+    def test_resolution(self):
+        ast = Parser().start(Scanner(io.StringIO(SOURCE))).ast
+        diagnostics = Diagnostics()
+        SemanticAnalyzer(CompilationContext(), diagnostics).start(ast)
+        self.assertListEqual(
+            [(kind, msg) for kind, msg, _ in diagnostics.messages],
+            [
+                ("warn", 'Function "A::f" is overloaded'),
+                ("error", 'Multiply declared function "k(integer) : integer"'),
+                # A::g is private
+                ("error", 'Use of undeclared local variable "g"'),
+                ("error", 'Use of undeclared data member "g"'),
+                ("error", 'Use of undeclared member function "f(integer[3])"'),
+                ("error", 'Use of undeclared function "k(integer, integer)"'),
+            ],
+        )
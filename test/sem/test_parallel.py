@@ -0,0 +1,41 @@
+import io
+import os
+from unittest import TestCase
+
+from bench import synthetic
+from gen import Generator
+from lex import Scanner
+from sem import CompilationContext, SemanticAnalyzer
+from sem.output import TableFormatter
+from sem.parallel import Diagnostics
+from syn import Parser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+
+
+def compile_source(source: str, jobs: int):
+    ast = Parser().start(Scanner(io.StringIO(source))).ast
+    context = CompilationContext()
+    diagnostics = Diagnostics()
+    SemanticAnalyzer(context, diagnostics, jobs=jobs).start(ast)
+    tables = TableFormatter(context.globals).output()
+    if any(kind == "error" for kind, _, _ in diagnostics.messages):
+        return diagnostics.messages, tables, None
+    return diagnostics.messages, tables, Generator(context, jobs=jobs).start(ast)
+
+
+class ParallelTestCase(TestCase):
+    def _assert_same_as_serial(self, source):
+        self.assertEqual(compile_source(source, 3), compile_source(source, 1))
+
+    def test_fixtures(self):
+        for name in sorted(os.listdir(FIXTURES)):
+            with open(os.path.join(FIXTURES, name)) as f, self.subTest(name):
+                self._assert_same_as_serial(f.read())
+
+    def test_semantic_errors(self):
+        with open(os.path.join(FIXTURES, "..", "sem", "src", "duplicates.src")) as f:
+            self._assert_same_as_serial(f.read())
+
+    def test_many_functions(self):
+        self._assert_same_as_serial(synthetic(40))